@@ -0,0 +1,126 @@
+"""Léxico precalculado de abstracción para el vocabulario del modelo.
+
+Si un lema es abstracto por similitud depende solo del lema y del modelo: se
+analiza el lema solo (`nlp(lema)[0]`) y se compara con cada palabra de referencia.
+Este módulo calcula de antemano la similitud máxima de cada lema del vocabulario
+y la guarda en un archivo binario ordenado por hash, que el servicio abre con
+memory-map al iniciar. Los workers comparten así las mismas páginas de memoria.
+
+Para generar el léxico (hay que regenerarlo al cambiar de modelo o de referencias):
+
+    python lexico.py                      # escribe lexico_abstracto.bin
+    python lexico.py --salida /ruta/lexico.bin
+
+Formato del archivo:
+    MAGIA (8 bytes) | n: uint64 | largo_meta: uint64 | meta (JSON, relleno a 8 bytes)
+    | hashes: uint64[n] ordenados | puntajes: float32[n]
+"""
+import argparse
+import hashlib
+import json
+import struct
+from typing import Iterable, List, Optional
+
+import numpy as np
+from spacy.language import Language
+from spacy.strings import get_string_id
+from spacy.tokens import Token
+
+MAGIA = b"ABSLEX01"
+_CABECERA = struct.Struct("<8sQQ")
+
+
+def _metadatos(nlp: Language, referencias: List[str]) -> dict:
+    return {
+        "modelo": f"{nlp.meta['lang']}_{nlp.meta['name']}",
+        "version": nlp.meta["version"],
+        "referencias": hashlib.sha256("\n".join(referencias).encode("utf-8")).hexdigest(),
+    }
+
+
+def puntaje_similitud(nlp: Language, lemma: str, referencias: List[Token]) -> float:
+    """Similitud máxima del lema con los tokens de referencia (0.0 si el lema no tiene vector)."""
+    lemma_token = nlp(lemma)[0]
+    if not lemma_token.has_vector:
+        return 0.0
+    return max((lemma_token.similarity(ref) for ref in referencias if ref.has_vector), default=0.0)
+
+
+def lemas_del_vocabulario(nlp: Language, excluidas: Iterable[str] = ()) -> List[str]:
+    """Lemas candidatos: cadenas alfabéticas en minúsculas de más de dos letras."""
+    excluidas = set(excluidas)
+    return sorted({s for s in nlp.vocab.strings if s.isalpha() and len(s) > 2 and s == s.lower() and s not in excluidas})
+
+
+def construir(nlp: Language, referencias: List[str], salida: str, lemas: Optional[List[str]] = None,
+              batch_size: int = 1000) -> int:
+    """Calcula el puntaje de cada lema y escribe el léxico en `salida`. Devuelve la cantidad de lemas.
+
+    Equivale a `puntaje_similitud` para cada lema, pero vectorizado: el vector de un
+    token de este modelo es su fila de `doc.tensor`, que solo depende del tok2vec.
+    """
+    if lemas is None:
+        lemas = lemas_del_vocabulario(nlp)
+    tokens_ref = [nlp(ref)[0] for ref in referencias]
+    textos_ref = {t.text for t in tokens_ref}
+    matriz_ref = np.stack([t.vector / t.vector_norm for t in tokens_ref if t.has_vector and t.vector_norm])
+
+    puntajes = np.zeros(len(lemas), dtype=np.float32)
+    with nlp.select_pipes(enable=["tok2vec"]):
+        for i, doc in enumerate(nlp.pipe(lemas, batch_size=batch_size)):
+            token = doc[0]
+            # Token.similarity devuelve 1.0 si ambos tokens son la misma palabra
+            if token.text in textos_ref:
+                puntajes[i] = 1.0
+            elif token.has_vector and token.vector_norm:
+                puntajes[i] = float(np.max(matriz_ref @ token.vector) / token.vector_norm)
+
+    hashes = np.fromiter((get_string_id(lemma) for lemma in lemas), dtype=np.uint64, count=len(lemas))
+    orden = np.argsort(hashes, kind="stable")
+    meta = json.dumps(_metadatos(nlp, referencias)).encode("utf-8")
+    meta += b" " * (-len(meta) % 8)
+    with open(salida, "wb") as f:
+        f.write(_CABECERA.pack(MAGIA, len(lemas), len(meta)))
+        f.write(meta)
+        f.write(hashes[orden].astype("<u8").tobytes())
+        f.write(puntajes[orden].astype("<f4").tobytes())
+    return len(lemas)
+
+
+class Lexico:
+    """Léxico abierto con memory-map; busca el puntaje de un lema por búsqueda binaria sobre los hashes."""
+
+    def __init__(self, ruta: str):
+        with open(ruta, "rb") as f:
+            magia, n, largo_meta = _CABECERA.unpack(f.read(_CABECERA.size))
+            if magia != MAGIA:
+                raise ValueError(f"{ruta} no es un léxico de abstracción")
+            self.meta = json.loads(f.read(largo_meta))
+        inicio = _CABECERA.size + largo_meta
+        self.hashes = np.memmap(ruta, dtype="<u8", mode="r", offset=inicio, shape=(n,))
+        self.puntajes = np.memmap(ruta, dtype="<f4", mode="r", offset=inicio + 8 * n, shape=(n,))
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def compatible(self, nlp: Language, referencias: List[str]) -> bool:
+        """Indica si el léxico se generó con este modelo y estas palabras de referencia."""
+        return self.meta == _metadatos(nlp, referencias)
+
+    def buscar(self, lemma: str) -> Optional[float]:
+        """Puntaje precalculado del lema, o None si no está en el léxico."""
+        clave = np.uint64(get_string_id(lemma))
+        i = int(np.searchsorted(self.hashes, clave))
+        if i < len(self.hashes) and self.hashes[i] == clave:
+            return float(self.puntajes[i])
+        return None
+
+
+if __name__ == "__main__":
+    from main import PALABRAS_ABSTRACTAS_REF, PALABRAS_EXCLUIDAS, RUTA_LEXICO, nlp
+
+    parser = argparse.ArgumentParser(description="Genera el léxico precalculado de abstracción")
+    parser.add_argument("--salida", default=RUTA_LEXICO)
+    args = parser.parse_args()
+    cantidad = construir(nlp, PALABRAS_ABSTRACTAS_REF, args.salida, lemas_del_vocabulario(nlp, PALABRAS_EXCLUIDAS))
+    print(f"{cantidad} lemas escritos en {args.salida}")
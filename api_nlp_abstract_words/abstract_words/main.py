@@ -1,10 +1,18 @@
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi import FastAPI
-import spacy
+import logging
+import os
+from functools import lru_cache
+from lexico import Lexico, puntaje_similitud
+from morfologia import MotorAfijos
+from nlp_common import modelo, salud
+from nlp_common.model_server import ModelServer, instalar
+from nlp_common.metrics import instrumentar
 
 
-# Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm") 
+# El modelo de spaCy se carga al preparar el servicio (ver salud.instalar más abajo)
+nlp = modelo.cargar()
+servidor = ModelServer(nlp)
 
 # Modelo de entrada
 app = FastAPI(title="Detección de palabras abstractas",
@@ -19,10 +27,29 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrumentar(app, "abstract_words", nlp)
+instalar(app, servidor)
 
 
 PREFIJOS = {"in", "im", "i", "des"}
 
+# Sufijos que forman sustantivos abstractos, con el largo mínimo de la raíz que
+# queda al quitarlos (evita casos como "cura" o "edad")
+SUFIJOS = {
+    "dad": 2, "tad": 2, "ción": 2, "sión": 2, "xión": 2, "ismo": 2, "eza": 2, "ura": 3,
+    "ancia": 2, "encia": 2, "itud": 2, "miento": 2, "anza": 3, "dumbre": 2, "icia": 2, "ez": 3,
+}
+
+# Sustantivos concretos que terminan en alguno de los sufijos
+EXCLUIDAS_SUFIJOS = {
+    "ciudad", "universidad", "mitad", "estación", "habitación", "población", "nación", "televisión", "pensión",
+    "mansión", "organismo", "mecanismo", "abismo", "sismo", "cabeza", "pieza", "cerveza", "corteza", "maleza",
+    "basura", "criatura", "armadura", "escultura", "dentadura", "cintura", "figura", "factura", "pintura", "ranura",
+    "montura", "herradura", "cerradura", "estatura", "temperatura", "asignatura", "provincia", "ambulancia", "sustancia",
+    "agencia", "audiencia", "residencia", "farmacia", "alimento", "instrumento", "pez", "juez", "nuez", "ajedrez",
+    "lanza", "balanza", "matanza", "transmisión", "excursión", "camión", "avión",
+}
+
 #No existen más de 32 palabras con los prefijos mencionados que no sean abstractas
 
 PALABRAS_EXCLUIDAS = {
@@ -46,42 +73,70 @@ PALABRAS_ABSTRACTAS_REF = [ "agradable","alegría","amar","amistad","amor","angu
 
 UMBRAL_SIMILITUD = 0.6  # umbral de similitud semántica
 
+# Los prefijos no exigen raíz mínima: equivale a la comprobación original con startswith
+motor = MotorAfijos({prefijo: 0 for prefijo in PREFIJOS}, SUFIJOS, EXCLUIDAS_SUFIJOS)
+
+# Tokens de referencia analizados una sola vez, al preparar el servicio
+@lru_cache(maxsize=None)
+def tokens_ref():
+    return [nlp(ref)[0] for ref in PALABRAS_ABSTRACTAS_REF]
+
+# Léxico precalculado (ver lexico.py); sin él, toda la similitud se calcula en vivo
+RUTA_LEXICO = os.environ.get("ABSTRACTAS_LEXICO", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lexico_abstracto.bin"))
+lexico = None
+if os.path.exists(RUTA_LEXICO):
+    lexico = Lexico(RUTA_LEXICO)
+    if not lexico.compatible(nlp, PALABRAS_ABSTRACTAS_REF):
+        logging.warning("El léxico %s no corresponde a este modelo o a estas referencias; se ignora.", RUTA_LEXICO)
+        lexico = None
+
+salud.instalar(app, nlp, preparar=[tokens_ref])
+
+
+def es_abstracta_por_similitud(lemma: str) -> bool:
+    """Busca el lema en el léxico precalculado; solo los lemas fuera del léxico se comparan en vivo."""
+    puntaje = lexico.buscar(lemma) if lexico is not None else None
+    if puntaje is None:
+        puntaje = puntaje_similitud(nlp, lemma, tokens_ref())
+    return puntaje > UMBRAL_SIMILITUD
+
+# Todo el análisis (incluida la similitud, que vuelve a usar el modelo por lema)
+# se ejecuta en un worker del servidor de inferencia
 @app.get("/abstractas/")
-def abstractas(texto: str):
+async def abstractas(texto: str):
+    return await servidor.run(detectar_abstractas, texto)
+
+
+def detectar_abstractas(texto: str):
+    """Devuelve las palabras abstractas y, para cada una, la regla que la clasificó:
+    un prefijo ("des-"), un sufijo ("-ción") o "similitud"."""
     doc = nlp(texto)
-    respuesta = []
+    reglas = {}
 
     for token in doc:
         lemma = token.lemma_.lower()
 
-        prefijo_valido = any(lemma.startswith(prefijo) for prefijo in PREFIJOS)
-
         cumple = (
             not token.is_stop
             and not token.ent_type_
             and lemma not in PALABRAS_EXCLUIDAS
             and len(lemma) > 2
         )
+        if not cumple or token.text in reglas:
+            continue
 
-        # Sustantivos y verbos
-        if token.pos_ in {"NOUN", "VERB"} and cumple:
-            if prefijo_valido:
-                respuesta.append(token.text)
-            else:
-                lemma_token = nlp(lemma)[0]
-                for ref in PALABRAS_ABSTRACTAS_REF:
-                    ref_token = nlp(ref)[0]
-                    if lemma_token.has_vector and ref_token.has_vector and lemma_token.similarity(ref_token) > UMBRAL_SIMILITUD:
-                        respuesta.append(token.text)
-                        break
+        regla = None
+        # Sustantivos y verbos: primero las reglas morfológicas (los sufijos forman sustantivos)
+        if token.pos_ in {"NOUN", "VERB"}:
+            regla = motor.prefijo(lemma) or (motor.sufijo(lemma) if token.pos_ == "NOUN" else None)
+            if regla is None and es_abstracta_por_similitud(lemma):
+                regla = "similitud"
 
         # Adjetivos: solo abstractos mediante similitud
-        elif token.pos_ == "ADJ" and cumple:
-            lemma_token = nlp(lemma)[0]
-            for ref in PALABRAS_ABSTRACTAS_REF:
-                ref_token = nlp(ref)[0]
-                if lemma_token.has_vector and ref_token.has_vector and lemma_token.similarity(ref_token) > UMBRAL_SIMILITUD:
-                    respuesta.append(token.text)
-                    break
-
-    return {"respuesta": list(set(respuesta))}
\ No newline at end of file
+        elif token.pos_ == "ADJ" and es_abstracta_por_similitud(lemma):
+            regla = "similitud"
+
+        if regla is not None:
+            reglas[token.text] = str(regla)
+
+    return {"respuesta": list(reglas), "reglas": reglas}
@@ -0,0 +1,62 @@
+"""Motor de reglas morfológicas (prefijos y sufijos) para detectar palabras abstractas.
+
+Los prefijos se guardan en un trie y los sufijos en otro trie con las palabras
+invertidas, de modo que clasificar un lema cuesta O(len(lema)) sin importar la
+cantidad de reglas. Cada regla exige un largo mínimo para la raíz que queda al
+quitar el afijo, y las palabras de la lista de exclusiones nunca se clasifican.
+"""
+from typing import Dict, Iterable, NamedTuple, Optional
+
+_FIN = ""  # marca de fin de afijo dentro del trie (ningún carácter es la cadena vacía)
+
+
+class Regla(NamedTuple):
+    tipo: str  # "prefijo" o "sufijo"
+    afijo: str
+    raiz_minima: int
+
+    def __str__(self):
+        return f"{self.afijo}-" if self.tipo == "prefijo" else f"-{self.afijo}"
+
+
+def _insertar(trie: Dict, clave: str, regla: Regla):
+    nodo = trie
+    for caracter in clave:
+        nodo = nodo.setdefault(caracter, {})
+    nodo[_FIN] = regla
+
+
+def _buscar(trie: Dict, caracteres: Iterable[str], largo: int) -> Optional[Regla]:
+    """Recorre el trie y devuelve la regla más larga cuya raíz restante cumple el mínimo."""
+    encontrada = None
+    nodo = trie
+    for recorridos, caracter in enumerate(caracteres, start=1):
+        nodo = nodo.get(caracter)
+        if nodo is None:
+            break
+        regla = nodo.get(_FIN)
+        if regla is not None and largo - recorridos >= regla.raiz_minima:
+            encontrada = regla
+    return encontrada
+
+
+class MotorAfijos:
+    def __init__(self, prefijos: Dict[str, int], sufijos: Dict[str, int], excluidas: Iterable[str] = ()):
+        """`prefijos` y `sufijos` asocian cada afijo con el largo mínimo de la raíz."""
+        self.excluidas = frozenset(excluidas)
+        self._prefijos: Dict = {}
+        self._sufijos: Dict = {}
+        for afijo, minimo in prefijos.items():
+            _insertar(self._prefijos, afijo, Regla("prefijo", afijo, minimo))
+        for afijo, minimo in sufijos.items():
+            _insertar(self._sufijos, afijo[::-1], Regla("sufijo", afijo, minimo))
+
+    def prefijo(self, lemma: str) -> Optional[Regla]:
+        if lemma in self.excluidas:
+            return None
+        return _buscar(self._prefijos, lemma, len(lemma))
+
+    def sufijo(self, lemma: str) -> Optional[Regla]:
+        if lemma in self.excluidas:
+            return None
+        return _buscar(self._sufijos, reversed(lemma), len(lemma))
@@ -0,0 +1,26 @@
+import spacy
+
+from lexico import Lexico, construir, puntaje_similitud
+
+nlp = spacy.load("es_core_news_sm")
+REFERENCIAS = ["amor", "libertad", "justicia"]
+
+
+def test_lexico_coincide_con_la_similitud_en_vivo(tmp_path):
+    ruta = str(tmp_path / "lexico.bin")
+    lemas = ["amistad", "mesa", "libertad", "verdad", "perro"]
+    assert construir(nlp, REFERENCIAS, ruta, lemas) == len(lemas)
+
+    lexico = Lexico(ruta)
+    tokens_ref = [nlp(ref)[0] for ref in REFERENCIAS]
+    assert lexico.compatible(nlp, REFERENCIAS)
+    assert not lexico.compatible(nlp, REFERENCIAS + ["paz"])
+    for lemma in lemas:
+        assert abs(lexico.buscar(lemma) - puntaje_similitud(nlp, lemma, tokens_ref)) < 1e-5
+    assert lexico.buscar("libertad") == 1.0
+
+
+def test_lema_fuera_del_lexico(tmp_path):
+    ruta = str(tmp_path / "lexico.bin")
+    construir(nlp, REFERENCIAS, ruta, ["amistad"])
+    assert Lexico(ruta).buscar("inexistentísimo") is None
@@ -0,0 +1,22 @@
+from morfologia import MotorAfijos
+
+motor = MotorAfijos({"in": 0, "des": 0}, {"dad": 2, "ción": 2, "ura": 3, "ismo": 2}, excluidas={"ciudad"})
+
+
+def test_sufijos_informan_la_regla():
+    assert str(motor.sufijo("felicidad")) == "-dad"
+    assert str(motor.sufijo("educación")) == "-ción"
+    assert str(motor.sufijo("comunismo")) == "-ismo"
+    assert motor.sufijo("mesa") is None
+
+
+def test_raiz_minima_y_exclusiones():
+    assert motor.sufijo("cura") is None
+    assert str(motor.sufijo("cultura")) == "-ura"
+    assert motor.sufijo("ciudad") is None
+
+
+def test_prefijos():
+    assert str(motor.prefijo("desorden")) == "des-"
+    assert str(motor.prefijo("infinito")) == "in-"
+    assert motor.prefijo("casa") is None
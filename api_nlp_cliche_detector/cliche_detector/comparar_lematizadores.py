@@ -0,0 +1,110 @@
+"""Compara los backends de lematización del detector de clichés: precisión y latencia.
+
+Para cada backend (ver lematizadores.py) se informa:
+  - casos: casos de CASOS resueltos (se encuentran todos los clichés esperados
+    y, si no se espera ninguno, no se encuentra ninguno).
+  - esperados: proporción de los clichés esperados que se encuentran.
+  - acuerdo: textos (CASOS y oraciones del corpus de benchmarks) en los que se
+    encuentran exactamente los mismos clichés que con la referencia.
+  - lemas: tokens del corpus con el mismo lema que la referencia.
+  - p50/p90: latencia de `detectar_cliches` por texto, en milisegundos.
+
+La referencia es el modelo completo (CLICHE_MODELO). Con --modelos se agregan otros
+modelos completos, si están instalados (por ejemplo es_dep_news_trf). Se ejecuta
+desde esta carpeta, con la raíz del repositorio en PYTHONPATH:
+
+    python lematizadores.py                 # si todavía no existe la tabla
+    python comparar_lematizadores.py --modelos es_dep_news_trf --salida lematizadores.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+from time import perf_counter
+from typing import Any, Dict, List
+
+import spacy
+
+from benchmarks.corpus import ORACIONES
+from benchmarks.run import percentil
+from lematizadores import crear
+from main import CLICHE_MODELO, RUTA_TABLA, cliches, detectar_cliches, lematizar_cliches
+
+# (texto, clichés que debe encontrar): los de test_api_clicheDetector.py y variaciones
+CASOS = [
+    ("Este texto es completamente original.", []),
+    ("Quiero un sistema fácil de usar.", ["un sistema fácil de usar"]),
+    ("Quiero que sea seguro y quiero que nunca falle.", ["que sea seguro", "que nunca falle"]),
+    ("Me gustaría tener más simplicidad en el sistema.", ["quiero simplicidad"]),
+    ("Espero que el sistema luzca moderno y esté actualizado.", ["que sea moderno y actual"]),
+    ("Necesitamos que las páginas carguen rápido.", ["que cargue rápido"]),
+    ("Los usuarios quieren poder exportarlo todo a Excel.", ["poder exportar todo"]),
+    ("El gato duerme sobre la alfombra roja.", []),
+]
+
+
+def _encontrados(texto: str, lemas_cliches, lematizar) -> List[str]:
+    with contextlib.redirect_stdout(io.StringIO()):
+        return detectar_cliches(texto, lemas_cliches, lematizar)
+
+
+def medir(lematizar, referencia, repeticiones: int) -> Dict[str, Any]:
+    lemas_cliches = lematizar_cliches(cliches, lematizar)
+    lemas_ref = lematizar_cliches(cliches, referencia)
+    textos = [texto for texto, _ in CASOS] + ORACIONES
+
+    resueltos = encontrados_esperados = total_esperados = 0
+    for texto, esperados in CASOS:
+        encontrados = set(_encontrados(texto, lemas_cliches, lematizar))
+        resueltos += set(esperados) <= encontrados and (bool(esperados) or not encontrados)
+        encontrados_esperados += len(set(esperados) & encontrados)
+        total_esperados += len(esperados)
+    acuerdo = sum(_encontrados(t, lemas_cliches, lematizar) == _encontrados(t, lemas_ref, referencia) for t in textos)
+    tokens = [(a, b) for t in ORACIONES for a, b in zip(lematizar(t).split(), referencia(t).split())]
+
+    latencias = []
+    for _ in range(repeticiones):
+        for texto in textos:
+            inicio = perf_counter()
+            _encontrados(texto, lemas_cliches, lematizar)
+            latencias.append(perf_counter() - inicio)
+    return {
+        "casos": f"{resueltos}/{len(CASOS)}",
+        "esperados": encontrados_esperados / total_esperados,
+        "acuerdo": acuerdo / len(textos),
+        "lemas": sum(a == b for a, b in tokens) / len(tokens),
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p90_ms": percentil(latencias, 90) * 1000,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Compara los lematizadores del detector de clichés")
+    parser.add_argument("--modelos", nargs="*", default=[], help="otros modelos completos a comparar, si están instalados")
+    parser.add_argument("--repeticiones", type=int, default=5)
+    parser.add_argument("--salida")
+    args = parser.parse_args()
+
+    referencia = crear("completo", CLICHE_MODELO, RUTA_TABLA)
+    backends = {f"completo ({CLICHE_MODELO})": referencia, "ligero": crear("ligero", CLICHE_MODELO, RUTA_TABLA)}
+    if os.path.exists(RUTA_TABLA):
+        backends["tabla"] = crear("tabla", CLICHE_MODELO, RUTA_TABLA)
+    for nombre_modelo in args.modelos:
+        if spacy.util.is_package(nombre_modelo):
+            backends[f"completo ({nombre_modelo})"] = crear("completo", nombre_modelo, RUTA_TABLA)
+        else:
+            print(f"{nombre_modelo} no está instalado; se omite")
+
+    resultados = {nombre: medir(lematizar, referencia, args.repeticiones) for nombre, lematizar in backends.items()}
+    print(f"{'backend':<32}{'casos':>7}{'esperados':>11}{'acuerdo':>9}{'lemas':>8}{'p50 ms':>9}{'p90 ms':>9}")
+    for nombre, r in resultados.items():
+        print(f"{nombre:<32}{r['casos']:>7}{r['esperados']:>11.2f}{r['acuerdo']:>9.2f}{r['lemas']:>8.3f}"
+              f"{r['p50_ms']:>9.2f}{r['p90_ms']:>9.2f}")
+    if args.salida:
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultados, f, ensure_ascii=False, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Backends de lematización del detector de clichés.
+
+El detector solo compara cadenas de lemas, así que no necesita todo el pipeline.
+El backend se elige con CLICHE_LEMATIZADOR:
+
+  - "completo": el modelo entero (CLICHE_MODELO, por defecto es_core_news_sm;
+    también puede ser un modelo transformer como es_dep_news_trf).
+  - "ligero": el mismo modelo con solo tok2vec, morphologizer, attribute_ruler y
+    lemmatizer; sin parser ni ner, que no cambian los lemas.
+  - "tabla": sin red neuronal. El tokenizador y una tabla forma -> lema
+    precalculada con el modelo; las formas que no están en la tabla quedan igual.
+
+La tabla se genera con el modelo instalado (hay que regenerarla al cambiar de
+modelo o de catálogo de clichés):
+
+    python lematizadores.py                      # escribe lemas_cliches.json
+    python lematizadores.py --salida /ruta/lemas.json
+
+Cada palabra del vocabulario del modelo y de los clichés se lematiza sola, sin
+contexto, como en las tablas de consulta de spaCy. `python comparar_lematizadores.py`
+mide la precisión y la latencia de cada backend sobre oraciones que la tabla no vio.
+"""
+import argparse
+import json
+import os
+from typing import Dict, Iterable, List, Optional
+
+import spacy
+from spacy.language import Language
+
+from nlp_common import modelo
+from nlp_common.cache_resultados import version_modelo
+
+LEMATIZADORES = ("completo", "ligero", "tabla")
+# Componentes que no intervienen en los lemas
+SIN_LEMAS = ("parser", "ner")
+
+
+def _sin_lemas_excluidos(nombre_modelo: str):
+    """El modelo compartido sin los componentes que no intervienen en los lemas."""
+    componentes = modelo.cargar(nombre_modelo).pipe_names
+    return modelo.cargar(nombre_modelo, excluir=[c for c in SIN_LEMAS if c in componentes])
+
+
+def _metadatos(nombre_modelo: str) -> dict:
+    return {"modelo": nombre_modelo, "version": spacy.util.get_package_version(nombre_modelo)}
+
+
+class LematizadorModelo:
+    """Lemas del texto en minúsculas, sin signos de puntuación, con un pipeline de spaCy."""
+
+    def __init__(self, nombre: str, nlp: Language):
+        self.nombre = nombre
+        self.nlp = nlp
+        self.huella = f"{nombre}:{version_modelo(nlp)}"
+
+    def __call__(self, texto: str) -> str:
+        return " ".join(token.lemma_ for token in self.nlp(texto.lower()) if not token.is_punct)
+
+
+class LematizadorTabla:
+    """Igual que `LematizadorModelo`, pero buscando cada token en una tabla precalculada."""
+
+    nombre = "tabla"
+
+    def __init__(self, ruta: str):
+        with open(ruta, encoding="utf-8") as f:
+            datos = json.load(f)
+        self.meta = datos["meta"]
+        self.lemas: Dict[str, str] = datos["lemas"]
+        # solo el tokenizador: el del modelo es el tokenizador por defecto del idioma
+        self.nlp = spacy.blank(self.meta["idioma"])
+        self.huella = f"tabla:{json.dumps(self.meta, sort_keys=True)}"
+
+    def compatible(self) -> bool:
+        """Indica si la tabla se generó con la versión instalada de su modelo."""
+        return _metadatos(self.meta["modelo"]) == {k: self.meta[k] for k in ("modelo", "version")}
+
+    def __call__(self, texto: str) -> str:
+        return " ".join(self.lemas.get(token.text, token.text) for token in self.nlp.tokenizer(texto.lower())
+                        if not token.is_punct)
+
+
+def construir_tabla(nombre_modelo: str, salida: str, frases: Iterable[str] = (),
+                    palabras: Optional[List[str]] = None, batch_size: int = 1000) -> int:
+    """Lematiza las palabras (por defecto, el vocabulario del modelo) más las de las
+    frases, cada una sola, y escribe la tabla en `salida`. Devuelve la cantidad de
+    formas con un lema distinto."""
+    nlp = _sin_lemas_excluidos(nombre_modelo)
+    if palabras is None:
+        palabras = {s for s in nlp.vocab.strings if s.isalpha() and s == s.lower()}
+    # las frases solo aportan palabras: ningún lema sale de un contexto, así que la
+    # tabla no conoce de antemano las oraciones con las que se evalúa
+    palabras = set(palabras) | {t.text for f in frases for t in nlp.tokenizer(f.lower()) if t.is_alpha}
+    lemas = {}
+    for doc in nlp.pipe(sorted(palabras), batch_size=batch_size):
+        if len(doc) == 1:
+            lemas[doc[0].text] = doc[0].lemma_
+
+    distintos = {forma: lema for forma, lema in sorted(lemas.items()) if forma != lema}
+    meta = {**_metadatos(nombre_modelo), "idioma": nlp.lang}
+    with open(salida, "w", encoding="utf-8") as f:
+        json.dump({"meta": meta, "lemas": distintos}, f, ensure_ascii=False)
+    return len(distintos)
+
+
+def crear(nombre: str, nombre_modelo: str, ruta_tabla: str):
+    """Lematizador `nombre` (uno de LEMATIZADORES)."""
+    if nombre == "completo":
+        return LematizadorModelo(nombre, modelo.cargar(nombre_modelo))
+    if nombre == "ligero":
+        return LematizadorModelo(nombre, _sin_lemas_excluidos(nombre_modelo))
+    if nombre == "tabla":
+        if not os.path.exists(ruta_tabla):
+            raise FileNotFoundError(f"No existe la tabla de lemas {ruta_tabla}; se genera con `python lematizadores.py`")
+        return LematizadorTabla(ruta_tabla)
+    raise ValueError(f"Lematizador desconocido {nombre!r}; opciones: {', '.join(LEMATIZADORES)}")
+
+
+if __name__ == "__main__":
+    from main import CLICHE_MODELO, RUTA_TABLA, cliches
+
+    parser = argparse.ArgumentParser(description="Genera la tabla de lemas del detector de clichés")
+    parser.add_argument("--salida", default=RUTA_TABLA)
+    parser.add_argument("--modelo", default=CLICHE_MODELO)
+    args = parser.parse_args()
+    cantidad = construir_tabla(args.modelo, args.salida, cliches)
+    print(f"{cantidad} formas escritas en {args.salida}")
@@ -1,15 +1,33 @@
 
 from fastapi.middleware.cors import CORSMiddleware
+import logging
 import os
+from functools import lru_cache
 from pydantic import BaseModel
 from fastapi import FastAPI,Request
 
 from rapidfuzz import fuzz
-import spacy
-
-
-
-nlp = spacy.load("es_core_news_sm")
+from lematizadores import crear
+from nlp_common import cache_resultados, ejecucion, salud
+from nlp_common.metrics import instrumentar
+
+
+# Backend de lematización (ver lematizadores.py): completo, ligero o tabla
+CLICHE_LEMATIZADOR = os.environ.get("CLICHE_LEMATIZADOR", "completo")
+CLICHE_MODELO = os.environ.get("CLICHE_MODELO", "es_core_news_sm")
+RUTA_TABLA = os.environ.get("CLICHE_TABLA", os.path.join(os.path.dirname(os.path.abspath(__file__)), "lemas_cliches.json"))
+try:
+    lematizador = crear(CLICHE_LEMATIZADOR, CLICHE_MODELO, RUTA_TABLA)
+    if CLICHE_LEMATIZADOR == "tabla" and not lematizador.compatible():
+        raise ValueError(f"La tabla {RUTA_TABLA} no corresponde al modelo instalado")
+except (FileNotFoundError, ValueError) as e:
+    if CLICHE_LEMATIZADOR != "tabla":
+        raise
+    logging.warning("%s; se usa el lematizador ligero.", e)
+    lematizador = crear("ligero", CLICHE_MODELO, RUTA_TABLA)
+nlp = lematizador.nlp
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
 
 app = FastAPI(
     title="Servicio para detectar cliches",
@@ -26,6 +44,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+metricas = instrumentar(app, "cliche_detector", nlp)
+ejecucion.instalar(app, politica)
 
 
 cliches= [
@@ -73,25 +93,41 @@ class TextoEntrada(BaseModel):
     texto: str
 
 @app.post("/detectar_cliches/")
-def detectar_cliches_endpoint(entrada: TextoEntrada):
-    resultado = detectar_cliches(entrada.texto, cliches, nlp)
+async def detectar_cliches_endpoint(entrada: TextoEntrada):
+    resultado = await cache.resolver(
+        entrada.texto, lambda: politica.run(detectar_cliches, entrada.texto, lemas_del_catalogo(), lematizador),
+    )
     return {"cliches_encontrados": resultado}
 
 
-def lematizar(texto, nlp):
-    doc = nlp(texto.lower())
-    return " ".join([token.lemma_ for token in doc if not token.is_punct]   )
+def lematizar_cliches(lista_cliches, lematizar):
+    """Lemas de cada cliché del catálogo, en el mismo orden (se calculan una vez, no por pedido)."""
+    return [(cliche, lematizar(cliche)) for cliche in lista_cliches]
 
-def detectar_cliches(texto, lista_cliches, nlp, umbral=70):
-    texto_lemmas = lematizar(texto, nlp)
+def detectar_cliches(texto, lemas_cliches, lematizar, umbral=70):
+    texto_lemmas = lematizar(texto)
     
     encontrados = []
-    for cliche in lista_cliches:
+    for cliche, cliche_lemmas in lemas_cliches:
 
-        cliche_lemmas = lematizar(cliche, nlp)
         valor = fuzz.token_set_ratio(cliche_lemmas, texto_lemmas)
 
         if valor >= umbral:
             print(f"{cliche} → {valor}") 
             encontrados.append(cliche)
-    return encontrados
\ No newline at end of file
+    return encontrados
+
+
+@lru_cache(maxsize=None)
+def lemas_del_catalogo():
+    """Lemas del catálogo con el lematizador del servicio; se calculan al preparar el servicio."""
+    return lematizar_cliches(cliches, lematizador)
+
+salud.instalar(app, nlp, preparar=[lemas_del_catalogo])
+
+# Subir al cambiar la lógica de detección; los cambios en el catálogo, el umbral o el lematizador ya cambian la huella
+VERSION_REGLAS = "1"
+cache = cache_resultados.CacheResultados(
+    "cliche_detector", VERSION_REGLAS, cliches, detectar_cliches.__defaults__, lematizador.huella, metricas=metricas,
+)
+cache_resultados.instalar(app, cache)
\ No newline at end of file
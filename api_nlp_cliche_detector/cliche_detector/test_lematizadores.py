@@ -0,0 +1,42 @@
+import json
+
+import pytest
+
+from lematizadores import construir_tabla, crear
+from main import CLICHE_MODELO, cliches, detectar_cliches, lematizar_cliches
+
+ORACIONES = ["Quiero que sea seguro y que nunca falle.", "Los niños jugaban en el parque mientras sus padres conversaban."]
+
+
+def test_ligero_da_los_mismos_lemas_que_el_completo():
+    completo = crear("completo", CLICHE_MODELO, "")
+    ligero = crear("ligero", CLICHE_MODELO, "")
+    assert "parser" not in ligero.nlp.pipe_names
+    assert [ligero(o) for o in ORACIONES] == [completo(o) for o in ORACIONES]
+    assert ligero.huella != completo.huella
+
+
+def test_tabla(tmp_path):
+    ruta = str(tmp_path / "lemas.json")
+    construir_tabla(CLICHE_MODELO, ruta, frases=["que nunca falle"], palabras=["niños", "jugaban", "padres"])
+    tabla = crear("tabla", CLICHE_MODELO, ruta)
+    assert tabla.compatible()
+    # las palabras de las frases se agregan y se lematizan solas; las que no están en la tabla quedan igual
+    sola = crear("ligero", CLICHE_MODELO, "")("falle")
+    assert tabla("Los niños jugaban, ¡y nunca falle!") == f"los niño jugar y nunca {sola}"
+    with open(ruta, encoding="utf-8") as f:
+        assert set(json.load(f)["lemas"]) <= {"niños", "jugaban", "padres", "que", "nunca", "falle"}
+
+
+def test_detecta_con_cada_backend(tmp_path):
+    ruta = str(tmp_path / "lemas.json")
+    construir_tabla(CLICHE_MODELO, ruta, frases=cliches, palabras=["quiero", "sea", "seguro"])
+    for nombre in ["completo", "ligero", "tabla"]:
+        lematizar = crear(nombre, CLICHE_MODELO, ruta)
+        encontrados = detectar_cliches(ORACIONES[0], lematizar_cliches(cliches, lematizar), lematizar)
+        assert {"que sea seguro", "que nunca falle"} <= set(encontrados), nombre
+
+
+def test_backend_desconocido():
+    with pytest.raises(ValueError):
+        crear("transformer", CLICHE_MODELO, "")
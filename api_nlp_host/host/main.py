@@ -0,0 +1,101 @@
+"""Todos los servicios api_nlp_* en un solo proceso, con un único modelo de spaCy.
+
+La app de cada servicio se monta sin cambios bajo el nombre de su carpeta: por
+ejemplo, GET /deteccion_de_verbos/ del servicio tenses queda en
+GET /tenses/deteccion_de_verbos/, con el mismo cuerpo de respuesta. Los servicios
+piden el modelo con `nlp_common.modelo.cargar`, así que se carga una sola vez y
+lo comparten (los que usan otro pipeline reciben una vista del mismo modelo).
+
+Cada servicio se prepara al iniciar (ver `nlp_common.salud`) y sigue exponiendo
+sus sondas, por ejemplo GET /tenses/health/ready. GET /health/ready del host
+responde 200 cuando todos los servicios montados están listos.
+
+    cd api_nlp_host/host && PYTHONPATH=../.. uvicorn main:app
+
+Configuración por variables de entorno:
+  - HOST_SERVICIOS: servicios a montar, separados por comas (por defecto, todos).
+"""
+import importlib.util
+import os
+import sys
+from glob import glob
+from types import ModuleType
+from typing import Dict, Optional
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+from nlp_common import metrics, modelo
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def _carpetas() -> Dict[str, str]:
+    """Carpeta de cada servicio (api_nlp_*/<servicio>/main.py), por nombre de servicio."""
+    carpetas = {}
+    for ruta in sorted(glob(os.path.join(RAIZ, "api_nlp_*", "*", "main.py"))):
+        carpeta = os.path.dirname(ruta)
+        if carpeta != os.path.dirname(os.path.abspath(__file__)):
+            carpetas[os.path.basename(carpeta)] = carpeta
+    return carpetas
+
+
+def importar_servicio(nombre: str, carpeta: str) -> ModuleType:
+    """Importa el `main` de un servicio con un nombre de módulo propio (todos se llaman `main`)."""
+    # sus módulos hermanos (lexico, aho_corasick...) se importan como de nivel superior
+    if carpeta not in sys.path:
+        sys.path.append(carpeta)
+    spec = importlib.util.spec_from_file_location(f"{nombre}_main", os.path.join(carpeta, "main.py"))
+    modulo = importlib.util.module_from_spec(spec)
+    # registrado antes de ejecutarlo: pickle busca aquí las funciones que se envían a los workers
+    sys.modules[spec.name] = modulo
+    spec.loader.exec_module(modulo)
+    return modulo
+
+
+def crear_app(nombres: Optional[list] = None) -> FastAPI:
+    carpetas = _carpetas()
+    nombres = nombres or list(carpetas)
+    desconocidos = sorted(set(nombres) - set(carpetas))
+    if desconocidos:
+        raise ValueError(f"Servicios desconocidos: {desconocidos}")
+
+    # el modelo compartido se mide una vez, con su propia etiqueta, y no con la del primer servicio que lo use
+    metrics.medir_componentes(modelo.cargar(), "host")
+    servicios = {nombre: importar_servicio(nombre, carpetas[nombre]).app for nombre in nombres}
+
+    app = FastAPI(title="Servicios NLP", description="Todos los servicios api_nlp_* en un solo proceso.", version="1.0")
+    for nombre, sub_app in servicios.items():
+        app.mount(f"/{nombre}", sub_app)
+
+    # las apps montadas no reciben los eventos de inicio y cierre: se los pasa el host
+    async def iniciar():
+        for sub_app in servicios.values():
+            await sub_app.router.startup()
+
+    async def detener():
+        for sub_app in reversed(list(servicios.values())):
+            await sub_app.router.shutdown()
+
+    app.add_event_handler("startup", iniciar)
+    app.add_event_handler("shutdown", detener)
+
+    @app.get("/")
+    def listar_servicios():
+        return {"servicios": {nombre: f"/{nombre}/docs" for nombre in servicios}}
+
+    @app.get("/health/live", include_in_schema=False)
+    def vivo():
+        return {"estado": "vivo"}
+
+    @app.get("/health/ready", include_in_schema=False)
+    def listo():
+        preparaciones = {nombre: sub_app.state.preparacion for nombre, sub_app in servicios.items()}
+        todos = all(p.lista for p in preparaciones.values())
+        return JSONResponse(status_code=200 if todos else 503,
+                            content={nombre: p.informe() for nombre, p in preparaciones.items()})
+
+    return app
+
+
+app = crear_app([n.strip() for n in os.environ.get("HOST_SERVICIOS", "").split(",") if n.strip()] or None)
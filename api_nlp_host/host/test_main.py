@@ -0,0 +1,46 @@
+import os
+
+# solo algunos servicios, para que la prueba cargue rápido
+os.environ.setdefault("HOST_SERVICIOS", "invertir_texto,tenses,negative_phrase")
+# trabajos sin archivo: la prueba no deja sqlite3 ni reutiliza trabajos de otra corrida
+os.environ["NLP_TRABAJOS_DB"] = ""
+
+import sys
+
+from fastapi.testclient import TestClient
+
+from main import app
+from nlp_common import modelo
+
+
+def test_servicios_montados_con_sus_rutas():
+    with TestClient(app) as client:
+        assert client.get("/").json() == {"servicios": {
+            "invertir_texto": "/invertir_texto/docs", "tenses": "/tenses/docs", "negative_phrase": "/negative_phrase/docs",
+        }}
+        respuesta = client.get("/invertir_texto/invertir_texto/", params={"texto": "hola"})
+        assert respuesta.json() == {"respuesta": "aloh"}
+        respuesta = client.get("/tenses/deteccion_de_verbos/", params={"texto": "Mañana habremos terminado el trabajo."})
+        assert respuesta.json() == [["habremos terminado", "Futuro compuesto"]]
+        respuesta = client.post("/negative_phrase/negativaCompleja/oraciones", json={"texto": "No quiero. Sí, vamos."})
+        assert [(o["oracion"], o["posicion"]) for o in respuesta.json()["oraciones"]] == [("No quiero.", [0, 10]), ("Sí, vamos.", [11, 21])]
+        assert client.get("/tenses/no_existe").status_code == 404
+
+
+def test_un_solo_modelo():
+    tenses, negative_phrase = sys.modules["tenses_main"], sys.modules["negative_phrase_main"]
+    assert tenses.nlp is modelo.cargar()
+    assert negative_phrase.nlp._nlp is modelo.cargar()
+
+
+def test_listo_cuando_todos_los_servicios_terminan_de_prepararse():
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        for nombre in ["invertir_texto", "tenses", "negative_phrase"]:
+            assert sys.modules[f"{nombre}_main"].app.state.preparacion.esperar(timeout=60)
+        respuesta = client.get("/health/ready")
+        assert respuesta.status_code == 200
+        assert {nombre: informe["estado"] for nombre, informe in respuesta.json().items()} == {
+            "invertir_texto": "listo", "tenses": "listo", "negative_phrase": "listo",
+        }
+        assert client.get("/tenses/health/ready").status_code == 200
@@ -1,13 +1,22 @@
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from concurrent.futures import ProcessPoolExecutor
+import asyncio
+import multiprocessing
 import os
 from pydantic import BaseModel
-import spacy
-from typing import Tuple
+from nlp_common import ejecucion, modelo, salud
+from nlp_common.metrics import instrumentar
+import nlp_common.segmentador  # registra el componente segmentador_es
+from spacy.tokens import Token
+from typing import Any, Dict, List, Optional, Tuple
 
 
 # Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+# Límites de oración comunes a todos los servicios; el parser los respeta
+nlp = modelo.cargar(agregar={"segmentador_es": "parser"})
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
 
 app = FastAPI(
     title="Detección de oraciones impersonales",
@@ -24,32 +33,79 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrumentar(app, "impersonal_sentences", nlp)
+ejecucion.instalar(app, politica)
+salud.instalar(app, nlp)
 
 
 # Modelo de entrada
 class TextoEntrada(BaseModel):
     texto: str
 
+class TextosEntrada(BaseModel):
+    textos: List[str]
+
+
+# ---- Pool de procesos para el endpoint en lote ----
+# Los workers se crean por fork con el modelo ya cargado, así que arrancan con spaCy
+# listo y cada uno procesa su parte del lote con nlp.pipe. El pool se crea cuando
+# termina la preparación del servicio; mientras tanto el lote corre en un hilo.
+# Cada worker es una copia más del proceso: por defecto no hay pool (IMPERSONAL_WORKERS=1).
+N_WORKERS = int(os.environ.get("IMPERSONAL_WORKERS", "1"))
+MIN_TEXTOS_POR_WORKER = int(os.environ.get("IMPERSONAL_MIN_TEXTOS_POR_WORKER", "16"))
+BATCH_SIZE = int(os.environ.get("IMPERSONAL_BATCH_SIZE", "64"))
+_pool: Optional[ProcessPoolExecutor] = None
+
+def _crear_pool():
+    global _pool
+    if _pool is None and N_WORKERS > 1:
+        metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        _pool = ProcessPoolExecutor(max_workers=N_WORKERS, mp_context=multiprocessing.get_context(metodo))
+
+salud.al_estar_listo(app, _crear_pool)
+
+@app.on_event("shutdown")
+def _cerrar_pool():
+    global _pool
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+
 # helpers
-def _has_explicit_subject(verb_token):
-    """Devuelve True si el verbo tiene un sujeto explícito dependiente (nsubj, csubj, etc.)."""
-    subj_deps = {"nsubj", "nsubj:pass", "csubj", "csubj:pass", "expl"}
-    for child in verb_token.children:
-        if child.dep_ in subj_deps:
-            return True
-    return False
-
-def _clausal_has_subject(span):
-    """Revisa si en un span/cláusula existe un sujeto explícito (heurística)."""
-    for t in span:
-        if t.dep_ in {"nsubj", "nsubj:pass", "csubj"}:
-            return True
-    return False
+SUJETO_DEPS = {"nsubj", "nsubj:pass", "csubj", "csubj:pass", "expl"}
+SUJETO_CLAUSAL_DEPS = {"nsubj", "nsubj:pass", "csubj"}
+OBJETO_DEPS = {"obj", "dobj", "iobj", "obl", "ccomp", "xcomp"}
+TOKENS_TEMPORALES = {"año", "años", "mes", "meses", "día", "días", "semana", "semanas", "hora", "horas"}
 
-def detectar_impersonal_spacy(texto: str) -> Tuple[bool, str]:
+
+def _indices(doc):
+    """Construye, en una pasada por el Doc, los hijos de cada token y si su subárbol
+    contiene un sujeto explícito, para no volver a recorrer el documento por cada verbo."""
+    hijos = [[] for _ in range(len(doc))]
+    raices = []
+    for t in doc:
+        if t.head.i == t.i:
+            raices.append(t)
+        else:
+            hijos[t.head.i].append(t)
+
+    # recorrido en preorden; al invertirlo cada hijo queda antes que su padre
+    orden = []
+    pila = raices
+    while pila:
+        t = pila.pop()
+        orden.append(t)
+        pila.extend(hijos[t.i])
+    sujeto_en_subarbol = [False] * len(doc)
+    for t in reversed(orden):
+        sujeto_en_subarbol[t.i] = t.dep_ in SUJETO_CLAUSAL_DEPS or any(sujeto_en_subarbol[h.i] for h in hijos[t.i])
+    return hijos, sujeto_en_subarbol
+
+
+def _evaluar_impersonal(doc, tokens, hijos, sujeto_en_subarbol) -> Tuple[bool, str, Optional[Token]]:
     """
-    Detecta si la oración es impersonal usando únicamente análisis spaCy (dep parse, lemas, morph, ents).
-    Devuelve (es_impersonal: bool, motivo: str).
+    Aplica las reglas sobre `tokens` (el Doc completo o una de sus oraciones).
+    Devuelve (es_impersonal: bool, motivo: str, verbo que decidió el resultado o None).
     Reglas (heurísticas sintácticas):
       - 'hay' (haber en forma de existencia) -> impersonal.
       - 'se' ligado al verbo: si hay nsubj nominal -> impersonal (pasiva/impersonal).
@@ -58,66 +114,65 @@ def detectar_impersonal_spacy(texto: str) -> Tuple[bool, str]:
       - 'hacer' sin sujeto explícito y sin patrón temporal -> impersonal (Hace frío).
       - verbo finito en 3ª persona sin sujeto explícito en su cláusula -> impersonal.
     """
-    texto = (texto or "").strip()
-    if not texto:
-        return False, "texto vacío"
-
-    doc = nlp(texto)
-
     # 1) "hay" (haber en forma de existencia)
-    for t in doc:
+    for t in tokens:
         if t.lemma_.lower() == "haber" and t.text.lower() == "hay":
-            return True, "construcción de existencia: 'hay' (haber en forma de existencia)"
+            return True, "construcción de existencia: 'hay' (haber en forma de existencia)", t
 
     # obtenemos los posibles verbos principales (raíces de cláusulas)
-    root_verbs = [t for t in doc if t.dep_ == "ROOT" and t.pos_ in {"VERB", "AUX"}]
+    root_verbs = [t for t in tokens if t.dep_ == "ROOT" and t.pos_ in {"VERB", "AUX"}]
     if not root_verbs:
-        root_verbs = [t for t in doc if t.pos_ in {"VERB", "AUX"}]
+        root_verbs = [t for t in tokens if t.pos_ in {"VERB", "AUX"}]
+
+    # se calculan una sola vez por documento/oración y solo si alguna regla los necesita
+    has_por_agent = None
+    has_date_ent = None
 
     # Evaluamos cada verbo candidato
     for verb in root_verbs:
+        children = hijos[verb.i]
         # Si el verbo tiene sujeto explícito, descartamos según ese verbo
-        if _has_explicit_subject(verb):
+        if any(child.dep_ in SUJETO_DEPS for child in children):
             continue
 
         # ----- "se" impersonal / reflexivo -----
         # Buscamos tokens "se" cuyo head sea este verbo
-        se_tokens = [t for t in doc if t.text.lower() == "se" and t.head == verb and t.pos_ == "PRON"]
+        se_tokens = [t for t in children if t.text.lower() == "se" and t.pos_ == "PRON"]
         if se_tokens:
             # Si el verbo tiene sujeto nominal (nsubj) -> pasiva/impersonal: TRUE
-            has_nsubj = any(child.dep_ in {"nsubj", "nsubj:pass"} for child in verb.children)
+            has_nsubj = any(child.dep_ in {"nsubj", "nsubj:pass"} for child in children)
             # Si el verbo tiene objeto directo -> probablemente reflexivo/transitivo -> NO impersonal
-            has_obj = any(child.dep_ in {"obj", "dobj", "iobj", "obl", "ccomp", "xcomp"} for child in verb.children)
+            has_obj = any(child.dep_ in OBJETO_DEPS for child in children)
             # Si hay agente explícito introducido por 'por', preferimos no considerarlo impersonal
-            has_por_agent = any((t.dep_ == "case" and t.lemma_ == "por") or (t.text.lower() == "por") for t in doc)
+            if has_por_agent is None:
+                has_por_agent = any((t.dep_ == "case" and t.lemma_ == "por") or (t.text.lower() == "por") for t in tokens)
 
             if has_nsubj and not has_por_agent:
-                return True, "construcción con 'se' + nsubj -> pasiva/impersonal (ej. 'Se venden coches...')"
+                return True, "construcción con 'se' + nsubj -> pasiva/impersonal (ej. 'Se venden coches...')", verb
             if not has_nsubj and has_obj:
                 # ejemplo: "Se comió la manzana." -> reflexivo/transitivo -> NO impersonal
-                return False, "construcción con 'se' + objeto directo -> reflexiva/transitiva (no impersonal)"
+                return False, "construcción con 'se' + objeto directo -> reflexiva/transitiva (no impersonal)", verb
             # caso intermedio (p. ej. 'No se permite fumar...') -> marcar impersonal
             if not has_por_agent:
-                return True, "construcción con 'se' ligada al verbo sin agente explícito -> impersonal/pasiva refleja"
+                return True, "construcción con 'se' ligada al verbo sin agente explícito -> impersonal/pasiva refleja", verb
 
         # ----- 'ser' copulativo con predicado adjetival -----
         if verb.lemma_.lower() == "ser":
-            has_adj_pred = any(child.pos_ == "ADJ" or child.dep_ in {"acomp", "xcomp", "attr"} for child in verb.children)
-            clause_span = list(verb.subtree)
-            if has_adj_pred and not _clausal_has_subject(clause_span):
-                return True, "copula 'ser' + adjetivo sin sujeto explícito -> construcción impersonal ('Es ...')"
+            has_adj_pred = any(child.pos_ == "ADJ" or child.dep_ in {"acomp", "xcomp", "attr"} for child in children)
+            if has_adj_pred and not sujeto_en_subarbol[verb.i]:
+                return True, "copula 'ser' + adjetivo sin sujeto explícito -> construcción impersonal ('Es ...')", verb
 
         # ----- 'hacer' impersonal: distinguir de patrón temporal -----
         if verb.lemma_.lower() == "hacer":
-            has_date_ent = any(ent.label_ in {"DATE", "TIME"} for ent in doc.ents)
-            temporal_tokens = {"año", "años", "mes", "meses", "día", "días", "semana", "semanas", "hora", "horas"}
+            if has_date_ent is None:
+                has_date_ent = any(ent.label_ in {"DATE", "TIME"} for ent in tokens.ents)
             is_temporal_pattern = False
             right = [t for t in doc[verb.i+1: verb.i+4]]
             if right and right[0].like_num:
-                if len(right) > 1 and right[1].lemma_.lower() in temporal_tokens:
+                if len(right) > 1 and right[1].lemma_.lower() in TOKENS_TEMPORALES:
                     is_temporal_pattern = True
             if not has_date_ent and not is_temporal_pattern:
-                return True, "verbo 'hacer' sin sujeto explícito y no patrón temporal -> impersonal (ej. 'Hace frío')"
+                return True, "verbo 'hacer' sin sujeto explícito y no patrón temporal -> impersonal (ej. 'Hace frío')", verb
             else:
                 continue
 
@@ -132,21 +187,106 @@ def detectar_impersonal_spacy(texto: str) -> Tuple[bool, str]:
         # Consideramos impersonal solo si:
         #  - el verbo indica 3ª persona, o
         #  - no hay información de persona (person == []) pero verbo es ROOT y no hay sujeto en la cláusula
-        clause_span = list(verb.subtree)
         if (has_person_3) or (not person and verb.dep_ == "ROOT"):
-            if not _clausal_has_subject(clause_span):
-                return True, "verbo finito (3ª persona o ROOT sin info de persona) sin sujeto explícito en la cláusula -> impersonal"
+            if not sujeto_en_subarbol[verb.i]:
+                return True, "verbo finito (3ª persona o ROOT sin info de persona) sin sujeto explícito en la cláusula -> impersonal", verb
 
     # Si no detectamos patrón impersonal
-    return False, "no se detectaron construcciones impersonales sintácticas con spaCy"
+    return False, "no se detectaron construcciones impersonales sintácticas con spaCy", None
+
+
+def detectar_impersonal_spacy(texto: str) -> Tuple[bool, str]:
+    """
+    Detecta si la oración es impersonal usando únicamente análisis spaCy (dep parse, lemas, morph, ents).
+    Devuelve (es_impersonal: bool, motivo: str). Las reglas están en `_evaluar_impersonal`.
+    """
+    texto = (texto or "").strip()
+    if not texto:
+        return False, "texto vacío"
+
+    return _veredicto(nlp(texto))
+
+
+def _veredicto(doc) -> Tuple[bool, str]:
+    hijos, sujeto_en_subarbol = _indices(doc)
+    imp, motivo, _ = _evaluar_impersonal(doc, doc, hijos, sujeto_en_subarbol)
+    return imp, motivo
+
+
+def detectar_impersonal_lote(textos: List[str]) -> List[Tuple[bool, str]]:
+    """Igual que `detectar_impersonal_spacy` para una lista de textos, usando nlp.pipe. Conserva el orden."""
+    limpios = [(t or "").strip() for t in textos]
+    docs = nlp.pipe([t for t in limpios if t], batch_size=BATCH_SIZE)
+    return [_veredicto(next(docs)) if t else (False, "texto vacío") for t in limpios]
+
+
+def detectar_impersonal_documento(texto: str) -> List[Dict[str, Any]]:
+    """
+    Analiza un documento completo con un solo parseo y devuelve, para cada oración,
+    el veredicto, el motivo y el verbo (núcleo de la cláusula) que lo determinó.
+    Las posiciones son sobre el texto recibido, con sus espacios iniciales.
+    """
+    texto = texto or ""
+    desplazamiento = len(texto) - len(texto.lstrip())
+    texto = texto.strip()
+    if not texto:
+        return []
+
+    doc = nlp(texto)
+    hijos, sujeto_en_subarbol = _indices(doc)
+    resultados = []
+    for sent in doc.sents:
+        imp, motivo, verbo = _evaluar_impersonal(doc, sent, hijos, sujeto_en_subarbol)
+        inicio_verbo = verbo.idx + desplazamiento if verbo is not None else None
+        resultados.append({
+            "oracion": sent.text,
+            "posicion": (sent.start_char + desplazamiento, sent.end_char + desplazamiento),
+            "impersonal": imp,
+            "motivo": motivo,
+            "verbo": {"texto": verbo.text, "posicion": (inicio_verbo, inicio_verbo + len(verbo.text))} if verbo is not None else None,
+        })
+    return resultados
     
 
 # Endpoint principal: POST /detectar
 @app.post("/detectar")
-def detectar(entrada: TextoEntrada):
-    imp, motivo = detectar_impersonal_spacy(entrada.texto)
+async def detectar(entrada: TextoEntrada):
+    imp, motivo = await politica.run(detectar_impersonal_spacy, entrada.texto)
     return {"original": entrada.texto, "impersonal": imp, "motivo": motivo}
 
+# Modo documento: un veredicto por oración con un solo parseo
+@app.post("/detectar/documento")
+async def detectar_documento(entrada: TextoEntrada):
+    oraciones = await politica.run(detectar_impersonal_documento, entrada.texto)
+    return {
+        "original": entrada.texto,
+        "impersonal": any(o["impersonal"] for o in oraciones),
+        "oraciones": oraciones,
+    }
+
+# Endpoint en lote: reparte los textos entre los workers y devuelve los
+# veredictos en el mismo orden de entrada
+@app.post("/detectar/batch")
+async def detectar_batch(entrada: TextosEntrada):
+    textos = entrada.textos
+    n_partes = min(N_WORKERS, len(textos) // MIN_TEXTOS_POR_WORKER) if _pool is not None else 1
+    if n_partes <= 1:
+        veredictos = await politica.run(detectar_impersonal_lote, textos)
+    else:
+        tam = -(-len(textos) // n_partes)
+        # cada parte es un pedido de la política: se admite y vence por separado
+        partes = await asyncio.gather(*(
+            politica.run(detectar_impersonal_lote, textos[i:i + tam], executor=_pool)
+            for i in range(0, len(textos), tam)
+        ))
+        veredictos = [v for parte in partes for v in parte]
+    return {
+        "resultados": [
+            {"original": texto, "impersonal": imp, "motivo": motivo}
+            for texto, (imp, motivo) in zip(textos, veredictos)
+        ]
+    }
+
 # Endpoint de prueba
 @app.get("/")
 def root():
@@ -0,0 +1,33 @@
+from fastapi.testclient import TestClient
+
+from main import app, detectar_impersonal_documento
+
+client = TestClient(app)
+
+
+def test_detectar_documento_por_oracion():
+    """Cada oración del documento recibe su propio veredicto con un solo análisis."""
+    texto = "Hay muchas opciones disponibles. Juan come manzanas todos los días."
+    response = client.post("/detectar/documento", json={"texto": texto})
+    assert response.status_code == 200
+    data = response.json()
+    assert data["original"] == texto
+    assert data["impersonal"] is True
+    assert [o["impersonal"] for o in data["oraciones"]] == [True, False]
+    inicio, fin = data["oraciones"][0]["verbo"]["posicion"]
+    assert texto[inicio:fin] == "Hay"
+    assert data["oraciones"][1]["verbo"] is None
+
+
+def test_documento_con_parrafos_y_espacios_iniciales():
+    """Las posiciones de oraciones y verbos se refieren al texto recibido, aunque empiece con espacios."""
+    texto = "  Hay opciones.\n\nJuan come. Llueve mucho."
+    oraciones = detectar_impersonal_documento(texto)
+    assert [o["impersonal"] for o in oraciones] == [True, False, True]
+    for oracion in oraciones:
+        inicio, fin = oracion["posicion"]
+        assert texto[inicio:fin] == oracion["oracion"]
+        if oracion["verbo"] is not None:
+            inicio, fin = oracion["verbo"]["posicion"]
+            assert texto[inicio:fin] == oracion["verbo"]["texto"]
+    assert detectar_impersonal_documento("   ") == []
@@ -0,0 +1,51 @@
+import time
+
+from fastapi.testclient import TestClient
+
+import main
+from main import app
+
+client = TestClient(app)
+
+TEXTOS = ["Hay muchas opciones disponibles.", "", "Juan come manzanas todos los días."]
+
+
+def test_detectar_batch_conserva_orden():
+    """El endpoint en lote devuelve un veredicto por texto, en el orden de entrada."""
+    response = client.post("/detectar/batch", json={"textos": TEXTOS})
+    assert response.status_code == 200
+    resultados = response.json()["resultados"]
+    assert [r["original"] for r in resultados] == TEXTOS
+    assert [r["impersonal"] for r in resultados] == [True, False, False]
+    assert resultados[1]["motivo"] == "texto vacío"
+
+
+def test_lote_repartido_entre_los_workers(monkeypatch):
+    """Con el servicio preparado, las partes del lote se analizan en el pool de procesos."""
+    monkeypatch.setattr(main, "N_WORKERS", 2)
+    monkeypatch.setattr(main, "MIN_TEXTOS_POR_WORKER", 1)
+    textos = TEXTOS * 3
+    with TestClient(app) as cliente:
+        assert app.state.preparacion.esperar(timeout=120)
+        for _ in range(100):
+            if main._pool is not None:
+                break
+            time.sleep(0.05)
+        assert main._pool is not None
+        response = cliente.post("/detectar/batch", json={"textos": textos})
+        assert main.politica.pendientes == 0
+    assert main._pool is None
+    assert response.status_code == 200
+    resultados = response.json()["resultados"]
+    assert [r["original"] for r in resultados] == textos
+    assert [r["impersonal"] for r in resultados] == [True, False, False] * 3
+
+
+def test_sin_pool_con_un_worker(monkeypatch):
+    """Con un solo worker (el valor por defecto) no se crean procesos y el lote corre en un hilo."""
+    monkeypatch.setattr(main, "N_WORKERS", 1)
+    with TestClient(app) as cliente:
+        assert app.state.preparacion.esperar(timeout=120)
+        response = cliente.post("/detectar/batch", json={"textos": TEXTOS * 20})
+        assert main._pool is None
+    assert [r["impersonal"] for r in response.json()["resultados"]] == [True, False, False] * 20
@@ -1,6 +1,8 @@
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 import os
+from nlp_common import salud
+from nlp_common.metrics import instrumentar
 
 app = FastAPI(
     title="Servicio de Inversión de Texto",
@@ -17,6 +19,8 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrumentar(app, "invertir_texto")
+salud.instalar(app)
 
 
 @app.get(
@@ -0,0 +1,130 @@
+"""Búsqueda de conectores con un autómata de Aho-Corasick sobre el texto crudo.
+
+Alternativa a PhraseMatcher que no tokeniza: los conectores se compilan una sola
+vez en un autómata y el texto se recorre una sola vez, carácter por carácter,
+sin importar cuántos conectores haya. El texto se normaliza a minúsculas y sin
+tildes (á -> a, ü -> u; la ñ se conserva) con una traducción que conserva la
+longitud, así que las posiciones encontradas valen para el texto original.
+
+Una coincidencia solo cuenta si empieza y termina en un límite de palabra tal como
+lo define el tokenizador de spaCy para español (qué signos corta como prefijo,
+sufijo o infijo), lo que reproduce el emparejamiento por tokens de PhraseMatcher.
+Sobre texto bien acentuado los resultados coinciden, salvo excepciones puntuales
+del tokenizador ("y.Luego"); además se reconocen conectores escritos sin tilde
+("ademas"), que PhraseMatcher no encuentra.
+"""
+from collections import deque
+from typing import Dict, Iterable, List, Tuple
+
+_SIN_TILDES = str.maketrans("áéíóúàèìòùäëïöüâêîôû", "aeiouaeiouaeiouaeiou")
+
+# Signos que el tokenizador de spaCy para español no separa de una palabra pegada:
+# al comienzo (prefijo), al final (sufijo) o entre dos letras o números (infijo)
+_SIN_CORTE_PREFIJO = frozenset(".-/@|\\~^")
+_SIN_CORTE_SUFIJO = frozenset("-/%$@+=|\\~^")
+_SIN_CORTE_INFIJO = frozenset(".;-—–_()¿?¡!\"'«»[]{}*&%$#@+|\\~^`“”‘’")
+
+
+def normalizar(texto: str) -> str:
+    """Minúsculas y sin tildes, con la misma longitud que `texto`."""
+    minusculas = texto.lower()
+    if len(minusculas) != len(texto):
+        # algunos caracteres se expanden al pasar a minúsculas ("İ" -> "i̇")
+        minusculas = "".join(c.lower()[0] for c in texto)
+    return minusculas.translate(_SIN_TILDES)
+
+
+def _pegado(resto: str, afijos_sin_corte: frozenset) -> bool:
+    """Indica si los signos pegados a un conector (`resto`, desde el conector hasta el espacio
+    más cercano, leídos desde el conector hacia afuera) lo unen a otro token."""
+    if not resto:
+        return False
+    if resto[0].isalnum():
+        return True
+    if any(c.isalnum() for c in resto):
+        # hay otra palabra pegada: el signo contiguo solo separa si el tokenizador lo corta como infijo
+        return resto[0] in _SIN_CORTE_INFIJO
+    # solo signos: se separan si el tokenizador puede quitarlos todos como prefijos o sufijos
+    return any(c in afijos_sin_corte for c in resto.replace("...", "").replace("…", ""))
+
+
+def _izquierda(texto: str, inicio: int) -> str:
+    espacio = inicio
+    while espacio > 0 and not texto[espacio - 1].isspace():
+        espacio -= 1
+    return texto[espacio:inicio][::-1]
+
+
+def _derecha(texto: str, fin: int) -> str:
+    espacio = fin
+    while espacio < len(texto) and not texto[espacio].isspace():
+        espacio += 1
+    return texto[fin:espacio]
+
+
+def _es_abreviatura(texto: str, inicio: int, fin: int) -> bool:
+    # una letra sola seguida de punto es una abreviatura para el tokenizador ("y." como inicial)
+    return fin - inicio == 1 and texto[fin:fin + 1] == "." and texto[fin + 1:fin + 2] != "."
+
+
+class AutomataConectores:
+    def __init__(self, conectores: Iterable[str]):
+        # transiciones[estado] ya incluye las de sus enlaces de falla (autómata determinista),
+        # así el recorrido hace un único acceso a diccionario por carácter
+        self.transiciones: List[Dict[str, int]] = [{}]
+        self.salidas: List[Tuple[int, ...]] = [()]  # largos de los conectores que terminan en cada estado
+        for conector in conectores:
+            self._agregar(normalizar(conector))
+        self._compilar()
+
+    def _agregar(self, patron: str):
+        if not patron:
+            return
+        estado = 0
+        for caracter in patron:
+            siguiente = self.transiciones[estado].get(caracter)
+            if siguiente is None:
+                siguiente = len(self.transiciones)
+                self.transiciones.append({})
+                self.salidas.append(())
+                self.transiciones[estado][caracter] = siguiente
+            estado = siguiente
+        if len(patron) not in self.salidas[estado]:
+            self.salidas[estado] += (len(patron),)
+
+    def _compilar(self):
+        falla = [0] * len(self.transiciones)
+        cola = deque(self.transiciones[0].values())
+        while cola:
+            estado = cola.popleft()
+            # en orden de anchura, el estado de falla ya tiene sus transiciones completas
+            self.salidas[estado] += tuple(l for l in self.salidas[falla[estado]] if l not in self.salidas[estado])
+            for caracter, siguiente in list(self.transiciones[estado].items()):
+                cola.append(siguiente)
+                falla[siguiente] = self.transiciones[falla[estado]].get(caracter, 0) if estado else 0
+                if falla[siguiente] == siguiente:
+                    falla[siguiente] = 0
+            for caracter, destino in self.transiciones[falla[estado]].items():
+                self.transiciones[estado].setdefault(caracter, destino)
+
+    def buscar(self, texto: str) -> List[Tuple[str, int, int]]:
+        """Devuelve (texto original, inicio, fin) de cada conector, ordenados por inicio y fin."""
+        normalizado = normalizar(texto)
+        largo = len(normalizado)
+        transiciones, salidas = self.transiciones, self.salidas
+        encontrados = []
+        estado = 0
+        for fin, caracter in enumerate(normalizado, start=1):
+            estado = transiciones[estado].get(caracter, 0)
+            if salidas[estado]:
+                # caso común primero: el conector termina o empieza dentro de otra palabra
+                if fin < largo and normalizado[fin].isalnum() or _pegado(_derecha(normalizado, fin), _SIN_CORTE_SUFIJO):
+                    continue
+                for longitud in salidas[estado]:
+                    inicio = fin - longitud
+                    if inicio > 0 and normalizado[inicio - 1].isalnum():
+                        continue
+                    if not _pegado(_izquierda(normalizado, inicio), _SIN_CORTE_PREFIJO) and not _es_abreviatura(normalizado, inicio, fin):
+                        encontrados.append((texto[inicio:fin], inicio, fin))
+        encontrados.sort(key=lambda c: (c[1], c[2]))
+        return encontrados
@@ -1,9 +1,14 @@
-from fastapi import FastAPI
-import spacy
+from enum import Enum
+from fastapi import FastAPI, Query
+from aho_corasick import AutomataConectores
+from nlp_common import cache_resultados, ejecucion, modelo, salud
+from nlp_common.metrics import instrumentar
 from spacy.matcher import PhraseMatcher
 from fastapi.middleware.cors import CORSMiddleware
 
-nlp = spacy.load("es_core_news_sm")
+nlp = modelo.cargar()
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
 
 app = FastAPI(
     title="Detección de conectores lógicos",
@@ -20,6 +25,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+metricas = instrumentar(app, "logical_connectors", nlp)
+ejecucion.instalar(app, politica)
+salud.instalar(app, nlp)
 
 
 def encontrar_conectores_spacy(texto, conectores):
@@ -32,6 +40,11 @@ def encontrar_conectores_spacy(texto, conectores):
     Returns:
         list: Lista de conectores encontrados en el texto.
     """
+    return [encontrado for encontrado, _, _ in coincidencias_spacy(texto, conectores)]
+
+
+def coincidencias_spacy(texto, conectores):
+    """Igual que `encontrar_conectores_spacy`, pero devuelve (texto, inicio, fin) de cada conector."""
     matcher = PhraseMatcher(nlp.vocab, attr="LOWER")
     patrones = [nlp.make_doc(c) for c in conectores]
     matcher.add("CONECTORES", patrones)
@@ -39,7 +52,8 @@ def encontrar_conectores_spacy(texto, conectores):
     
     resultados = []
     for match_id, start, end in matcher(doc):
-        resultados.append(doc[start:end].text)
+        span = doc[start:end]
+        resultados.append((span.text, span.start_char, span.end_char))
     return resultados
 
 conectores_comunes = [
@@ -53,7 +67,32 @@ conectores_comunes = [
     "y", "o"
     ]
 
+# Se compila una sola vez; el recorrido no depende de la cantidad de conectores
+automata = AutomataConectores(conectores_comunes)
+
+# Subir al cambiar la lógica de búsqueda; los cambios en la lista de conectores ya cambian la huella
+VERSION_REGLAS = "1"
+cache = cache_resultados.CacheResultados("logical_connectors", VERSION_REGLAS, conectores_comunes, nlp=nlp, metricas=metricas)
+cache_resultados.instalar(app, cache)
+
+
+class Motor(str, Enum):
+    spacy = "spacy"
+    aho_corasick = "aho-corasick"
+
+
 @app.get("/conectores-logicos/")
-def detectar_conectores(texto: str):
-    encontrados = encontrar_conectores_spacy(texto, conectores_comunes)
-    return {"conectores": encontrados}
\ No newline at end of file
+async def detectar_conectores(
+    texto: str,
+    motor: Motor = Query(Motor.spacy, description="'spacy' (PhraseMatcher sobre tokens) o 'aho-corasick' (sobre el texto crudo, sin tokenizar)"),
+    posiciones: bool = Query(False, description="Incluir la posición de cada conector en el texto"),
+):
+    if motor == Motor.aho_corasick:
+        calcular = lambda: politica.run(automata.buscar, texto)
+    else:
+        calcular = lambda: politica.run(coincidencias_spacy, texto, conectores_comunes)
+    encontrados = await cache.resolver(texto, calcular, motor=motor.value)
+    respuesta = {"conectores": [conector for conector, _, _ in encontrados]}
+    if posiciones:
+        respuesta["posiciones"] = [{"conector": c, "inicio": inicio, "fin": fin} for c, inicio, fin in encontrados]
+    return respuesta
\ No newline at end of file
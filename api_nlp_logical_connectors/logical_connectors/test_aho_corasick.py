@@ -0,0 +1,36 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from aho_corasick import AutomataConectores
+from main import app, automata, coincidencias_spacy, conectores_comunes
+
+client = TestClient(app)
+
+TEXTOS = [
+    "Sin embargo, el equipo decidió continuar; por lo tanto, los resultados fueron publicados.",
+    "AUN ASÍ, Por Ende... ¿y entonces? Pero—además—así que: «por lo tanto» y/o de-de rey.",
+    "En conclusión (es decir, en resumen), no obstante -y a pesar de hecho- luego.",
+]
+
+
+@pytest.mark.parametrize("texto", TEXTOS)
+def test_mismos_resultados_que_phrasematcher(texto):
+    assert automata.buscar(texto) == coincidencias_spacy(texto, conectores_comunes)
+
+
+def test_posiciones_sobre_el_texto_original_y_sin_tildes():
+    texto = "Ademas, ÉL vino y además"
+    assert AutomataConectores(["además", "y"]).buscar(texto) == [("Ademas", 0, 6), ("y", 16, 17), ("además", 18, 24)]
+
+
+def test_conectores_superpuestos():
+    assert AutomataConectores(["a b", "b c", "b"]).buscar("a b c") == [("a b", 0, 3), ("b", 2, 3), ("b c", 2, 5)]
+
+
+def test_endpoint_selecciona_motor():
+    params = {"texto": "Sin embargo, llovió y salimos.", "posiciones": True}
+    spacy_ = client.get("/conectores-logicos/", params=params).json()
+    aho = client.get("/conectores-logicos/", params={**params, "motor": "aho-corasick"}).json()
+    assert spacy_ == aho
+    assert aho["posiciones"][0] == {"conector": "Sin embargo", "inicio": 0, "fin": 11}
+    assert client.get("/conectores-logicos/", params={"texto": "x", "motor": "otro"}).status_code == 422
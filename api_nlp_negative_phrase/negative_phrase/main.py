@@ -1,12 +1,22 @@
-from fastapi import FastAPI, Query
+from fastapi import FastAPI, Header, HTTPException, Query, Response
 from fastapi.middleware.cors import CORSMiddleware
 from fastapi.responses import HTMLResponse
 from pydantic import BaseModel
-import spacy
+from typing import List, Optional
+from collections import OrderedDict
+from threading import Lock
+import hashlib
+import os
 from spacy import displacy
+from nlp_common import modelo, salud
+from nlp_common.model_server import ModelServer, instalar
+from nlp_common.metrics import instrumentar
+import nlp_common.segmentador  # registra el componente segmentador_es
 
 # Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+# Límites de oración comunes a todos los servicios; el parser los respeta
+nlp = modelo.cargar(agregar={"segmentador_es": "parser"})
+servidor = ModelServer(nlp)
 
 app = FastAPI(
     title="Servicio de frase negativa",
@@ -22,62 +32,264 @@ app.add_middleware(
     allow_credentials=True,
     allow_methods=["*"],
     allow_headers=["*"],
+    expose_headers=["ETag", "X-Pagina", "X-Total-Paginas"],
 )
+metricas = instrumentar(app, "negative_phrase", nlp)
+instalar(app, servidor)
+salud.instalar(app, nlp)
 
 
 class TextoEntrada(BaseModel):
     texto: str
-    
-
-def valor(doc):
-    for token in doc:
-        if token.pos_ in {"VERB", "ADJ","NOUN"} and (negEncontrada(token.lemma_.lower()) + bucleHerencia(token,negEncontrada(token.lemma_.lower())) >= 2):
-            return True
-    return False
 
+class TextosEntrada(BaseModel):
+    textos: List[str]
+    
 
-def negEncontrada(palabra):    
-    negativo = {
+NEGATIVOS = frozenset({
     "apenas","ausencia","carecer","carencia","desaprobar","deficiencia", "dudar",
     "equivocado","falso","fallar","falta","improbable","imposible",
     "incapaz","incompleto","ineficaz","inviable","incorrecto","insatisfactorio",
     "insuficiente","mentira","negar","nadie","ninguno","ningun",
     "no","nunca","jamás","ni","renegar","rechazar"
-}
-    return 1 if palabra in negativo else 0
-
-
-def bucleHerencia(padre,valorInicial,contadorN=0):   
-    penalizar=-100 
-    for hijo in (h for h in padre.children if h.dep_ in ["ccomp", "xcomp", "acl","csubj","advmod","nsubj","mark","obj"]):
-        #Verificamos si es un caso de refuerzo negativo.
-        if (hijo.pos_=="SCONJ" and padre.pos_!="VERB") or hijo.dep_=="obj":                        
-            return penalizar;
-        contadorN+=negEncontrada(hijo.lemma_.lower())
-        if contadorN>=2-valorInicial: #si el primer token es negativo necesito 1 sino se necesitan 2:
-            return contadorN
-        #Avanzamos por los hijos que nos permiten seguir buscando negaciones.
-        if hijo.dep_ in ["ccomp","xcomp", "acl","csubj","nsubj"]:
-            contadorN+=bucleHerencia(hijo,valorInicial)
-            if contadorN>=2-valorInicial: #si el primer token es negativo necesito 1 sino se necesitan 2:
-                return contadorN
-            if contadorN <0:
-                return penalizar
-    return contadorN
+})
+CANDIDATOS = frozenset({"VERB", "ADJ", "NOUN"})
+# Dependencias de los hijos que se revisan y, de ellas, por cuáles se sigue bajando
+DEP_BUSQUEDA = frozenset({"ccomp", "xcomp", "acl", "csubj", "advmod", "nsubj", "mark", "obj"})
+DEP_HERENCIA = frozenset({"ccomp", "xcomp", "acl", "csubj", "nsubj"})
+PENALIZAR = -100
+
+
+def valor(doc):
+    negaciones = [negEncontrada(token.lemma_.lower()) for token in doc]
+    conteos = {}  # valorInicial -> conteo heredado por token, calculado una vez por Doc
+    return any(True for _ in _negacionesCompletas(doc, doc, negaciones, conteos))
+
+
+def _negacionesCompletas(doc, tokens, negaciones, conteos):
+    """Genera (token, valorInicial) para cada VERB/ADJ/NOUN de `tokens` con negación compleja."""
+    for token in tokens:
+        if token.pos_ in CANDIDATOS:
+            valorInicial = negaciones[token.i]
+            if valorInicial not in conteos:
+                conteos[valorInicial] = bucleHerencia(doc, negaciones, valorInicial)
+            if valorInicial + conteos[valorInicial][token.i] >= 2:
+                yield token, valorInicial
+
+
+def negacionesPorOracion(doc):
+    """Analiza cada oración del Doc y devuelve si tiene negación compleja, los tokens
+    negativos que la disparan y el alcance (subárbol del núcleo negado) con sus posiciones.
+    """
+    negaciones = [negEncontrada(token.lemma_.lower()) for token in doc]
+    conteos = {}
+    resultados = []
+    for sent in doc.sents:
+        hallazgos = {}  # disparadores -> negación con mayor alcance
+        for nucleo, valorInicial in _negacionesCompletas(doc, sent, negaciones, conteos):
+            disparadores = ([nucleo] if valorInicial else []) + _disparadores(nucleo, negaciones, conteos[valorInicial], 2 - valorInicial)
+            clave = frozenset(t.i for t in disparadores)
+            alcance = doc[nucleo.left_edge.i:nucleo.right_edge.i + 1]
+            previo = hallazgos.get(clave)
+            if previo is None or len(alcance) > len(previo["alcance"]):
+                hallazgos[clave] = {"nucleo": nucleo, "disparadores": disparadores, "alcance": alcance}
+        resultados.append({
+            "oracion": sent.text,
+            "posicion": (sent.start_char, sent.end_char),
+            "negativa_compleja": bool(hallazgos),
+            "negaciones": [
+                {
+                    "nucleo": h["nucleo"].text,
+                    "disparadores": [
+                        {"texto": t.text, "posicion": (t.idx, t.idx + len(t.text))}
+                        for t in sorted(h["disparadores"], key=lambda t: t.i)
+                    ],
+                    "alcance": {
+                        "texto": h["alcance"].text,
+                        "posicion": (h["alcance"].start_char, h["alcance"].end_char),
+                    },
+                }
+                for h in sorted(hallazgos.values(), key=lambda h: h["alcance"].start)
+            ],
+        })
+    return resultados
+
+
+def _disparadores(padre, negaciones, conteos, umbral):
+    """Repite el recorrido de bucleHerencia sobre un núcleo ya detectado para
+    recuperar qué tokens negativos sumaron al conteo."""
+    encontrados = []
+    contadorN = 0
+    for hijo in padre.children:
+        if hijo.dep_ not in DEP_BUSQUEDA:
+            continue
+        if negaciones[hijo.i]:
+            encontrados.append(hijo)
+        contadorN += negaciones[hijo.i]
+        if contadorN >= umbral:
+            break
+        if hijo.dep_ in DEP_HERENCIA:
+            if conteos[hijo.i] > 0:
+                encontrados.extend(_disparadores(hijo, negaciones, conteos, umbral))
+            contadorN += conteos[hijo.i]
+            if contadorN >= umbral:
+                break
+    return encontrados
+
+
+def negEncontrada(palabra):
+    return 1 if palabra in NEGATIVOS else 0
+
+
+def _postorden(doc):
+    """Devuelve los tokens del Doc de modo que cada hijo aparezca antes que su padre."""
+    orden = []
+    pila = [token for token in doc if token.head.i == token.i]
+    while pila:
+        token = pila.pop()
+        orden.append(token)
+        pila.extend(token.children)
+    return reversed(orden)
+
+
+def bucleHerencia(doc, negaciones, valorInicial):
+    """Cuenta las negaciones heredadas de los hijos de cada token del Doc.
+
+    Se recorre el árbol de abajo hacia arriba una sola vez, guardando el conteo de
+    cada subárbol para reutilizarlo desde todos sus ancestros, en lugar de volver
+    a recorrerlo desde cada VERB/ADJ/NOUN.
+    """
+    umbral = 2 - valorInicial  # si el primer token es negativo necesito 1 sino se necesitan 2
+    conteos = [0] * len(doc)
+    for padre in _postorden(doc):
+        contadorN = 0
+        for hijo in padre.children:
+            if hijo.dep_ not in DEP_BUSQUEDA:
+                continue
+            #Verificamos si es un caso de refuerzo negativo.
+            if (hijo.pos_ == "SCONJ" and padre.pos_ != "VERB") or hijo.dep_ == "obj":
+                contadorN = PENALIZAR
+                break
+            contadorN += negaciones[hijo.i]
+            if contadorN >= umbral:
+                break
+            #Avanzamos por los hijos que nos permiten seguir buscando negaciones.
+            if hijo.dep_ in DEP_HERENCIA:
+                contadorN += conteos[hijo.i]
+                if contadorN >= umbral:
+                    break
+                if contadorN < 0:
+                    contadorN = PENALIZAR
+                    break
+        conteos[padre.i] = contadorN
+    return conteos
 
 # Endpoint principal
 @app.post("/negativaCompleja")
-def convertir_texto(entrada: TextoEntrada):
-    return {valor(nlp(entrada.texto))}
+async def convertir_texto(entrada: TextoEntrada):
+    return {valor(await servidor.parse(entrada.texto))}
+
+# Endpoint en lote: procesa todos los textos con nlp.pipe
+@app.post("/negativaCompleja/lote")
+async def convertir_textos(entrada: TextosEntrada):
+    return [valor(doc) for doc in await servidor.pipe(entrada.textos)]
+
+# Endpoint por oración: una sola pasada del modelo para todo el documento
+@app.post("/negativaCompleja/oraciones")
+async def analizar_oraciones(entrada: TextoEntrada):
+    return {"oraciones": negacionesPorOracion(await servidor.parse(entrada.texto))}
 
 # Endpoint de prueba
 @app.get("/")
 def root():
     return {"mensaje": "API de detección de negativa compleja. Usa POST /negativaCompleja"}
 
-# Nuevo endpoint para visualización
+# ---- Visualización con caché ----
+# Las páginas renderizadas se guardan por (hash del texto, página, oraciones por página)
+# en una caché LRU acotada, y el análisis de cada texto en otra, para renderizar otras
+# páginas sin volver a analizarlo. El ETag combina esa misma clave, así que un 304 se
+# responde sin analizar ni renderizar cuando el texto ya está en la caché.
+VISUALIZAR_CACHE_MAX = int(os.environ.get("VISUALIZAR_CACHE_MAX", "256"))
+VISUALIZAR_POR_PAGINA = int(os.environ.get("VISUALIZAR_POR_PAGINA", "5"))
+_analisis_cache = OrderedDict()
+_paginas_cache = OrderedDict()
+_visualizar_lock = Lock()
+
+
+def _leer_cache(cache, clave):
+    with _visualizar_lock:
+        valor = cache.get(clave)
+        if valor is not None:
+            cache.move_to_end(clave)
+    return valor
+
+
+def _guardar_cache(cache, clave, valor):
+    with _visualizar_lock:
+        cache[clave] = valor
+        cache.move_to_end(clave)
+        while len(cache) > VISUALIZAR_CACHE_MAX:
+            cache.popitem(last=False)
+
+
+def _clave_texto(texto):
+    clave = f"{nlp.meta.get('name')}-{nlp.meta.get('version')}|{','.join(nlp.pipe_names)}|{texto}"
+    return hashlib.sha256(clave.encode("utf-8")).hexdigest()
+
+
+def _etag_visualizacion(clave, pagina, por_pagina):
+    return '"' + hashlib.sha256(f"{clave}|{pagina}|{por_pagina}".encode("utf-8")).hexdigest()[:32] + '"'
+
+
+def _coincide_etag(if_none_match, etag):
+    """If-None-Match admite una lista de ETags, débiles (W/"...") o "*" (RFC 9110, 13.1.2)."""
+    if not if_none_match:
+        return False
+    for valor in if_none_match.split(","):
+        valor = valor.strip()
+        if valor == "*" or valor.removeprefix("W/") == etag:
+            return True
+    return False
+
+
+async def _analisis_visualizacion(texto):
+    """Doc del texto, desde la caché o analizándolo; devuelve (clave, doc)."""
+    clave = _clave_texto(texto)
+    doc = _leer_cache(_analisis_cache, clave)
+    metricas.cache("visualizar_analisis", doc is not None)
+    if doc is None:
+        doc = await servidor.parse(texto)
+        _guardar_cache(_analisis_cache, clave, doc)
+    return clave, doc
+
+
+def _renderizar(docs):
+    return displacy.render(docs, style="dep", page=True)
+
+
 @app.get("/visualizar", response_class=HTMLResponse)
-def visualizar(texto: str):
-    doc = nlp(texto)
-    html = displacy.render(doc, style="dep", page=True)
-    return HTMLResponse(content=html)
\ No newline at end of file
+async def visualizar(
+    texto: str,
+    pagina: int = Query(1, ge=1, description="Página de oraciones a mostrar"),
+    por_pagina: int = Query(VISUALIZAR_POR_PAGINA, ge=1, le=50, description="Oraciones por página (una figura por oración)"),
+    if_none_match: Optional[str] = Header(None),
+):
+    clave, doc = await _analisis_visualizacion(texto)
+    oraciones = list(doc.sents)
+    total_paginas = max(1, -(-len(oraciones) // por_pagina))
+    if pagina > total_paginas:
+        raise HTTPException(status_code=404, detail=f"La página {pagina} no existe (total: {total_paginas})")
+
+    etag = _etag_visualizacion(clave, pagina, por_pagina)
+    cabeceras = {"ETag": etag, "X-Pagina": str(pagina), "X-Total-Paginas": str(total_paginas)}
+    if _coincide_etag(if_none_match, etag):
+        return Response(status_code=304, headers=cabeceras)
+
+    clave_pagina = (clave, pagina, por_pagina)
+    html = _leer_cache(_paginas_cache, clave_pagina)
+    metricas.cache("visualizar", html is not None)
+    if html is None:
+        inicio = (pagina - 1) * por_pagina
+        html = await servidor.politica.run(_renderizar, oraciones[inicio:inicio + por_pagina])
+        _guardar_cache(_paginas_cache, clave_pagina, html)
+    return HTMLResponse(content=html, headers=cabeceras)
@@ -0,0 +1,153 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import main
+from main import app, bucleHerencia, negacionesPorOracion, negEncontrada, valor
+
+client = TestClient(app)
+
+TEXTO = "No quiero ir. Nadie vino. El perro corre. Nunca llueve aquí."
+
+
+def test_visualizar_pagina_por_defecto():
+    texto = " ".join(["No quiero ir."] * (main.VISUALIZAR_POR_PAGINA + 1))
+    respuesta = client.get("/visualizar", params={"texto": texto})
+    assert respuesta.status_code == 200
+    # aunque no se pida, el texto largo se pagina: una figura por oración de la primera página
+    assert respuesta.headers["X-Total-Paginas"] == "2"
+    assert respuesta.text.count("<svg") == main.VISUALIZAR_POR_PAGINA
+
+
+def test_visualizar_por_paginas():
+    primera = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 3})
+    segunda = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 3, "pagina": 2})
+    assert primera.status_code == segunda.status_code == 200
+    assert primera.headers["X-Total-Paginas"] == segunda.headers["X-Total-Paginas"] == "2"
+    assert primera.text.count("<svg") == 3 and segunda.text.count("<svg") == 1
+    assert "Nunca" in segunda.text and "Nunca" not in primera.text
+    assert primera.headers["ETag"] != segunda.headers["ETag"]
+
+
+def test_visualizar_304_con_el_mismo_etag():
+    etag = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 2}).headers["ETag"]
+    respuesta = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 2}, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 304
+    assert respuesta.headers["ETag"] == etag
+    # otra página del mismo texto no coincide con ese ETag
+    respuesta = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 2, "pagina": 2}, headers={"If-None-Match": etag})
+    assert respuesta.status_code == 200
+
+
+@pytest.mark.parametrize("if_none_match", ['W/{etag}', '"otro", {etag}', "*"])
+def test_visualizar_304_con_etags_debiles_listas_y_asterisco(if_none_match):
+    etag = client.get("/visualizar", params={"texto": TEXTO}).headers["ETag"]
+    respuesta = client.get("/visualizar", params={"texto": TEXTO}, headers={"If-None-Match": if_none_match.format(etag=etag)})
+    assert respuesta.status_code == 304
+
+
+def test_visualizar_pagina_inexistente():
+    respuesta = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 3, "pagina": 3})
+    assert respuesta.status_code == 404
+    # ni el ETag de una página inexistente ni "*" responden 304
+    clave = main._clave_texto(TEXTO)
+    for if_none_match in (main._etag_visualizacion(clave, 3, 3), "*"):
+        respuesta = client.get("/visualizar", params={"texto": TEXTO, "por_pagina": 3, "pagina": 3}, headers={"If-None-Match": if_none_match})
+        assert respuesta.status_code == 404
+    assert client.get("/visualizar", params={"texto": TEXTO, "pagina": 2}).status_code == 404
+
+
+def test_visualizar_renderiza_cada_pagina_una_vez(monkeypatch):
+    renderizados = []
+    renderizar = main._renderizar
+
+    def contar(docs):
+        renderizados.append(len(docs))
+        return renderizar(docs)
+
+    monkeypatch.setattr(main, "_renderizar", contar)
+    texto = "Tampoco lo vi. Ella no vino. Él sí."
+    primera = client.get("/visualizar", params={"texto": texto, "por_pagina": 2})
+    repetida = client.get("/visualizar", params={"texto": texto, "por_pagina": 2})
+    client.get("/visualizar", params={"texto": texto, "por_pagina": 2, "pagina": 2})
+    assert repetida.text == primera.text
+    assert renderizados == [2, 1]
+
+
+def test_visualizar_analiza_cada_texto_una_vez(monkeypatch):
+    analizados = []
+    parse = main.servidor.parse
+
+    async def contar(texto, **kwargs):
+        analizados.append(texto)
+        return await parse(texto, **kwargs)
+
+    monkeypatch.setattr(main.servidor, "parse", contar)
+    texto = "Jamás lo dije. Ella no come."
+    for pagina in (1, 2, 3):
+        client.get("/visualizar", params={"texto": texto, "por_pagina": 1, "pagina": pagina})
+    client.get("/visualizar", params={"texto": texto})
+    assert analizados == [texto]
+
+
+# Recorrido recursivo anterior a la memorización, como referencia
+def _bucle_recursivo(padre, valorInicial, contadorN=0):
+    for hijo in (h for h in padre.children if h.dep_ in ["ccomp", "xcomp", "acl", "csubj", "advmod", "nsubj", "mark", "obj"]):
+        if (hijo.pos_ == "SCONJ" and padre.pos_ != "VERB") or hijo.dep_ == "obj":
+            return -100
+        contadorN += negEncontrada(hijo.lemma_.lower())
+        if contadorN >= 2 - valorInicial:
+            return contadorN
+        if hijo.dep_ in ["ccomp", "xcomp", "acl", "csubj", "nsubj"]:
+            contadorN += _bucle_recursivo(hijo, valorInicial)
+            if contadorN >= 2 - valorInicial:
+                return contadorN
+            if contadorN < 0:
+                return -100
+    return contadorN
+
+
+def _valor_recursivo(doc):
+    return any(
+        token.pos_ in {"VERB", "ADJ", "NOUN"}
+        and negEncontrada(token.lemma_.lower()) + _bucle_recursivo(token, negEncontrada(token.lemma_.lower())) >= 2
+        for token in doc
+    )
+
+
+NEGACIONES_ANIDADAS = [
+    "No creo que nadie quiera venir.",
+    "Nunca dije que no fuera a negar que nadie lo sabía.",
+    "No es imposible que ninguno de ellos falte.",
+    "Nadie dudaba de que jamás iba a rechazar la propuesta que nunca llegó.",
+    "No quiero que digas que no vas a venir porque nadie te espera.",
+    "Es falso que el informe esté incompleto y que nadie lo revisara.",
+    "El perro que nunca ladra no muerde a nadie.",
+    "Apenas sabía que no había nadie que no quisiera ir.",
+    "Sí quiero ir a la fiesta con mis amigos.",
+]
+
+
+@pytest.mark.parametrize("texto", NEGACIONES_ANIDADAS)
+def test_conteos_iguales_al_recorrido_recursivo(texto):
+    doc = main.nlp(texto)
+    negaciones = [negEncontrada(token.lemma_.lower()) for token in doc]
+    for valorInicial in (0, 1):
+        assert bucleHerencia(doc, negaciones, valorInicial) == [_bucle_recursivo(token, valorInicial) for token in doc]
+    assert valor(doc) == _valor_recursivo(doc)
+
+
+def test_negaciones_por_oracion():
+    texto = "El perro corre. No creo que nadie quiera venir."
+    resultados = negacionesPorOracion(main.nlp(texto))
+    assert [(r["oracion"], r["negativa_compleja"]) for r in resultados] == [
+        ("El perro corre.", False), ("No creo que nadie quiera venir.", True),
+    ]
+    assert all(set(r) == {"oracion", "posicion", "negativa_compleja", "negaciones"} for r in resultados)
+    inicio, fin = resultados[1]["posicion"]
+    assert texto[inicio:fin] == "No creo que nadie quiera venir."
+    negacion = resultados[1]["negaciones"][0]
+    assert [d["texto"] for d in negacion["disparadores"]] == ["No", "nadie"]
+    for disparador in negacion["disparadores"]:
+        assert texto[slice(*disparador["posicion"])] == disparador["texto"]
+    alcance = negacion["alcance"]
+    assert texto[slice(*alcance["posicion"])] == alcance["texto"]
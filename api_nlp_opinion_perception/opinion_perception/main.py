@@ -1,11 +1,19 @@
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from collections import Counter
 import os
-from spacy.matcher import Matcher
-import spacy
+from pydantic import BaseModel, Field
+from typing import List
+from spacy.attrs import LEMMA, LOWER, POS
+from spacy.strings import get_string_id
+from spacy.symbols import DET, NOUN, VERB
+from nlp_common import cache_resultados, ejecucion, modelo, salud
+from nlp_common.metrics import instrumentar
 
 # Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+nlp = modelo.cargar()
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
 
 app = FastAPI(
     title="Detección de oraciones impersonales",
@@ -22,23 +30,26 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+metricas = instrumentar(app, "opinion_perception", nlp)
+ejecucion.instalar(app, politica)
+salud.instalar(app, nlp)
 
 
-matcher = Matcher(nlp.vocab)
+# Procesos para nlp.pipe en el endpoint en lote; solo se usan varios procesos
+# cuando el lote es lo bastante grande para compensar el costo de lanzarlos
+N_PROCESS = int(os.environ.get("OPINION_N_PROCESS", "1"))
+MIN_TEXTOS_MULTIPROCESO = int(os.environ.get("OPINION_MIN_TEXTOS_MULTIPROCESO", "200"))
+BATCH_SIZE = int(os.environ.get("OPINION_BATCH_SIZE", "64"))
 
-#definicion de matchers faltan definir mas matchers para poder eliminar las listas de palabras y que sea independiente de ellas
-pattern_opinion = [
-    {"POS": "VERB"},      # un verbo
-    {"LOWER": "que"}      # seguido de "que" ej: pienso que
-]
-matcher.add("OPINION", [pattern_opinion])
 
-pattern_percepcion = [
-    {"POS": "VERB"},     
-    {"POS": "DET", "OP": "?"},  # puede o no ir un determinante (la, el, un...)
-    {"POS": "NOUN"}      # y después un sustantivo  ej: veo la pelicula
-]
-matcher.add("PERCEPCION", [pattern_percepcion])
+class TextosEntrada(BaseModel):
+    textos: List[str] = Field(..., min_items=1, description="Textos a analizar")
+    solo_agregados: bool = Field(False, description="Devolver solo los conteos por tipo y lema, sin la lista de verbos")
+
+
+# Patrones de detección (evaluados en detectar_opinion_percepcion sobre los atributos del Doc):
+#   OPINION:    un verbo seguido de "que" ej: pienso que
+#   PERCEPCION: un verbo, un determinante opcional (la, el, un...) y un sustantivo ej: veo la pelicula
 
 PALABRAS_OPINION = {
     "gustar", "encantar", "amar", "querer", "disfrutar", "apreciar", "preferir",
@@ -58,42 +69,119 @@ PALABRAS_PERCEPCION = {
     "analizar", "interpretar", "comprender", "entender", "apreciar"
 }
 
-@app.get("/opinion-percepcion/")
-def opinion_percepcion(texto: str):
-    doc = nlp(texto)
+# Léxicos precompilados a ids del vocabulario, para comparar hashes de lemas
+# sin crear cadenas por token (el lematizador devuelve los verbos en minúscula)
+LEMAS_OPINION = frozenset(get_string_id(p) for p in PALABRAS_OPINION)
+LEMAS_PERCEPCION = frozenset(get_string_id(p) for p in PALABRAS_PERCEPCION)
+LOWER_QUE = get_string_id("que")
+
+# Subir al cambiar la lógica de detección; los cambios en los léxicos ya cambian la huella
+VERSION_REGLAS = "1"
+cache = cache_resultados.CacheResultados(
+    "opinion_perception", VERSION_REGLAS, PALABRAS_OPINION, PALABRAS_PERCEPCION, nlp=nlp, metricas=metricas,
+)
+cache_resultados.instalar(app, cache)
+
+
+def detectar_opinion_percepcion(doc):
+    """Detecta verbos de opinión y percepción en una sola pasada sobre los atributos del Doc.
+
+    Aplica los patrones OPINION/PERCEPCION del matcher y la búsqueda en los léxicos sobre
+    `Doc.to_array([POS, LOWER, LEMMA])`; solo se generan cadenas para los verbos detectados.
+    """
+    n = len(doc)
+    pos, lower, lemma = doc.to_array([POS, LOWER, LEMMA]).T.tolist() if n else ([], [], [])
+    coincidencias = []  # (inicio, fin, etiqueta) de los patrones
+    candidatos = []     # (i, tipo) de los verbos que están en algún léxico
+
+    for i in range(n):
+        if pos[i] != VERB:
+            continue
+        # patrones: VERB + "que" -> opinion; VERB + DET? + NOUN -> percepcion
+        if i + 1 < n:
+            if lower[i + 1] == LOWER_QUE:
+                coincidencias.append((i, i + 2, "opinion"))
+            elif pos[i + 1] == NOUN:
+                coincidencias.append((i, i + 2, "percepcion"))
+            elif pos[i + 1] == DET and i + 2 < n and pos[i + 2] == NOUN:
+                coincidencias.append((i, i + 3, "percepcion"))
+        # léxicos
+        tipo = []
+        if lemma[i] in LEMAS_OPINION:
+            tipo.append("opinion")
+        if lemma[i] in LEMAS_PERCEPCION:
+            tipo.append("percepcion")
+        if tipo:
+            candidatos.append((i, "-".join(tipo)))
+
     resultado = []
     detectados = set()
 
-    # detectar por patrones con Matcher
-    for match_id, start, end in matcher(doc):
-        span = doc[start:end]
-        label = nlp.vocab.strings[match_id].lower()  # "opinion" o "percepcion"
-        lema = span.root.lemma_.lower()
-
+    for start, end, label in coincidencias:
+        raiz = doc[start:end].root
+        lema = raiz.lemma_.lower()
         resultado.append({
-            "verbo": span.root.text,   # verbo principal de la frase
+            "verbo": raiz.text,   # verbo principal de la frase
             "tipo": label,
             "lema": lema
         })
-        detectados.add(lema)  # evitar duplicados
-
-    # detectar por listas de palabras
-    for token in doc:
-        if token.pos_ == "VERB":
-            tipo = []
-            lema = token.lemma_.lower()
-            if lema not in detectados:  # evitar duplicados
-                detectados.add(lema)
-                if lema in PALABRAS_OPINION:
-                    tipo.append("opinion")
-                if lema in PALABRAS_PERCEPCION:
-                    tipo.append("percepcion")
-
-                if tipo:
-                    resultado.append({
-                        "verbo": token.text,
-                        "tipo": "-".join(tipo),
-                        "lema": lema
-                    })
-
-    return {"resultado": resultado}
\ No newline at end of file
+        detectados.add(get_string_id(lema))  # evitar duplicados
+
+    for i, tipo in candidatos:
+        if lemma[i] not in detectados:  # evitar duplicados
+            detectados.add(lemma[i])
+            resultado.append({
+                "verbo": doc[i].text,
+                "tipo": tipo,
+                "lema": doc[i].lemma_.lower()
+            })
+
+    return resultado
+
+
+@app.get("/opinion-percepcion/")
+async def opinion_percepcion(texto: str):
+    resultado = await cache.resolver(texto, lambda: politica.run(lambda: detectar_opinion_percepcion(nlp(texto))))
+    return {"resultado": resultado}
+
+
+def perfil(resultado):
+    """Cuenta los verbos detectados por tipo y por lema. Un verbo "opinion-percepcion"
+    suma en ambos tipos."""
+    por_tipo = Counter()
+    por_lema = Counter()
+    for v in resultado:
+        por_tipo.update(v["tipo"].split("-"))
+        por_lema[v["lema"]] += 1
+    return por_tipo, por_lema
+
+
+def detectar_lote(textos: List[str]):
+    """Resultado de `detectar_opinion_percepcion` para cada texto, analizados con `nlp.pipe`."""
+    n_process = N_PROCESS if len(textos) >= MIN_TEXTOS_MULTIPROCESO else 1
+    return [detectar_opinion_percepcion(doc) for doc in nlp.pipe(textos, n_process=n_process, batch_size=BATCH_SIZE)]
+
+
+def agregar(resultados, solo_agregados: bool = False):
+    documentos = []
+    total_tipo = Counter()
+    total_lema = Counter()
+    for resultado in resultados:
+        por_tipo, por_lema = perfil(resultado)
+        total_tipo.update(por_tipo)
+        total_lema.update(por_lema)
+        documento = {"por_tipo": dict(por_tipo), "por_lema": dict(por_lema)}
+        if not solo_agregados:
+            documento["resultado"] = resultado
+        documentos.append(documento)
+    return {
+        "documentos": documentos,
+        "totales": {"por_tipo": dict(total_tipo), "por_lema": dict(total_lema)},
+    }
+
+
+@app.post("/opinion-percepcion/lote")
+async def opinion_percepcion_lote(entrada: TextosEntrada):
+    # solo los textos que no están en la caché pasan por spaCy
+    resultados = await cache.resolver_lote(entrada.textos, lambda faltan: politica.run(detectar_lote, faltan))
+    return agregar(resultados, entrada.solo_agregados)
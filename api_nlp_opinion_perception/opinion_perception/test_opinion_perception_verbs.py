@@ -1,6 +1,6 @@
 import pytest
 from fastapi.testclient import TestClient
-from opinion_perception_verbs import app  
+from main import app
 
 client = TestClient(app)
 
@@ -35,3 +35,20 @@ def test_sin_verbos_relevantes():
     assert response.status_code == 200
     data = response.json()
     assert data["resultado"] == []  # No debería detectar nada
+
+def test_lote_con_agregados():
+    textos = ["Pienso que este método no es el más adecuado", "María vio la película y escuchó la música"]
+    response = client.post("/opinion-percepcion/lote", json={"textos": textos})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data["documentos"]) == 2
+    assert data["documentos"][0]["por_lema"]["pensar"] == 1
+    assert data["documentos"][1]["por_tipo"]["percepcion"] == 2
+    assert data["totales"]["por_tipo"] == {"opinion": 1, "percepcion": 2}
+
+def test_lote_solo_agregados():
+    response = client.post("/opinion-percepcion/lote", json={"textos": ["Creo que llueve"], "solo_agregados": True})
+    assert response.status_code == 200
+    documento = response.json()["documentos"][0]
+    assert "resultado" not in documento
+    assert documento["por_tipo"] == {"opinion": 1}
@@ -2,11 +2,15 @@ from fastapi import FastAPI
 from fastapi.middleware.cors import CORSMiddleware
 import sys
 import pyphen
-import spacy
+from nlp_common import ejecucion, modelo, salud
+from nlp_common.metrics import instrumentar
+from nlp_common.segmentador import segmentar
 
 # Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+nlp = modelo.cargar()
 dic = pyphen.Pyphen(lang='es')
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
 
 app = FastAPI(
     title="Servicio métrica de legibilidad",
@@ -23,6 +27,9 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrumentar(app, "readability_metric", nlp)
+ejecucion.instalar(app, politica)
+salud.instalar(app, nlp)
 max_float = sys.float_info.max
 min_float = -sys.float_info.max
 NIVELES_LEGIBILIDAD = {
@@ -57,7 +64,8 @@ def fernandez_huerta(text):
     """
     cant_palabras = len(text.split())
     cant_silabas = contar_silabas(text)
-    cant_oraciones = text.count('.') + text.count('!') + text.count('?')
+    # oraciones según el segmentador compartido (no cuenta "..." ni "!!" como varias)
+    cant_oraciones = len(segmentar(text))
     silabas_cada_100_palabras = (cant_silabas / cant_palabras) * 100
     if cant_oraciones == 0:
         cant_oraciones = 1
@@ -67,8 +75,8 @@ def fernandez_huerta(text):
     return resultado
 
 @app.get("/metrica-legibilidad/")
-def calcular_legibilidad(texto: str):
-    fernandez_huerta_score = fernandez_huerta(texto)
+async def calcular_legibilidad(texto: str):
+    fernandez_huerta_score = await politica.run(fernandez_huerta, texto)
     nivel = obtener_nivel_legibilidad(fernandez_huerta_score)
     return {
         "Puntaje": fernandez_huerta_score,
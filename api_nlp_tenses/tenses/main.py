@@ -1,12 +1,14 @@
 from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
+from functools import lru_cache
 import os
 from pydantic import BaseModel
-import spacy
 from spacy.matcher import Matcher
+from nlp_common import cache_resultados, metrics, micro_batcher, model_server, modelo, salud, trabajos
 
-# Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+# El modelo de spaCy se carga al preparar el servicio (ver salud.instalar más abajo)
+nlp = modelo.cargar()
+servidor = model_server.ModelServer(nlp)
 
 app = FastAPI(
     title="Servicio de deteccion de tiempos verbales",
@@ -24,9 +26,10 @@ app.add_middleware(
     allow_headers=["*"],
     expose_headers=["*"]
 )
-
-# ------Construccion del matcher ------
-matcher = Matcher(nlp.vocab)
+metricas = metrics.instrumentar(app, "tenses", nlp)
+model_server.instalar(app, servidor)
+# Los pedidos concurrentes se agrupan en un solo nlp.pipe dentro del servidor
+batcher = micro_batcher.MicroBatcher(servidor.pipe, metricas=metricas)
 
 # ---- Patrones para el matcher para verbos compuestos y perífrasis ----
 
@@ -37,7 +40,6 @@ patron_perf_comp = [
     {"POS": {"IN": ["ADV", "PART"]}, "OP": "*"},
     {"MORPH": {"IS_SUPERSET": ["VerbForm=Part"]}},
 ]
-matcher.add("PERFECTO_COMPUESTO", [patron_perf_comp])
 
 
 # Pretérito pluscuamperfecto: haber(Past) + Part
@@ -55,7 +57,6 @@ patron_pluscuam_imp = [
     {"POS": {"IN": ["ADV", "PART", "PRON"]}, "OP": "*"},
     {"MORPH": {"IS_SUPERSET": ["VerbForm=Part"]}},
 ]
-matcher.add("PLUSCUAMPERFECTO", [patron_pluscuam_past, patron_pluscuam_imp])
 
 # Futuro compuesto: haber(Fut) + Part
 patron_fut_comp = [
@@ -63,7 +64,6 @@ patron_fut_comp = [
     {"POS": {"IN": ["ADV", "PART"]}, "OP": "*"},
     {"MORPH": {"IS_SUPERSET": ["VerbForm=Part"]}},
 ]
-matcher.add("FUTURO_COMPUESTO", [patron_fut_comp])
 
 # Futuro perifrástico: ir(Pres) + a + Inf
 patron_fut_peri = [
@@ -71,7 +71,6 @@ patron_fut_peri = [
     {"LOWER": "a"},
     {"MORPH": {"IS_SUPERSET": ["VerbForm=Inf"]}},
 ]
-matcher.add("FUTURO_PERIFRASTICO", [patron_fut_peri])
 
 # Presente progresivo: estar(Pres) + (Adv/Part)* + Ger
 patron_pres_prog = [
@@ -79,7 +78,29 @@ patron_pres_prog = [
     {"POS": {"IN": ["ADV", "PART"]}, "OP": "*"},
     {"MORPH": {"IS_SUPERSET": ["VerbForm=Ger"]}},
 ]
-matcher.add("PRESENTE_PROGRESIVO", [patron_pres_prog])
+
+# ------Construccion del matcher ------
+# Necesita el vocabulario del modelo: se construye al preparar el servicio
+@lru_cache(maxsize=None)
+def crear_matcher() -> Matcher:
+    matcher = Matcher(nlp.vocab)
+    matcher.add("PERFECTO_COMPUESTO", [patron_perf_comp])
+    matcher.add("PLUSCUAMPERFECTO", [patron_pluscuam_past, patron_pluscuam_imp])
+    matcher.add("FUTURO_COMPUESTO", [patron_fut_comp])
+    matcher.add("FUTURO_PERIFRASTICO", [patron_fut_peri])
+    matcher.add("PRESENTE_PROGRESIVO", [patron_pres_prog])
+    return matcher
+
+salud.instalar(app, nlp, preparar=[crear_matcher])
+
+# Subir al cambiar la lógica de detección; los cambios en los patrones ya cambian la huella
+VERSION_REGLAS = "1"
+cache = cache_resultados.CacheResultados(
+    "tenses", VERSION_REGLAS,
+    patron_perf_comp, patron_pluscuam_past, patron_pluscuam_imp, patron_fut_comp, patron_fut_peri, patron_pres_prog,
+    nlp=nlp, metricas=metricas,
+)
+cache_resultados.instalar(app, cache)
 
 
 
@@ -90,7 +111,11 @@ class TextoEntrada(BaseModel):
 
 # -------- Función principal --------
 def detectar_tiempo_verbal(texto: str):
-    doc = nlp(texto)
+    return detectar_tiempo_verbal_doc(nlp(texto))
+
+
+def ocurrencias_tiempo_verbal(doc):
+    """(expresión, tiempo, inicio, fin) de cada verbo detectado, con repetidos."""
     resultados = []
 
     # Tiempos simples con analisis morfológico
@@ -104,32 +129,38 @@ def detectar_tiempo_verbal(texto: str):
                 continue
 
             tense = token.morph.get("Tense")
+            posicion = (token.idx, token.idx + len(token.text))
             if "Past" in tense:
-                resultados.append((token.text, "Pasado simple/Imperfecto"))
+                resultados.append((token.text, "Pasado simple/Imperfecto", *posicion))
             if "Pres" in tense and token.pos_ == "VERB":
-                resultados.append((token.text, "Presente"))
+                resultados.append((token.text, "Presente", *posicion))
             if "Fut" in tense:
-                resultados.append((token.text, "Futuro simple"))
+                resultados.append((token.text, "Futuro simple", *posicion))
 
     # Tiempos compuestos y perífrasis con matcher
-    for match_id, start, end in matcher(doc):
+    for match_id, start, end in crear_matcher()(doc):
         span = doc[start:end]
         label = nlp.vocab.strings[match_id]
+        posicion = (span.start_char, span.end_char)
         if label == "PERFECTO_COMPUESTO":
-            resultados.append((span.text, "Pretérito perfecto compuesto"))
+            resultados.append((span.text, "Pretérito perfecto compuesto", *posicion))
         elif label == "PLUSCUAMPERFECTO":
-            resultados.append((span.text, "Pretérito pluscuamperfecto"))
+            resultados.append((span.text, "Pretérito pluscuamperfecto", *posicion))
         elif label == "FUTURO_COMPUESTO":
-            resultados.append((span.text, "Futuro compuesto"))
+            resultados.append((span.text, "Futuro compuesto", *posicion))
         elif label == "FUTURO_PERIFRASTICO":
-            resultados.append((span.text, "Futuro perifrástico"))
+            resultados.append((span.text, "Futuro perifrástico", *posicion))
         elif label == "PRESENTE_PROGRESIVO":
-            resultados.append((span.text, "Presente progresivo"))
+            resultados.append((span.text, "Presente progresivo", *posicion))
+
+    return resultados
+
 
+def _unicos(ocurrencias):
     # Eliminación de duplicados (mismo verbo por ambos metodos o solapaciones de matcher)
     vistos = set()
     resultados_unicos = []
-    for expr, etq in resultados:
+    for expr, etq, _, _ in ocurrencias:
         clave = (expr, etq)
         if clave not in vistos:
             vistos.add(clave)
@@ -138,9 +169,40 @@ def detectar_tiempo_verbal(texto: str):
     return resultados_unicos or []
 
 
+def detectar_tiempo_verbal_doc(doc):
+    return _unicos(ocurrencias_tiempo_verbal(doc))
+
+
+# -------- Trabajos para documentos grandes --------
+def procesar_fragmento(texto: str, parametros: dict):
+    """Se ejecuta en un worker del gestor de trabajos; las posiciones son relativas al fragmento."""
+    return ocurrencias_tiempo_verbal(nlp(texto))
+
+
+def combinar_fragmentos(partes, parametros: dict):
+    ocurrencias = [
+        (expr, etq, inicio + fragmento.inicio, fin + fragmento.inicio)
+        for fragmento, resultado in partes
+        for expr, etq, inicio, fin in resultado
+    ]
+    return {
+        "tiempos": _unicos(ocurrencias),
+        "ocurrencias": [
+            {"expresion": expr, "tiempo": etq, "posicion": (inicio, fin)}
+            for expr, etq, inicio, fin in sorted(ocurrencias, key=lambda o: (o[2], o[3]))
+        ],
+    }
+
+
+gestor = trabajos.GestorTrabajos("tenses", procesar_fragmento, combinar_fragmentos)
+trabajos.instalar(app, gestor)
+
+
 
 
 
 @app.get("/deteccion_de_verbos/")
-def verificacion(texto: str):
-    return detectar_tiempo_verbal(texto)
\ No newline at end of file
+async def verificacion(texto: str):
+    async def analizar():
+        return detectar_tiempo_verbal_doc(await batcher.parse(texto))
+    return await cache.resolver(texto, analizar)
\ No newline at end of file
@@ -1,19 +1,29 @@
 from fastapi.middleware.cors import CORSMiddleware
+import asyncio
 import spacy
+from nlp_common import ejecucion, modelo, salud, trabajos
+from nlp_common.metrics import instrumentar
+from nlp_common.segmentador import segmentar
 import re
-from typing import List, Dict, Any, Tuple
+from bisect import bisect_right
+from typing import List, Dict, Any, Optional, Tuple
 
 from fastapi import FastAPI, HTTPException
-from pydantic import BaseModel, Field
+from fastapi.responses import ORJSONResponse
+from pydantic import BaseModel, Field, validator
 
 
 
 try:
-    nlp = spacy.load("es_core_news_sm")
+    # Las oraciones vienen del segmentador compartido: el parser de dependencias no hace falta
+    nlp = modelo.cargar(excluir=["parser"], agregar={"segmentador_es": None})
 except OSError:
     print("Modelo 'es_core_news_sm' no encontrado. Por favor, descárgalo con:\npython -m spacy download es_core_news_sm")
     nlp = None
 
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
+
 ERROR_DESCRIPTIONS = {
     # Errores de mayúsculas/minúsculas
     "E001": "Uso incorrecto de mayúsculas después de coma",
@@ -30,6 +40,12 @@ ERROR_DESCRIPTIONS = {
     "E033": "Signo de agrupación de apertura sin su pareja de cierre",
 }    
 
+# Expresiones regulares compiladas una sola vez al importar el módulo
+REPEATED_PATTERN = re.compile(r"([!?,.])\1+")
+SPACE_BEFORE_PATTERN = re.compile(r"\s+([.,!?;:)\}\]\"'])")
+MISSING_SPACE_AFTER_PATTERN = re.compile(r"([.,!?;:)\}\]\"'])(?=[a-zA-ZáéíóúÁÉÍÓÚ0-9])")
+CLAUSE_PATTERN = re.compile(r'(?:^|,\s*)([^,?!]+[?!])')
+
 def _create_error_dict(code: str, span: Tuple[int, int], text: str) -> Dict[str, Any]:
     """Crea un diccionario de error estandarizado."""
     return {
@@ -72,8 +88,7 @@ def find_excessive_punctuation(text: str) -> List[Dict]:
     """
     errors = []
     # detecta 2 o más repeticiones de ! ? , .
-    pattern = re.compile(r"([!?,.])\1+")
-    for match in pattern.finditer(text):
+    for match in REPEATED_PATTERN.finditer(text):
         # se obtiene el texto completo que coincidió con el patrón
         matched_text = match.group(0)        
         # si el texto encontrado es exactamente "...", se ignora y se continúa con la siguiente búsqueda
@@ -88,26 +103,23 @@ def find_spacing_errors(text: str) -> List[Dict]:
     """
     errors = []
     # espacio antes de un signo de puntuación de cierre
-    pattern_before = re.compile(r"\s+([.,!?;:)\}\]\"'])")
-    for match in pattern_before.finditer(text):
+    for match in SPACE_BEFORE_PATTERN.finditer(text):
         errors.append(_create_error_dict("E020", match.span(1), text))
 
     # falta de espacio después de un signo de puntuación, seguido de una letra
-    pattern_after = re.compile(r"([.,!?;:)\}\]\"'])(?=[a-zA-ZáéíóúÁÉÍÓÚ0-9])")
-    for match in pattern_after.finditer(text):
+    for match in MISSING_SPACE_AFTER_PATTERN.finditer(text):
         # excepción para no marcar puntos dentro de números (por ej.: 1.000)
         if match.group(1) == '.' and match.string[match.end()].isdigit():
             continue
         errors.append(_create_error_dict("E021", match.span(1), text))
     return errors
 
-def find_mismatched_punctuation(doc: spacy.tokens.Doc, original_text: str) -> List[Dict]:
+def find_mismatched_punctuation(original_text: str) -> List[Dict]:
     """Detecta la falta de signos de apertura
     para exclamaciones e interrogaciones.
     """
     errors = []
-    pattern = re.compile(r'(?:^|,\s*)([^,?!]+[?!])')
-    for match in pattern.finditer(original_text):
+    for match in CLAUSE_PATTERN.finditer(original_text):
         clause_text = match.group(1).strip()
         clause_span = match.span(1)
         # para exclamaciones, verifica si falta el signo de apertura
@@ -149,21 +161,137 @@ def find_unbalanced_brackets(text: str) -> List[Dict]:
         errors.append(_create_error_dict("E033", (i, i + 1), text))
     return errors
 
-def analyze_punctuation(text: str) -> List[Dict[str, Any]]:
-    """Función principal que orquesta todas las detecciones."""
-    if not nlp:
+# Registro de chequeos: nombre -> (función, necesita el Doc de spaCy).
+# Solo los chequeos que necesitan anotaciones lingüísticas (POS, oraciones)
+# obligan a ejecutar el modelo; el resto trabaja directamente sobre el texto.
+CHECKS = {
+    "mayusculas": (find_incorrect_capitalization, True),
+    "repeticion": (find_excessive_punctuation, False),
+    "espaciado": (find_spacing_errors, False),
+    "apertura": (find_mismatched_punctuation, False),
+    "agrupacion": (find_unbalanced_brackets, False),
+}
+
+def _resolve_checks(checks: Optional[List[str]]) -> Tuple[List[str], bool]:
+    """Valida los chequeos pedidos y devuelve (nombres, necesita_doc)."""
+    if checks is None:
+        checks = list(CHECKS)
+    unknown = [name for name in checks if name not in CHECKS]
+    if unknown:
+        raise ValueError(f"Chequeos desconocidos: {', '.join(unknown)}. Opciones: {', '.join(CHECKS)}")
+    needs_doc = any(CHECKS[name][1] for name in checks)
+    if needs_doc and not nlp:
         raise RuntimeError("El modelo de SpaCy no está cargado.")
+    return checks, needs_doc
 
-    doc = nlp(text)
+def _run_checks(text: str, checks: List[str], doc: Optional[spacy.tokens.Doc]) -> List[Dict[str, Any]]:
+    """Ejecuta los chequeos ya validados sobre un texto (y su Doc, si hace falta)."""
     all_errors = []
+    for name in CHECKS:
+        if name not in checks:
+            continue
+        check, requires_doc = CHECKS[name]
+        all_errors.extend(check(doc, text) if requires_doc else check(text))
+    return sorted(all_errors, key=lambda x: x['posición'][0])
 
-    all_errors.extend(find_incorrect_capitalization(doc, text))
-    all_errors.extend(find_excessive_punctuation(text))
-    all_errors.extend(find_spacing_errors(text))
-    all_errors.extend(find_mismatched_punctuation(doc, text))
-    all_errors.extend(find_unbalanced_brackets(text))
+def analyze_punctuation(text: str, checks: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Función principal que orquesta todas las detecciones.
 
-    return sorted(all_errors, key=lambda x: x['posición'][0])
+    `checks` permite elegir qué chequeos ejecutar (por defecto, todos). El modelo
+    de spaCy solo se ejecuta si alguno de los chequeos elegidos lo necesita.
+    """
+    checks, needs_doc = _resolve_checks(checks)
+    doc = nlp(text) if needs_doc else None
+    return _run_checks(text, checks, doc)
+
+def analyze_punctuation_batch(texts: List[str], checks: Optional[List[str]] = None) -> List[List[Dict[str, Any]]]:
+    """Analiza varios textos de una vez, procesándolos en lote con `nlp.pipe`."""
+    checks, needs_doc = _resolve_checks(checks)
+    docs = nlp.pipe(texts) if needs_doc else (None for _ in texts)
+    return [_run_checks(text, checks, doc) for text, doc in zip(texts, docs)]
+
+# Un párrafo termina en uno o más saltos de línea
+PARAGRAPH_BREAK_PATTERN = re.compile(r"\s*\n\s*")
+
+def _split_paragraphs(text: str) -> List[Tuple[int, int]]:
+    """Devuelve las posiciones (inicio, fin) de cada párrafo no vacío del texto."""
+    spans = []
+    start = 0
+    for match in PARAGRAPH_BREAK_PATTERN.finditer(text):
+        if text[start:match.start()].strip():
+            spans.append((start, match.start()))
+        start = match.end()
+    if text[start:].strip():
+        spans.append((start, len(text)))
+    return spans
+
+def _sentence_starts(text: str) -> List[int]:
+    """Posiciones de inicio de cada oración; son las mismas que marca el componente en el Doc."""
+    return [start for start, _ in segmentar(text)] or [0]
+
+def analyze_document(text: str, checks: Optional[List[str]] = None) -> List[Dict[str, Any]]:
+    """Analiza un documento completo de varios párrafos en una sola llamada.
+
+    Los párrafos se procesan en lote con `nlp.pipe` y cada error se devuelve con
+    su posición absoluta en el documento y los índices de párrafo y de oración.
+    """
+    return _analyze_document(text, checks)[0]
+
+def _analyze_document(text: str, checks: Optional[List[str]]) -> Tuple[List[Dict[str, Any]], List[int]]:
+    """Devuelve los errores del documento y la cantidad de oraciones de cada párrafo."""
+    checks, needs_doc = _resolve_checks(checks)
+    paragraphs = _split_paragraphs(text)
+    paragraph_texts = [text[start:end] for start, end in paragraphs]
+    docs = nlp.pipe(paragraph_texts) if needs_doc else (None for _ in paragraph_texts)
+
+    all_errors = []
+    sentence_counts = []
+    sentence_offset = 0
+    for paragraph_idx, ((offset, _), paragraph, doc) in enumerate(zip(paragraphs, paragraph_texts, docs)):
+        sentence_starts = _sentence_starts(paragraph)
+        for error in _run_checks(paragraph, checks, doc):
+            start, end = error["posición"]
+            error["posición"] = (start + offset, end + offset)
+            error["párrafo"] = paragraph_idx
+            error["oración"] = sentence_offset + max(bisect_right(sentence_starts, start) - 1, 0)
+            all_errors.append(error)
+        sentence_offset += len(sentence_starts)
+        sentence_counts.append(len(sentence_starts))
+    return all_errors, sentence_counts
+
+# ---- Trabajos para documentos grandes ----
+class DocumentJobParams(BaseModel):
+    checks: Optional[List[str]] = None
+
+    @validator("checks")
+    def _known_checks(cls, checks):
+        if checks is not None:
+            _resolve_checks(checks)
+        return checks
+
+def process_document_chunk(text: str, params: dict) -> Dict[str, Any]:
+    """Se ejecuta en un worker del gestor de trabajos; las posiciones son relativas al fragmento."""
+    errors, sentence_counts = _analyze_document(text, params["checks"])
+    return {"errors": errors, "sentences": sentence_counts}
+
+def merge_document_chunks(parts, params: dict) -> List[Dict[str, Any]]:
+    """Une los errores de los fragmentos con posiciones e índices de párrafo y oración del documento."""
+    all_errors = []
+    paragraph_offset = 0
+    sentence_offset = 0
+    for chunk, result in parts:
+        # un párrafo partido entre dos fragmentos cuenta una sola vez
+        if chunk.continua:
+            paragraph_offset -= 1
+        for error in result["errors"]:
+            start, end = error["posición"]
+            error["posición"] = (start + chunk.inicio, end + chunk.inicio)
+            error["párrafo"] += paragraph_offset
+            error["oración"] += sentence_offset
+            all_errors.append(error)
+        paragraph_offset += len(result["sentences"])
+        sentence_offset += sum(result["sentences"])
+    return all_errors
 
 
 app = FastAPI(
@@ -179,17 +307,35 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrumentar(app, "unusual_punctuation", nlp)
+ejecucion.instalar(app, politica)
+salud.instalar(app, nlp)
+gestor = trabajos.GestorTrabajos("unusual_punctuation", process_document_chunk, merge_document_chunks, DocumentJobParams)
+trabajos.instalar(app, gestor)
 
 
 
 class SentenceInput(BaseModel):
     sentence: str = Field(..., min_length=1, example="hola, esto es una prueba!! (y creo que va a funcionar.", description="La oración que se desea analizar.")
+    checks: Optional[List[str]] = Field(None, example=["repeticion", "espaciado"], description="Chequeos a ejecutar (por defecto, todos). Los chequeos de caracteres no cargan el modelo de spaCy.")
+
+class BatchInput(BaseModel):
+    sentences: List[str] = Field(..., min_items=1, example=["hola, esto es una prueba!!", "Todo bien?"], description="Las oraciones que se desean analizar.")
+    checks: Optional[List[str]] = Field(None, description="Chequeos a ejecutar (por defecto, todos).")
+
+class DocumentInput(BaseModel):
+    text: str = Field(..., min_length=1, example="Primer párrafo ,con error.\n\nsegundo párrafo!!", description="El documento completo, con uno o más párrafos.")
+    checks: Optional[List[str]] = Field(None, description="Chequeos a ejecutar (por defecto, todos).")
 
 class PunctuationError(BaseModel):
     posición: tuple[int, int]
     texto: str
     descripción: str
 
+class DocumentPunctuationError(PunctuationError):
+    párrafo: int
+    oración: int
+
 # Endpoint de prueba
 @app.get("/")
 def root():
@@ -199,12 +345,53 @@ def root():
 @app.post("/detectar-puntuacion", 
             response_model=List[PunctuationError],
             summary="Detecta puntuación inusual en una oración")
-def detect_punctuation(input_data: SentenceInput):
+async def detect_punctuation(input_data: SentenceInput):
     """
     Analiza una oración en busca de errores de puntuación y devuelve una lista de los errores encontrados.
     """
     try:
-        errors = analyze_punctuation(input_data.sentence)
+        errors = await politica.run(analyze_punctuation, input_data.sentence, input_data.checks)
         return errors
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ejecucion.ServidorSaturado, asyncio.TimeoutError):
+        # la política los traduce a 503 y 504
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+# Las respuestas en lote se serializan directamente con orjson, sin pasar por
+# la validación de pydantic, porque las listas de errores pueden ser grandes.
+@app.post("/detectar-puntuacion/lote",
+            response_model=List[List[PunctuationError]],
+            summary="Detecta puntuación inusual en varias oraciones")
+async def detect_punctuation_batch(input_data: BatchInput):
+    """
+    Analiza una lista de oraciones en una sola llamada y devuelve, en el mismo orden, la lista de errores de cada una.
+    """
+    try:
+        return ORJSONResponse(await politica.run(analyze_punctuation_batch, input_data.sentences, input_data.checks))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ejecucion.ServidorSaturado, asyncio.TimeoutError):
+        # la política los traduce a 503 y 504
+        raise
+    except Exception as e:
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/detectar-puntuacion/documento",
+            response_model=List[DocumentPunctuationError],
+            summary="Detecta puntuación inusual en un documento completo")
+async def detect_punctuation_document(input_data: DocumentInput):
+    """
+    Analiza un documento de varios párrafos y devuelve los errores con posiciones absolutas e índices de párrafo y oración.
+    """
+    try:
+        return ORJSONResponse(await politica.run(analyze_document, input_data.text, input_data.checks))
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    except (ejecucion.ServidorSaturado, asyncio.TimeoutError):
+        # la política los traduce a 503 y 504
+        raise
     except Exception as e:
-        raise HTTPException(status_code=500, detail=str(e))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(e))
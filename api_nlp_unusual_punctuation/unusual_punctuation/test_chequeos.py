@@ -0,0 +1,46 @@
+from fastapi.testclient import TestClient
+
+import main
+from main import CHECKS, analyze_punctuation, analyze_punctuation_batch, app
+
+client = TestClient(app)
+
+
+def test_solo_chequeos_de_caracteres():
+    """Prueba que el parámetro checks limite los chequeos ejecutados."""
+    payload = {"sentence": "hola, Qué tal?? (esto es una prueba .adiós", "checks": ["repeticion"]}
+    response = client.post("/detectar-puntuacion", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    # Solo debe detectar la puntuación excesiva, sin errores de mayúsculas
+    assert len(data) == 1
+    assert data[0]["texto"] == "??"
+
+
+def test_chequeo_desconocido():
+    """Prueba que un chequeo inexistente devuelva un error 400."""
+    payload = {"sentence": "Hola.", "checks": ["inexistente"]}
+    response = client.post("/detectar-puntuacion", json=payload)
+    assert response.status_code == 400
+
+
+def test_lote_de_oraciones():
+    """Prueba que el endpoint en lote devuelva los errores de cada oración en orden."""
+    payload = {"sentences": ["hola, Y adiós.", "Ayuda!!! Esto es importante..."], "checks": ["repeticion"]}
+    response = client.post("/detectar-puntuacion/lote", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 2
+    assert data[0] == []
+    assert data[1][0]["texto"] == "!!!"
+
+
+def test_chequeos_de_caracteres_sin_ejecutar_el_modelo(monkeypatch):
+    """Prueba que solo los chequeos registrados como lingüísticos ejecuten spaCy."""
+    def sin_modelo(*args, **kwargs):
+        raise AssertionError("no debería ejecutarse el modelo")
+
+    monkeypatch.setattr(main, "nlp", type("SinModelo", (), {"__call__": sin_modelo, "pipe": sin_modelo})())
+    de_caracteres = [nombre for nombre, (_, necesita_doc) in CHECKS.items() if not necesita_doc]
+    assert analyze_punctuation("Hola!! ,mundo", de_caracteres)
+    assert len(analyze_punctuation_batch(["Hola!!", "Bien."], de_caracteres)) == 2
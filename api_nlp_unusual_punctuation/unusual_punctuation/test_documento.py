@@ -0,0 +1,34 @@
+from fastapi.testclient import TestClient
+
+from main import analyze_document, app
+
+client = TestClient(app)
+
+
+def test_documento_con_posiciones_absolutas():
+    """Prueba que el modo documento devuelva posiciones absolutas e índices de párrafo y oración."""
+    texto = "Primer párrafo bien escrito.\n\nSegundo párrafo. Con error!!"
+    payload = {"text": texto, "checks": ["repeticion"]}
+    response = client.post("/detectar-puntuacion/documento", json=payload)
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data) == 1
+    inicio, fin = data[0]["posición"]
+    assert texto[inicio:fin] == "!!"
+    assert data[0]["párrafo"] == 1
+    assert data[0]["oración"] == 2
+
+
+def test_documento_con_chequeos_que_usan_el_modelo():
+    """Prueba que los índices de oración sigan contando entre párrafos cuando se ejecuta spaCy."""
+    texto = "Primer párrafo. segunda oración.\n\nOtro párrafo. y otra más!!"
+    errores = analyze_document(texto, ["mayusculas", "repeticion"])
+    assert [(texto[slice(*e["posición"])], e["párrafo"], e["oración"]) for e in errores] == [
+        ("segunda", 0, 1), ("y", 1, 3), ("!!", 1, 3),
+    ]
+
+
+def test_documento_vacio_y_chequeo_desconocido():
+    assert analyze_document("\n\n") == []
+    assert client.post("/detectar-puntuacion/documento", json={"text": ""}).status_code == 422
+    assert client.post("/detectar-puntuacion/documento", json={"text": "Hola.", "checks": ["x"]}).status_code == 400
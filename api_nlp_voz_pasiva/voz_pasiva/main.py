@@ -2,10 +2,17 @@ from fastapi import FastAPI, Query
 from fastapi.middleware.cors import CORSMiddleware
 import os
 from pydantic import BaseModel
-import spacy
+from typing import Any, Dict, List
+from bisect import bisect_right
+from nlp_common import ejecucion, modelo, salud
+from nlp_common.metrics import instrumentar
+import nlp_common.segmentador  # registra el componente segmentador_es
 
 # Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+# Límites de oración comunes a todos los servicios; el parser los respeta
+nlp = modelo.cargar(agregar={"segmentador_es": "parser"})
+# El análisis corre en un executor acotado, fuera del event loop
+politica = ejecucion.PoliticaEjecucion()
 
 app = FastAPI(
     title="Servicio de Voz pasiva",
@@ -22,12 +29,32 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+instrumentar(app, "voz_pasiva", nlp)
+ejecucion.instalar(app, politica)
+salud.instalar(app, nlp)
 # Modelo de entrada
 class TextoEntrada(BaseModel):
     texto: str
 
-def convertir_pasiva_a_activa(texto: str) -> str:
-    doc = nlp(texto)
+class TextosEntrada(BaseModel):
+    textos: List[str]
+
+def _es_por(t):
+    return t.dep_ == "case" and t.lemma_ == "por"
+
+
+def _pasivas(doc, requiere_agente=True):
+    """Genera las pasivas perifrásticas del Doc como (participio, aux, sujeto, por, agente).
+
+    Los hijos de cada token se indexan una sola vez, de modo que el auxiliar, el sujeto
+    paciente y el complemento agente se buscan entre los hijos del participio en lugar
+    de recorrer todo el documento por cada verbo. Con `requiere_agente=False` también se
+    generan las pasivas sin complemento agente (con por y agente en None).
+    """
+    hijos = [[] for _ in range(len(doc))]
+    for t in doc:
+        if t.head.i != t.i:
+            hijos[t.head.i].append(t)
 
     for token in doc:
         # 1) Verbo en participio
@@ -35,51 +62,183 @@ def convertir_pasiva_a_activa(texto: str) -> str:
             continue
 
         # 2) Auxiliar hijo (ser/estar en pasado)
-        aux = next(
-            (c for c in token.children
-             if c.dep_ == "aux" and c.lemma_ in {"ser", "estar"}),
-            None
-        )
+        aux = next((c for c in hijos[token.i] if c.dep_ == "aux" and c.lemma_ in {"ser", "estar"}), None)
         if not aux:
             continue
 
         # 3) Sujeto paciente (hijo con dep_ nsubj)
-        subj = next(
-            (c for c in token.children
-             if c.dep_ == "nsubj"),
-            None
-        )
+        subj = next((c for c in hijos[token.i] if c.dep_ == "nsubj"), None)
         if not subj:
             continue
 
-        # 4) Complemento agente: "por" es marcador case
-        por = next(
-            (t for t in doc
-             if t.dep_ == "case" and t.lemma_ == "por"),
-            None
-        )
-        if not por:
+        # 4) Complemento agente: hijo del participio (obl:agent o introducido por "por")
+        agente_nodo, por = None, None
+        for c in hijos[token.i]:
+            por = next((h for h in hijos[c.i] if _es_por(h)), None)
+            if por is not None or c.dep_ == "obl:agent":
+                agente_nodo = c
+                break
+        if agente_nodo is None and requiere_agente:
             continue
 
-        # 5) El head de "por" es el sustantivo agente
-        agente_nodo = por.head
-        agentes = [t.text for t in agente_nodo.subtree if not (t.dep_ == "case" and t.lemma_ == "por")]
-        agente = " ".join(agentes).strip()
+        yield token, aux, subj, por, agente_nodo
+
+
+def _texto(tokens) -> str:
+    """Texto de los tokens con los espacios del original."""
+    return "".join(t.text_with_ws for t in tokens).strip()
+
+
+def _texto_agente(agente_nodo):
+    # sin el "por" ni la puntuación que lo precede ("..., por el equipo")
+    return _texto(t for t in agente_nodo.subtree if not _es_por(t) and not t.is_punct)
+
+
+def _es_relativo(subj) -> bool:
+    """El sujeto es un pronombre relativo ("la casa, que fue construida por...")."""
+    return "Rel" in subj.morph.get("PronType")
+
+
+def _texto_sujeto(subj, inicio_oracion: bool) -> str:
+    """El sujeto paciente; al pasar al final de la oración, su primera palabra va en minúscula
+    salvo que sea un nombre propio."""
+    fin = subj.right_edge.i
+    # sin la puntuación que cierra una aposición o una relativa ("la casa, que ..., fue")
+    while fin > subj.i and subj.doc[fin].is_punct:
+        fin -= 1
+    sujeto = subj.doc[subj.left_edge.i:fin + 1]
+    texto = sujeto.text
+    if inicio_oracion and sujeto[0].pos_ != "PROPN":
+        texto = texto[0].lower() + texto[1:]
+    return texto
+
+
+def _partes_clausula(token, aux, subj, agente_nodo):
+    """Índices de los tokens que forman la cláusula pasiva: sujeto, auxiliar, participio y agente."""
+    partes = {t.i for t in subj.subtree} | {aux.i, token.i}
+    if agente_nodo is not None:
+        partes |= {t.i for t in agente_nodo.subtree}
+    return partes
+
+
+def _posicion(span):
+    return {"texto": span.text, "posicion": (span.start_char, span.end_char)}
+
+
+def detectar_pasivas(doc) -> Dict[str, Any]:
+    """Localiza las pasivas perifrásticas del Doc sin reescribirlas.
+
+    Devuelve las posiciones de cada cláusula y de su auxiliar, participio, sujeto y agente
+    (si lo hay), y la proporción de oraciones del documento que contienen una pasiva.
+    """
+    inicios_oraciones = [sent.start for sent in doc.sents]
+    oraciones_pasivas = set()
+    pasivas = []
+    for token, aux, subj, por, agente_nodo in _pasivas(doc, requiere_agente=False):
+        partes = _partes_clausula(token, aux, subj, agente_nodo)
+        pasivas.append({
+            "clausula": _posicion(doc[min(partes):max(partes) + 1]),
+            "auxiliar": _posicion(doc[aux.i:aux.i + 1]),
+            "participio": _posicion(doc[token.i:token.i + 1]),
+            "sujeto": _posicion(doc[subj.left_edge.i:subj.right_edge.i + 1]),
+            "agente": _posicion(doc[agente_nodo.left_edge.i:agente_nodo.right_edge.i + 1]) if agente_nodo is not None else None,
+        })
+        oraciones_pasivas.add(bisect_right(inicios_oraciones, token.i))
+    return {
+        "pasivas": pasivas,
+        "oraciones": len(inicios_oraciones),
+        "proporcion_pasiva": len(oraciones_pasivas) / len(inicios_oraciones) if inicios_oraciones else 0.0,
+    }
+
+
+def convertir_pasiva_a_activa(texto: str) -> str:
+    doc = nlp(texto)
+
+    for token, aux, subj, por, agente_nodo in _pasivas(doc):
+        # 5) El agente es el subárbol del nodo agente, sin el "por"
+        agente = _texto_agente(agente_nodo)
         if not agente:
             continue
 
         # 6) Reconstruimos la activa
-        return f"{agente.capitalize()} {token.lemma_} {subj.text.lower()}."
+        objeto = subj.text if subj.pos_ == "PROPN" else subj.text.lower()
+        return f"{agente[0].upper() + agente[1:]} {token.lemma_} {objeto}."
 
     # Si no hay pasiva explícita
     return texto
 
+
+def convertir_documento(texto: str) -> Dict[str, Any]:
+    """Convierte a voz activa todas las pasivas perifrásticas del documento con un solo parseo.
+
+    Cada cláusula pasiva (sujeto, auxiliar, participio y agente) se reescribe en su lugar
+    como "agente + verbo + resto + sujeto"; el resto del texto se conserva tal cual.
+    Devuelve el documento reescrito y la lista de cambios con posiciones en el original.
+    """
+    doc = nlp(texto)
+    clausulas = []
+    for token, aux, subj, por, agente_nodo in _pasivas(doc):
+        agente = _texto_agente(agente_nodo)
+        if agente:
+            partes = _partes_clausula(token, aux, subj, agente_nodo)
+            clausulas.append((min(partes), max(partes) + 1, partes, token, subj, agente))
+
+    # Las pasivas anidadas (por ejemplo, una relativa dentro del sujeto de otra pasiva) se
+    # superponen: se reescribe la cláusula exterior y las de adentro quedan como están
+    elegidas = []
+    for clausula in sorted(clausulas, key=lambda c: c[0] - c[1]):
+        if all(clausula[1] <= otra[0] or otra[1] <= clausula[0] for otra in elegidas):
+            elegidas.append(clausula)
+
+    cambios = []
+    for inicio, fin, partes, token, subj, agente in sorted(elegidas, key=lambda c: c[0]):
+        resto = _texto(t for t in doc[inicio:fin] if t.i not in partes)
+        inicio_oracion = inicio == doc[inicio].sent.start
+        if _es_relativo(subj):
+            # el pronombre relativo sigue encabezando la cláusula: "que mi abuelo construir"
+            orden = [subj.text, agente, token.lemma_, resto]
+        else:
+            if inicio_oracion:
+                agente = agente[0].upper() + agente[1:]
+            orden = [agente, token.lemma_, resto, _texto_sujeto(subj, inicio_oracion)]
+        span = doc[inicio:fin]
+        cambios.append({
+            "posicion": (span.start_char, span.end_char),
+            "original": span.text,
+            "reemplazo": " ".join(p for p in orden if p),
+        })
+
+    partes_texto = []
+    anterior = 0
+    for cambio in cambios:
+        inicio, fin = cambio["posicion"]
+        partes_texto.append(texto[anterior:inicio])
+        partes_texto.append(cambio["reemplazo"])
+        anterior = fin
+    partes_texto.append(texto[anterior:])
+    return {"activa": "".join(partes_texto), "cambios": cambios}
+
 # Endpoint principal
 @app.post("/convertir")
-def convertir_texto(entrada: TextoEntrada):
-    activa = convertir_pasiva_a_activa(entrada.texto)
+async def convertir_texto(entrada: TextoEntrada):
+    activa = await politica.run(convertir_pasiva_a_activa, entrada.texto)
     return {"original": entrada.texto, "activa": activa}
 
+# Modo documento: reescribe todas las pasivas y devuelve la lista de cambios
+@app.post("/convertir/documento")
+async def convertir_documento_endpoint(entrada: TextoEntrada):
+    resultado = await politica.run(convertir_documento, entrada.texto)
+    return {"original": entrada.texto, **resultado}
+
+# Solo detección: posiciones de las pasivas, sin reescribir el texto
+@app.post("/detectar-pasiva")
+async def detectar_pasiva(entrada: TextoEntrada):
+    return await politica.run(lambda: detectar_pasivas(nlp(entrada.texto)))
+
+@app.post("/detectar-pasiva/lote")
+async def detectar_pasiva_lote(entrada: TextosEntrada):
+    return await politica.run(lambda: [detectar_pasivas(doc) for doc in nlp.pipe(entrada.textos)])
+
 # Endpoint de prueba
 @app.get("/")
 def root():
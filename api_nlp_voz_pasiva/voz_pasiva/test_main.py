@@ -0,0 +1,87 @@
+import pytest
+from fastapi.testclient import TestClient
+
+from main import app, convertir_documento, detectar_pasivas, nlp
+
+client = TestClient(app)
+
+
+@pytest.mark.parametrize("texto, esperado", [
+    ("El informe fue redactado por el comité.", "El comité redactar el informe."),
+    # el agente va después de una coma: sin la coma y sin espacios de más en el resto
+    ("El informe fue revisado ayer, con cuidado, por el equipo.", "El equipo revisar ayer, con cuidado el informe."),
+    # los nombres propios conservan la mayúscula al pasar al final
+    ("María fue vista por Juan.", "Juan ver María."),
+    ("Ayer la casa fue vendida por el banco, dijo Ana.", "Ayer el banco vender la casa, dijo Ana."),
+    # en una relativa, el pronombre sigue al frente de la cláusula
+    ("La casa, que fue construida por mi abuelo, es bonita.", "La casa, que mi abuelo construir, es bonita."),
+    # pasiva anidada en el sujeto de otra: se reescribe la exterior y la de adentro queda igual
+    ("La casa, que fue construida por mi abuelo, fue vendida por mis tíos.",
+     "Mis tíos vender la casa, que fue construida por mi abuelo."),
+])
+def test_convertir_documento(texto, esperado):
+    assert convertir_documento(texto)["activa"] == esperado
+
+
+def test_convertir_una_oracion():
+    respuesta = client.post("/convertir", json={"texto": "María fue vista por Juan."})
+    assert respuesta.json() == {"original": "María fue vista por Juan.", "activa": "Juan ver María."}
+
+
+def test_cambios_con_posiciones_en_el_original():
+    texto = "Hoy llueve. El informe fue revisado ayer, con cuidado, por el equipo."
+    cambios = client.post("/convertir/documento", json={"texto": texto}).json()["cambios"]
+    assert len(cambios) == 1
+    inicio, fin = cambios[0]["posicion"]
+    assert texto[inicio:fin] == cambios[0]["original"] == "El informe fue revisado ayer, con cuidado, por el equipo"
+
+
+def _textos(texto, pasiva):
+    """Texto de cada parte de la pasiva, recortado del original con su posición."""
+    partes = {}
+    for parte, valor in pasiva.items():
+        if valor is not None:
+            inicio, fin = valor["posicion"]
+            assert texto[inicio:fin] == valor["texto"]
+        partes[parte] = valor and valor["texto"]
+    return partes
+
+
+def test_detectar_pasivas_con_y_sin_agente():
+    texto = "El informe fue redactado por el comité. La casa fue vendida ayer. Hoy llueve."
+    resultado = detectar_pasivas(nlp(texto))
+    assert [_textos(texto, p) for p in resultado["pasivas"]] == [
+        {"clausula": "El informe fue redactado por el comité", "auxiliar": "fue", "participio": "redactado",
+         "sujeto": "El informe", "agente": "por el comité"},
+        {"clausula": "La casa fue vendida", "auxiliar": "fue", "participio": "vendida",
+         "sujeto": "La casa", "agente": None},
+    ]
+    assert resultado["oraciones"] == 3
+    assert resultado["proporcion_pasiva"] == pytest.approx(2 / 3)
+
+
+def test_detectar_pasiva_sin_pasivas():
+    respuesta = client.post("/detectar-pasiva", json={"texto": "Hoy llueve en la ciudad."})
+    assert respuesta.json() == {"pasivas": [], "oraciones": 1, "proporcion_pasiva": 0.0}
+
+
+def test_detectar_pasiva_en_lote_conserva_el_orden():
+    textos = ["Hoy llueve.", "La casa fue vendida.", "El libro fue escrito por Ana.", ""]
+    respuesta = client.post("/detectar-pasiva/lote", json={"textos": textos})
+    assert respuesta.status_code == 200
+    resultados = respuesta.json()
+    assert len(resultados) == len(textos)
+    assert [[p["sujeto"]["texto"] for p in r["pasivas"]] for r in resultados] == [[], ["La casa"], ["El libro"], []]
+    assert resultados[2]["pasivas"][0]["agente"]["texto"] == "por Ana"
+    assert resultados[3] == {"pasivas": [], "oraciones": 0, "proporcion_pasiva": 0.0}
+    # cada resultado es el mismo que se obtiene analizando el texto por separado
+    for texto, resultado in zip(textos, resultados):
+        assert resultado == client.post("/detectar-pasiva", json={"texto": texto}).json()
+
+
+def test_pasivas_anidadas_un_solo_cambio():
+    texto = "La casa, que fue construida por mi abuelo, fue vendida por mis tíos."
+    cambios = convertir_documento(texto)["cambios"]
+    assert [c["original"] for c in cambios] == ["La casa, que fue construida por mi abuelo, fue vendida por mis tíos"]
+    # la detección sigue informando las dos
+    assert len(detectar_pasivas(nlp(texto))["pasivas"]) == 2
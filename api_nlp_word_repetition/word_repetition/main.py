@@ -4,14 +4,15 @@ from fastapi import FastAPI
 from fastapi.params import Query
 from pydantic import BaseModel
 from collections import Counter
-import spacy
 from spacy.tokens import Token
 from fastapi import Request
 from fastapi.responses import JSONResponse
+from nlp_common import metrics, micro_batcher, model_server, modelo, salud, trabajos
 
 
 # Cargamos el modelo de spaCy
-nlp = spacy.load("es_core_news_sm")
+nlp = modelo.cargar()
+servidor = model_server.ModelServer(nlp)
 
 # Modelo de entrada
 app = FastAPI(title="Detección de repetición de palabras", version="1.0")
@@ -24,6 +25,11 @@ app.add_middleware(
     allow_methods=["*"],
     allow_headers=["*"],
 )
+metricas = metrics.instrumentar(app, "word_repetition", nlp)
+model_server.instalar(app, servidor)
+# Los pedidos concurrentes se agrupan en un solo nlp.pipe dentro del servidor
+batcher = micro_batcher.MicroBatcher(servidor.pipe, metricas=metricas)
+salud.instalar(app, nlp)
 
 
 
@@ -69,14 +75,28 @@ def _normalizar_token(
     return token.text.lower()
 
 
+def _palabras_normalizadas(
+        doc,
+        sin_palabras_frecuentes: bool,
+        con_sustantivos_en_singular: bool) -> list[tuple[str, Token]]:
+    return [
+        (palabra, token)
+        for token in doc
+        if (palabra := _normalizar_token(token, sin_palabras_frecuentes, con_sustantivos_en_singular))
+           is not None
+    ]
+
+
 def _clave_alfabetica_sin_tildes(palabra: str) -> str:
     base = unicodedata.normalize("NFD", palabra)
     sin_tildes = "".join(ch for ch in base if not unicodedata.combining(ch))
     return sin_tildes.lower()
 
 def _contar_palabras_repetidas(palabras: list[str]) -> dict[str, int]:
-    contador_de_palabras = Counter(palabras)
+    return _repetidas(Counter(palabras))
+
 
+def _repetidas(contador_de_palabras: Counter) -> dict[str, int]:
     resultado = {
         palabra: cantidad_de_apariciones
         for palabra, cantidad_de_apariciones in contador_de_palabras.items()
@@ -106,18 +126,47 @@ async def detectar(
         False, description="Llevar sustantivos plurales a singular"
     )
 ):
-    doc = nlp(entrada.texto)
-    tokens = [token for token in doc]
-
+    doc = await batcher.parse(entrada.texto)
     palabras = [
         palabra
-        for token in tokens
-        if (palabra := _normalizar_token(token, sin_palabras_frecuentes, con_sustantivos_en_singular))
-           is not None
+        for palabra, _ in _palabras_normalizadas(doc, sin_palabras_frecuentes, con_sustantivos_en_singular)
     ]
 
     return _contar_palabras_repetidas(palabras)
 
+
+# -------- Trabajos para documentos grandes --------
+class ParametrosRepeticion(BaseModel):
+    sin_palabras_frecuentes: bool = False
+    con_sustantivos_en_singular: bool = False
+
+
+def procesar_fragmento(texto: str, parametros: dict):
+    """Se ejecuta en un worker del gestor de trabajos: (palabra, inicio, fin) de cada palabra del fragmento.
+
+    Usa la misma normalización que POST /repeticiones, así los conteos coinciden.
+    """
+    palabras = _palabras_normalizadas(
+        nlp(texto), parametros["sin_palabras_frecuentes"], parametros["con_sustantivos_en_singular"]
+    )
+    return [(palabra, token.idx, token.idx + len(token.text)) for palabra, token in palabras]
+
+
+def combinar_fragmentos(partes, parametros: dict):
+    posiciones = {}
+    for fragmento, resultado in partes:
+        for palabra, inicio, fin in resultado:
+            posiciones.setdefault(palabra, []).append((inicio + fragmento.inicio, fin + fragmento.inicio))
+    repeticiones = _repetidas(Counter({palabra: len(p) for palabra, p in posiciones.items()}))
+    return {
+        "repeticiones": repeticiones,
+        "posiciones": {palabra: posiciones[palabra] for palabra in repeticiones},
+    }
+
+
+gestor = trabajos.GestorTrabajos("word_repetition", procesar_fragmento, combinar_fragmentos, ParametrosRepeticion)
+trabajos.instalar(app, gestor)
+
 # Endpoint de prueba
 @app.get("/")
 def root():
@@ -0,0 +1,8 @@
+"""Benchmarks de rendimiento de los servicios api_nlp_*.
+
+Uso, desde la raíz del repositorio:
+
+    python -m benchmarks.run --salida resultados.json
+    python -m benchmarks.run --servicios tenses negative_phrase --tamanos oracion parrafo
+    python -m benchmarks.comparar base.json resultados.json
+"""
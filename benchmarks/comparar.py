@@ -0,0 +1,66 @@
+"""Compara dos archivos de resultados de `benchmarks.run`.
+
+    python -m benchmarks.comparar base.json nuevo.json --umbral 10
+
+Muestra la mediana (p50), el p99 y el pico de memoria de cada servicio en ambos
+archivos y sale con código 1 si alguna mediana empeoró más que el umbral (en %).
+"""
+import argparse
+import json
+import sys
+from typing import Any, Dict, List, Optional
+
+
+def _cargar(ruta: str) -> Dict[str, Any]:
+    with open(ruta, encoding="utf-8") as f:
+        return json.load(f)
+
+
+def _variacion(base: float, nuevo: float) -> float:
+    return (nuevo - base) / base * 100 if base else 0.0
+
+
+def comparar(base: Dict[str, Any], nuevo: Dict[str, Any], umbral: float) -> List[str]:
+    """Imprime la comparación y devuelve las mediciones cuya mediana empeoró más que `umbral`."""
+    if base["metadatos"].get("corpus") != nuevo["metadatos"].get("corpus"):
+        print("Aviso: los corpus medidos no coinciden; las comparaciones pueden no ser válidas.")
+    print(f"base:  {base['metadatos'].get('commit')}\nnuevo: {nuevo['metadatos'].get('commit')}\n")
+    print(f"{'medición':<48} {'p50 base':>10} {'p50 nuevo':>10} {'Δ%':>8} {'p99 base':>10} {'p99 nuevo':>10}")
+
+    regresiones = []
+    for servicio, datos in sorted(nuevo["servicios"].items()):
+        previos = base["servicios"].get(servicio)
+        if previos is None or "error" in previos or "error" in datos:
+            continue
+        for modo in ("directo", "asgi", "asgi_lote"):
+            for tamano, medicion in datos.get(modo, {}).items():
+                anterior = previos.get(modo, {}).get(tamano)
+                if anterior is None:
+                    continue
+                delta = _variacion(anterior["p50_ms"], medicion["p50_ms"])
+                nombre = f"{servicio}/{modo}/{tamano}"
+                marca = " !" if delta > umbral else ""
+                print(f"{nombre:<48} {anterior['p50_ms']:>10.2f} {medicion['p50_ms']:>10.2f} {delta:>+8.1f} "
+                      f"{anterior['p99_ms']:>10.2f} {medicion['p99_ms']:>10.2f}{marca}")
+                if delta > umbral:
+                    regresiones.append(nombre)
+        delta_rss = _variacion(previos["rss_pico_mb"], datos["rss_pico_mb"])
+        print(f"{servicio + '/rss_pico_mb':<48} {previos['rss_pico_mb']:>10.1f} {datos['rss_pico_mb']:>10.1f} {delta_rss:>+8.1f}")
+    return regresiones
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Compara dos resultados de benchmarks")
+    parser.add_argument("base")
+    parser.add_argument("nuevo")
+    parser.add_argument("--umbral", type=float, default=10.0, help="Empeoramiento de la mediana tolerado, en %%")
+    args = parser.parse_args(argv)
+
+    regresiones = comparar(_cargar(args.base), _cargar(args.nuevo), args.umbral)
+    if regresiones:
+        print(f"\n{len(regresiones)} mediciones empeoraron más de {args.umbral}%.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
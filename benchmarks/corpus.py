@@ -0,0 +1,68 @@
+"""Corpus fijo en español para los benchmarks, en varios tamaños.
+
+Todo se genera de forma determinística a partir de ORACIONES, de modo que dos
+ejecuciones (en commits distintos) miden exactamente los mismos textos.
+"""
+from typing import Dict, List
+
+# Oraciones variadas que ejercitan las reglas de los distintos servicios:
+# pasivas, negaciones, impersonales, conectores, tiempos verbales y puntuación.
+ORACIONES = [
+    "La casa fue construida por los obreros del pueblo durante el verano.",
+    "No creo que nadie haya entendido la propuesta del director.",
+    "Se venden coches usados en ese local del centro.",
+    "Hay muchas opciones disponibles para los estudiantes nuevos.",
+    "Es necesario presentar la documentación antes del viernes.",
+    "Sin embargo, el equipo decidió continuar con el proyecto.",
+    "Pienso que este método no es el más adecuado para el problema.",
+    "María vio la película y escuchó la música con atención.",
+    "Mañana vamos a visitar a mis abuelos en la montaña.",
+    "He comido demasiado y ahora estoy descansando en el sofá.",
+    "hola, Qué tal?? (esto es una prueba .adiós",
+    "La libertad y la justicia son valores esenciales de la democracia.",
+    "Por lo tanto, los resultados fueron publicados por la universidad.",
+    "Nunca dije que fuera imposible terminar el trabajo a tiempo.",
+    "Hace frío esta mañana, así que llevaremos abrigo.",
+    "El informe había sido revisado por tres expertos independientes.",
+    "Quiero un sistema fácil de usar y que sea seguro.",
+    "Los niños jugaban en el parque mientras sus padres conversaban.",
+    "Además, la empresa contratará a cincuenta personas el próximo año.",
+    "¿Cuándo llegará el tren de Madrid? ¡Ya son las diez!",
+    "En conclusión, la felicidad depende de pequeñas decisiones diarias.",
+    "No vi a nadie en la calle cuando salí de la oficina.",
+    "Se dice que el museo estará cerrado durante el invierno.",
+    "El perro del vecino ladró toda la noche y no pudimos dormir.",
+]
+
+ORACIONES_POR_PARRAFO = 5
+PALABRAS_DOCUMENTO = 10_000
+DOCUMENTOS_LOTE = 1_000
+
+
+def parrafo(i: int = 0) -> str:
+    """Párrafo de ORACIONES_POR_PARRAFO oraciones, empezando por la oración i (rotando)."""
+    n = len(ORACIONES)
+    return " ".join(ORACIONES[(i + k) % n] for k in range(ORACIONES_POR_PARRAFO))
+
+
+def documento(palabras: int = PALABRAS_DOCUMENTO) -> str:
+    """Documento de al menos `palabras` palabras, en párrafos separados por línea en blanco."""
+    parrafos = []
+    total = 0
+    i = 0
+    while total < palabras:
+        p = parrafo(i)
+        parrafos.append(p)
+        total += len(p.split())
+        i += 1
+    return "\n\n".join(parrafos)
+
+
+def corpus() -> Dict[str, List[str]]:
+    """Textos de cada tamaño: una oración, un párrafo, un documento largo y un lote de documentos."""
+    return {
+        "oracion": [ORACIONES[0]],
+        "parrafo": [parrafo(0)],
+        "documento": [documento()],
+        "lote": [parrafo(i) for i in range(DOCUMENTOS_LOTE)],
+    }
@@ -0,0 +1,235 @@
+"""Ejecuta los benchmarks y guarda los resultados en JSON.
+
+Cada servicio se mide en un subproceso propio: todos los servicios se llaman
+`main`, y así el pico de memoria (RSS) que se informa es el de ese servicio solo.
+Dentro del subproceso se mide, para cada tamaño del corpus:
+
+  - "directo": la función principal del servicio, llamada en el mismo proceso.
+  - "asgi": el pedido HTTP equivalente contra la app, en proceso (TestClient),
+    incluyendo validación, middlewares y serialización.
+  - "asgi_lote": para el tamaño "lote", un único pedido al endpoint de lote del
+    servicio, si lo tiene.
+
+Cada medición hace una llamada de calentamiento que no se cuenta. Con las
+repeticiones por defecto la corrida completa tarda varios minutos (abstract_words
+es el más lento); `--tamanos` y `--repeticiones` permiten corridas más cortas.
+
+    python -m benchmarks.run --salida base.json
+    python -m benchmarks.run --servicios tenses --tamanos oracion parrafo --salida nuevo.json
+    python -m benchmarks.comparar base.json nuevo.json
+"""
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import subprocess
+import sys
+import tempfile
+from datetime import datetime, timezone
+from time import perf_counter
+from typing import Any, Callable, Dict, List, Optional
+
+from benchmarks.corpus import corpus
+from benchmarks.servicios import SERVICIOS
+
+RAIZ = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Llamadas medidas por tamaño; en "lote" cada llamada es un documento distinto del lote
+REPETICIONES = {"oracion": 200, "parrafo": 50, "documento": 3, "lote": 1000}
+TAMANOS = list(REPETICIONES)
+
+
+def percentil(valores: List[float], p: float) -> float:
+    """Percentil `p` (0-100) con interpolación lineal entre los valores ordenados."""
+    ordenados = sorted(valores)
+    if not ordenados:
+        return 0.0
+    k = (len(ordenados) - 1) * p / 100
+    i = int(k)
+    if i + 1 >= len(ordenados):
+        return ordenados[-1]
+    return ordenados[i] + (ordenados[i + 1] - ordenados[i]) * (k - i)
+
+
+def resumir(latencias: List[float], palabras: int, errores: int = 0) -> Dict[str, Any]:
+    """Resume las latencias (en segundos) en milisegundos y calcula el rendimiento."""
+    total = sum(latencias)
+    return {
+        "n": len(latencias),
+        "errores": errores,
+        "media_ms": total / len(latencias) * 1000 if latencias else 0.0,
+        "p50_ms": percentil(latencias, 50) * 1000,
+        "p90_ms": percentil(latencias, 90) * 1000,
+        "p99_ms": percentil(latencias, 99) * 1000,
+        "max_ms": max(latencias, default=0.0) * 1000,
+        "llamadas_por_s": len(latencias) / total if total else 0.0,
+        "palabras_por_s": palabras / total if total else 0.0,
+    }
+
+
+def _rss_pico_mb() -> float:
+    pico = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # Linux informa kilobytes; macOS, bytes
+    return pico / (1024 * 1024) if sys.platform == "darwin" else pico / 1024
+
+
+def medir(llamar: Callable[[str], bool], textos: List[str], repeticiones: int) -> Dict[str, Any]:
+    """Llama `repeticiones` veces recorriendo `textos` en orden. `llamar` devuelve False si falló."""
+    llamar(textos[0])
+    latencias = []
+    errores = 0
+    palabras = 0
+    for i in range(repeticiones):
+        texto = textos[i % len(textos)]
+        inicio = perf_counter()
+        ok = llamar(texto)
+        latencias.append(perf_counter() - inicio)
+        errores += not ok
+        palabras += len(texto.split())
+    return resumir(latencias, palabras, errores)
+
+
+def medir_servicio(nombre: str, tamanos: List[str], repeticiones: Dict[str, int]) -> Dict[str, Any]:
+    """Importa el servicio en este proceso y lo mide. Se ejecuta dentro del subproceso."""
+    from fastapi.testclient import TestClient
+
+    servicio = SERVICIOS[nombre]
+    carpeta = os.path.join(RAIZ, servicio.carpeta)
+    sys.path.insert(0, carpeta)
+    os.chdir(carpeta)
+
+    textos = corpus()
+    # algunos servicios imprimen en stdout por cada llamada; no se mide eso
+    silencio = contextlib.redirect_stdout(io.StringIO())
+
+    inicio = perf_counter()
+    with silencio:
+        import main as modulo
+    resultado: Dict[str, Any] = {
+        "carga_s": perf_counter() - inicio,
+        "rss_pico_carga_mb": _rss_pico_mb(),
+        "directo": {},
+        "asgi": {},
+    }
+
+    def directo(texto: str) -> bool:
+        with contextlib.redirect_stdout(io.StringIO()):
+            servicio.directo(modulo, texto)
+        return True
+
+    for tamano in tamanos:
+        resultado["directo"][tamano] = medir(directo, textos[tamano], repeticiones[tamano])
+
+    with TestClient(modulo.app) as cliente:
+        def asgi(texto: str) -> bool:
+            metodo, ruta, kwargs = servicio.peticion(texto)
+            with contextlib.redirect_stdout(io.StringIO()):
+                respuesta = cliente.request(metodo, ruta, **kwargs)
+            return respuesta.status_code == 200
+
+        for tamano in tamanos:
+            resultado["asgi"][tamano] = medir(asgi, textos[tamano], repeticiones[tamano])
+
+        if servicio.lote is not None and "lote" in tamanos:
+            lote = textos["lote"][:repeticiones["lote"]]
+            metodo, ruta, kwargs = servicio.lote(lote)
+
+            def asgi_lote(_texto: str) -> bool:
+                with contextlib.redirect_stdout(io.StringIO()):
+                    respuesta = cliente.request(metodo, ruta, **kwargs)
+                return respuesta.status_code == 200
+
+            medicion = medir(asgi_lote, [""], 1)
+            # un único pedido: el rendimiento se expresa por documento del lote
+            medicion["documentos"] = len(lote)
+            medicion["llamadas_por_s"] *= len(lote)
+            medicion["palabras_por_s"] = sum(len(t.split()) for t in lote) / (medicion["media_ms"] / 1000)
+            resultado["asgi_lote"] = {"lote": medicion}
+
+    resultado["rss_pico_mb"] = _rss_pico_mb()
+    return resultado
+
+
+def _commit() -> Optional[str]:
+    try:
+        commit = subprocess.run(["git", "rev-parse", "HEAD"], cwd=RAIZ, capture_output=True, text=True, check=True).stdout.strip()
+        cambios = subprocess.run(["git", "status", "--porcelain", "--untracked-files=no"], cwd=RAIZ,
+                                 capture_output=True, text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return commit + ("-modificado" if cambios else "")
+
+
+def _metadatos(tamanos: List[str], repeticiones: Dict[str, int]) -> Dict[str, Any]:
+    try:
+        import spacy
+        version_spacy = spacy.__version__
+    except ImportError:
+        version_spacy = None
+    textos = corpus()
+    return {
+        "commit": _commit(),
+        "fecha": datetime.now(timezone.utc).isoformat(timespec="seconds"),
+        "python": platform.python_version(),
+        "plataforma": platform.platform(),
+        "cpus": os.cpu_count(),
+        "spacy": version_spacy,
+        "corpus": {t: {"textos": len(textos[t]), "palabras": sum(len(x.split()) for x in textos[t])} for t in tamanos},
+        "repeticiones": {t: repeticiones[t] for t in tamanos},
+        # la configuración de los servicios cambia los resultados
+        "entorno": {k: v for k, v in sorted(os.environ.items()) if k.startswith(("NLP_", "OPINION_", "IMPERSONAL_", "VISUALIZAR_"))},
+    }
+
+
+def _ejecutar_en_subproceso(nombre: str, tamanos: List[str], repeticiones: Dict[str, int]) -> Dict[str, Any]:
+    with tempfile.TemporaryDirectory() as tmp:
+        salida = os.path.join(tmp, "resultado.json")
+        entorno = dict(os.environ)
+        entorno["PYTHONPATH"] = os.pathsep.join(filter(None, [RAIZ, entorno.get("PYTHONPATH")]))
+        # se mide el análisis: sin caché de resultados (salvo que se pida) ni archivos en la carpeta del servicio
+        entorno.setdefault("NLP_CACHE_MEMORIA", "0")
+        entorno.setdefault("NLP_TRABAJOS_DB", os.path.join(tmp, "trabajos.sqlite3"))
+        comando = [sys.executable, "-m", "benchmarks.run", "--worker", nombre, "--salida", salida,
+                   "--tamanos", *tamanos, "--repeticiones", json.dumps(repeticiones)]
+        proceso = subprocess.run(comando, cwd=RAIZ, env=entorno, capture_output=True, text=True)
+        if proceso.returncode != 0:
+            return {"error": proceso.stderr.strip().splitlines()[-1:] or [f"código de salida {proceso.returncode}"]}
+        with open(salida, encoding="utf-8") as f:
+            return json.load(f)
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Benchmarks de los servicios api_nlp_*")
+    parser.add_argument("--servicios", nargs="+", choices=sorted(SERVICIOS), default=sorted(SERVICIOS))
+    parser.add_argument("--tamanos", nargs="+", choices=TAMANOS, default=TAMANOS)
+    parser.add_argument("--repeticiones", type=json.loads, default={},
+                        help='JSON con repeticiones por tamaño, por ejemplo \'{"oracion": 20}\'')
+    parser.add_argument("--salida", default="resultados_benchmark.json")
+    parser.add_argument("--worker", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    repeticiones = {**REPETICIONES, **args.repeticiones}
+
+    if args.worker:
+        resultado = medir_servicio(args.worker, args.tamanos, repeticiones)
+        with open(args.salida, "w", encoding="utf-8") as f:
+            json.dump(resultado, f)
+        return
+
+    resultados = {"metadatos": _metadatos(args.tamanos, repeticiones), "servicios": {}}
+    for nombre in args.servicios:
+        print(f"{nombre}...", file=sys.stderr, flush=True)
+        resultados["servicios"][nombre] = _ejecutar_en_subproceso(nombre, args.tamanos, repeticiones)
+        if "error" in resultados["servicios"][nombre]:
+            print(f"  error: {resultados['servicios'][nombre]['error']}", file=sys.stderr)
+
+    with open(args.salida, "w", encoding="utf-8") as f:
+        json.dump(resultados, f, ensure_ascii=False, indent=2)
+    print(f"Resultados en {args.salida}", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""Registro de los servicios a medir.
+
+Para cada servicio se indica su carpeta, cómo llamar a su función principal con el
+módulo `main` ya importado, y cómo armar el pedido HTTP equivalente (y, si tiene,
+el pedido a su endpoint de lote).
+"""
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple
+
+Peticion = Tuple[str, str, Dict[str, Any]]  # (método, ruta, kwargs del cliente)
+
+
+class Servicio(NamedTuple):
+    carpeta: str
+    directo: Callable[[Any, str], Any]
+    peticion: Callable[[str], Peticion]
+    lote: Optional[Callable[[List[str]], Peticion]] = None
+
+
+def _get(ruta: str) -> Callable[[str], Peticion]:
+    return lambda texto: ("GET", ruta, {"params": {"texto": texto}})
+
+
+def _post(ruta: str, campo: str = "texto") -> Callable[[str], Peticion]:
+    return lambda texto: ("POST", ruta, {"json": {campo: texto}})
+
+
+def _post_lote(ruta: str, campo: str = "textos") -> Callable[[List[str]], Peticion]:
+    return lambda textos: ("POST", ruta, {"json": {campo: textos}})
+
+
+def _repeticiones(m, texto):
+    palabras = [p for t in m.nlp(texto) if (p := m._normalizar_token(t, False, False)) is not None]
+    return m._contar_palabras_repetidas(palabras)
+
+
+SERVICIOS: Dict[str, Servicio] = {
+    "abstract_words": Servicio(
+        "api_nlp_abstract_words/abstract_words",
+        lambda m, t: m.detectar_abstractas(t),
+        _get("/abstractas/"),
+    ),
+    "cliche_detector": Servicio(
+        "api_nlp_cliche_detector/cliche_detector",
+        lambda m, t: m.detectar_cliches(t, m.lemas_del_catalogo(), m.lematizador),
+        _post("/detectar_cliches/"),
+    ),
+    "impersonal_sentences": Servicio(
+        "api_nlp_impersonal_sentences/impersonal_sentences",
+        lambda m, t: m.detectar_impersonal_spacy(t),
+        _post("/detectar"),
+        _post_lote("/detectar/batch"),
+    ),
+    "invertir_texto": Servicio(
+        "api_nlp_invertir_texto/invertir_texto",
+        lambda m, t: m.invertir_texto(t),
+        _get("/invertir_texto/"),
+    ),
+    "logical_connectors": Servicio(
+        "api_nlp_logical_connectors/logical_connectors",
+        lambda m, t: m.encontrar_conectores_spacy(t, m.conectores_comunes),
+        _get("/conectores-logicos/"),
+    ),
+    "negative_phrase": Servicio(
+        "api_nlp_negative_phrase/negative_phrase",
+        lambda m, t: m.valor(m.nlp(t)),
+        _post("/negativaCompleja"),
+        _post_lote("/negativaCompleja/lote"),
+    ),
+    "opinion_perception": Servicio(
+        "api_nlp_opinion_perception/opinion_perception",
+        lambda m, t: m.detectar_opinion_percepcion(m.nlp(t)),
+        _get("/opinion-percepcion/"),
+        _post_lote("/opinion-percepcion/lote"),
+    ),
+    "readability_metric": Servicio(
+        "api_nlp_readability_metric/readability_metric",
+        lambda m, t: m.fernandez_huerta(t),
+        _get("/metrica-legibilidad/"),
+    ),
+    "tenses": Servicio(
+        "api_nlp_tenses/tenses",
+        lambda m, t: m.detectar_tiempo_verbal(t),
+        _get("/deteccion_de_verbos/"),
+    ),
+    "unusual_punctuation": Servicio(
+        "api_nlp_unusual_punctuation/unusual_punctuation",
+        lambda m, t: m.analyze_punctuation(t),
+        _post("/detectar-puntuacion", "sentence"),
+        _post_lote("/detectar-puntuacion/lote", "sentences"),
+    ),
+    "voz_pasiva": Servicio(
+        "api_nlp_voz_pasiva/voz_pasiva",
+        lambda m, t: m.convertir_pasiva_a_activa(t),
+        _post("/convertir"),
+        _post_lote("/detectar-pasiva/lote"),
+    ),
+    "word_repetition": Servicio(
+        "api_nlp_word_repetition/word_repetition",
+        _repeticiones,
+        _post("/repeticiones"),
+    ),
+}
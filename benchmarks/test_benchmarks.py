@@ -0,0 +1,27 @@
+from benchmarks.comparar import comparar
+from benchmarks.corpus import DOCUMENTOS_LOTE, PALABRAS_DOCUMENTO, corpus
+from benchmarks.run import percentil, resumir
+
+
+def test_corpus_es_determinista_y_tiene_los_tamanos_pedidos():
+    textos = corpus()
+    assert textos == corpus()
+    assert len(textos["documento"][0].split()) >= PALABRAS_DOCUMENTO
+    assert len(textos["lote"]) == DOCUMENTOS_LOTE
+
+
+def test_percentil_interpola():
+    assert percentil([1, 2, 3, 4], 50) == 2.5
+    assert percentil([5], 99) == 5
+    assert percentil([], 50) == 0.0
+
+
+def test_comparar_detecta_regresiones():
+    def resultado(p50):
+        return {
+            "metadatos": {"corpus": {}},
+            "servicios": {"tenses": {"directo": {"oracion": resumir([p50 / 1000], 10)}, "asgi": {}, "rss_pico_mb": 100.0}},
+        }
+
+    assert comparar(resultado(10), resultado(10.5), umbral=10) == []
+    assert comparar(resultado(10), resultado(12), umbral=10) == ["tenses/directo/oracion"]
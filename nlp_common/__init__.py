@@ -0,0 +1,7 @@
+"""Utilidades compartidas por los servicios api_nlp_*.
+
+Los servicios importan este paquete como `nlp_common`, por lo que la raíz del
+repositorio debe estar en el PYTHONPATH al levantarlos, por ejemplo:
+
+    PYTHONPATH=../.. uvicorn main:app
+"""
@@ -0,0 +1,238 @@
+"""Caché de resultados de análisis, en memoria y en SQLite.
+
+Un texto ya analizado se responde sin volver a ejecutar spaCy. La clave combina
+el servicio, la huella de sus reglas, la versión del modelo, las opciones del
+pedido y el hash del texto:
+
+    cache = CacheResultados("opinion_perception", PALABRAS_OPINION, PALABRAS_PERCEPCION,
+                            nlp=nlp, metricas=metricas)
+
+    @app.get("/...")
+    async def endpoint(texto: str, modo: str):
+        return await cache.resolver(texto, lambda: politica.run(analizar, texto, modo), modo=modo)
+
+Las reglas (listas de palabras, patrones del matcher, umbrales o una cadena de
+versión para cambios de lógica) se hashean al iniciar: si cambian, cambia la
+clave y las entradas anteriores dejan de usarse; las del disco se borran al
+arrancar. Los resultados se guardan como JSON, así que deben poder serializarse.
+
+Configuración por variables de entorno:
+  - NLP_CACHE_DB: archivo SQLite para guardar los resultados entre reinicios (sin
+    indicar o vacío, solo memoria). Varios servicios pueden compartirlo.
+  - NLP_CACHE_MEMORIA: entradas en memoria (LRU; 0 = sin caché en memoria).
+  - NLP_CACHE_MAX: entradas máximas en el disco; se descartan las usadas hace más tiempo.
+  - NLP_CACHE_TTL: segundos de validez de cada entrada (0 = sin vencimiento).
+"""
+import asyncio
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional
+
+if TYPE_CHECKING:
+    from fastapi import FastAPI
+    from spacy.language import Language
+
+    from nlp_common.metrics import Metricas
+
+# Cada cuántas escrituras se podan las entradas vencidas o sobrantes del disco
+_PODAR_CADA = 256
+
+
+def _json_estable(objeto):
+    # los conjuntos no tienen orden: se ordenan para que la huella no dependa del proceso
+    if isinstance(objeto, (set, frozenset)):
+        return sorted(objeto, key=repr)
+    raise TypeError(f"La huella solo admite datos (listas, diccionarios, conjuntos, textos, números), no {type(objeto).__name__}")
+
+
+def huella(*reglas) -> str:
+    """Hash estable de las reglas de un servicio."""
+    datos = json.dumps(reglas, sort_keys=True, ensure_ascii=False, default=_json_estable)
+    return hashlib.sha256(datos.encode("utf-8")).hexdigest()[:16]
+
+
+def version_modelo(nlp: "Language") -> str:
+    return f"{nlp.meta['lang']}_{nlp.meta['name']}-{nlp.meta['version']}:{','.join(nlp.pipe_names)}"
+
+
+class _Disco:
+    def __init__(self, ruta: str, servicio: str, version: str, max_entradas: int, ttl: float):
+        self.servicio = servicio
+        self.version = version
+        self.max_entradas = max_entradas
+        self.ttl = ttl
+        self._escrituras = 0
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript("""
+                CREATE TABLE IF NOT EXISTS resultados (
+                    clave TEXT PRIMARY KEY, servicio TEXT NOT NULL, version TEXT NOT NULL,
+                    valor TEXT NOT NULL, creado REAL NOT NULL, usado REAL NOT NULL
+                );
+                CREATE INDEX IF NOT EXISTS resultados_usado ON resultados (usado);
+            """)
+            # entradas de reglas o modelos anteriores: ya no se pueden pedir
+            self._conexion.execute("DELETE FROM resultados WHERE servicio = ? AND version != ?", (servicio, version))
+        self.podar()
+
+    def _vigente_desde(self) -> float:
+        return time.time() - self.ttl if self.ttl > 0 else float("-inf")
+
+    def obtener(self, claves: List[str]) -> Dict[str, str]:
+        encontrados = {}
+        desde = self._vigente_desde()
+        with self._lock:
+            # de a partes, por el límite de parámetros de SQLite
+            for i in range(0, len(claves), 500):
+                parte = claves[i:i + 500]
+                marcas = ",".join("?" * len(parte))
+                encontrados.update(self._conexion.execute(
+                    f"SELECT clave, valor FROM resultados WHERE clave IN ({marcas}) AND creado >= ?", (*parte, desde),
+                ).fetchall())
+            if encontrados:
+                self._conexion.executemany(
+                    "UPDATE resultados SET usado = ? WHERE clave = ?", [(time.time(), c) for c in encontrados],
+                )
+        return encontrados
+
+    def guardar(self, valores: Dict[str, str]):
+        ahora = time.time()
+        with self._lock:
+            self._conexion.executemany(
+                "INSERT OR REPLACE INTO resultados (clave, servicio, version, valor, creado, usado) VALUES (?, ?, ?, ?, ?, ?)",
+                [(clave, self.servicio, self.version, valor, ahora, ahora) for clave, valor in valores.items()],
+            )
+            self._escrituras += len(valores)
+            podar = self._escrituras >= _PODAR_CADA
+        if podar:
+            self.podar()
+
+    def podar(self):
+        """Borra las entradas vencidas y, si sobran, las usadas hace más tiempo."""
+        with self._lock:
+            self._escrituras = 0
+            if self.ttl > 0:
+                self._conexion.execute("DELETE FROM resultados WHERE creado < ?", (self._vigente_desde(),))
+            sobrantes = self._conexion.execute("SELECT COUNT(*) FROM resultados").fetchone()[0] - self.max_entradas
+            if sobrantes > 0:
+                self._conexion.execute(
+                    "DELETE FROM resultados WHERE clave IN (SELECT clave FROM resultados ORDER BY usado LIMIT ?)", (sobrantes,),
+                )
+
+    def close(self):
+        with self._lock:
+            self._conexion.close()
+
+
+class CacheResultados:
+    def __init__(self, servicio: str, *reglas, nlp: Optional["Language"] = None, ruta: Optional[str] = None,
+                 max_memoria: Optional[int] = None, max_disco: Optional[int] = None, ttl: Optional[float] = None,
+                 metricas: Optional["Metricas"] = None):
+        self.servicio = servicio
+        self.version = huella(servicio, version_modelo(nlp) if nlp is not None else None, *reglas)
+        self.max_memoria = max_memoria if max_memoria is not None else int(os.environ.get("NLP_CACHE_MEMORIA", "1024"))
+        self.ttl = ttl if ttl is not None else float(os.environ.get("NLP_CACHE_TTL", str(7 * 24 * 3600)))
+        self.metricas = metricas
+        self._memoria = OrderedDict()  # clave -> (valor JSON, creado)
+        self._lock = threading.Lock()
+        ruta = ruta if ruta is not None else os.environ.get("NLP_CACHE_DB", "")
+        max_disco = max_disco if max_disco is not None else int(os.environ.get("NLP_CACHE_MAX", "100000"))
+        self._disco = _Disco(ruta, servicio, self.version, max_disco, self.ttl) if ruta else None
+
+    def clave(self, texto: str, **opciones) -> str:
+        h = hashlib.sha256(f"{self.version}|{json.dumps(opciones, sort_keys=True)}|".encode("utf-8"))
+        h.update(texto.encode("utf-8", "surrogatepass"))
+        return h.hexdigest()
+
+    def _de_memoria(self, clave: str) -> Optional[str]:
+        with self._lock:
+            entrada = self._memoria.get(clave)
+            if entrada is None:
+                return None
+            valor, creado = entrada
+            if self.ttl > 0 and time.time() - creado > self.ttl:
+                del self._memoria[clave]
+                return None
+            self._memoria.move_to_end(clave)
+            return valor
+
+    def _a_memoria(self, clave: str, valor: str):
+        if self.max_memoria <= 0:
+            return
+        with self._lock:
+            self._memoria[clave] = (valor, time.time())
+            self._memoria.move_to_end(clave)
+            while len(self._memoria) > self.max_memoria:
+                self._memoria.popitem(last=False)
+
+    def _contar(self, aciertos: int, fallos: int):
+        if self.metricas is None:
+            return
+        for _ in range(aciertos):
+            self.metricas.cache("resultados", True)
+        for _ in range(fallos):
+            self.metricas.cache("resultados", False)
+
+    async def _buscar(self, claves: List[str]) -> Dict[str, str]:
+        encontrados = {}
+        for clave in claves:
+            valor = self._de_memoria(clave)
+            if valor is not None:
+                encontrados[clave] = valor
+        faltan = [c for c in claves if c not in encontrados]
+        if faltan and self._disco is not None:
+            del_disco = await asyncio.to_thread(self._disco.obtener, faltan)
+            for clave, valor in del_disco.items():
+                self._a_memoria(clave, valor)
+            encontrados.update(del_disco)
+        return encontrados
+
+    async def _guardar(self, resultados: Dict[str, Any]):
+        valores = {clave: json.dumps(resultado, ensure_ascii=False) for clave, resultado in resultados.items()}
+        for clave, valor in valores.items():
+            self._a_memoria(clave, valor)
+        if self._disco is not None:
+            await asyncio.to_thread(self._disco.guardar, valores)
+
+    async def resolver(self, texto: str, calcular: Callable[[], Awaitable[Any]], **opciones) -> Any:
+        """Devuelve el resultado guardado para el texto, o lo calcula con `calcular()` y lo guarda."""
+        clave = self.clave(texto, **opciones)
+        encontrado = (await self._buscar([clave])).get(clave)
+        self._contar(encontrado is not None, encontrado is None)
+        if encontrado is not None:
+            return json.loads(encontrado)
+        resultado = await calcular()
+        await self._guardar({clave: resultado})
+        return resultado
+
+    async def resolver_lote(self, textos: List[str], calcular: Callable[[List[str]], Awaitable[List[Any]]],
+                            **opciones) -> List[Any]:
+        """Como `resolver`, para varios textos: solo los que faltan (sin repetir) se envían juntos a `calcular`."""
+        claves = [self.clave(texto, **opciones) for texto in textos]
+        encontrados = await self._buscar(list(dict.fromkeys(claves)))
+        resultados = {clave: json.loads(valor) for clave, valor in encontrados.items()}
+        faltan = {clave: texto for clave, texto in zip(claves, textos) if clave not in encontrados}
+        fallos = sum(clave in faltan for clave in claves)
+        self._contar(len(claves) - fallos, fallos)
+        if faltan:
+            calculados = dict(zip(faltan, await calcular(list(faltan.values()))))
+            await self._guardar(calculados)
+            resultados.update(calculados)
+        return [resultados[clave] for clave in claves]
+
+    def close(self):
+        if self._disco is not None:
+            self._disco.close()
+            self._disco = None
+
+
+def instalar(app: "FastAPI", cache: CacheResultados):
+    """Cierra el archivo de la caché con la app."""
+    app.add_event_handler("shutdown", cache.close)
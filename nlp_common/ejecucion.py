@@ -0,0 +1,112 @@
+"""Política de ejecución compartida para el análisis que usa CPU.
+
+Los endpoints no ejecutan spaCy en el event loop ni en el pool de hilos de
+Starlette: envían el trabajo a un executor acotado de esta política, que
+  - limita cuántos análisis corren a la vez,
+  - rechaza con 503 cuando ya hay demasiados pedidos en curso o en cola,
+  - y responde 504 si un pedido supera su tiempo máximo; si el trabajo todavía
+    estaba en cola, se descarta sin ejecutarse, y si ya estaba corriendo, sigue
+    contando como pendiente hasta que termina.
+Así el event loop queda libre y los endpoints livianos (GET /) siguen
+respondiendo aunque el servicio esté saturado.
+
+    politica = PoliticaEjecucion()
+    instalar(app, politica)
+
+    @app.post("/...")
+    async def endpoint(entrada: TextoEntrada):
+        return await politica.run(analizar, entrada.texto)
+
+Configuración por variables de entorno:
+  - NLP_MAX_CONCURRENTES: análisis simultáneos en hilos (por defecto, la cantidad de CPUs).
+  - NLP_MAX_PENDIENTES: pedidos en curso o en cola permitidos antes de rechazar con 503.
+  - NLP_TIMEOUT: segundos máximos por pedido antes de responder 504.
+"""
+import asyncio
+import os
+import threading
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from typing import Any, Awaitable, Callable, Optional, Union
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class ServidorSaturado(RuntimeError):
+    """Se alcanzó el máximo de pedidos pendientes."""
+
+
+class PoliticaEjecucion:
+    def __init__(self, max_concurrentes: Optional[int] = None, max_pendientes: Optional[int] = None,
+                 timeout: Optional[float] = None):
+        self.max_concurrentes = max_concurrentes if max_concurrentes is not None else int(os.environ.get("NLP_MAX_CONCURRENTES", str(os.cpu_count() or 1)))
+        self.max_pendientes = max_pendientes if max_pendientes is not None else int(os.environ.get("NLP_MAX_PENDIENTES", "256"))
+        self.timeout = timeout if timeout is not None else float(os.environ.get("NLP_TIMEOUT", "30"))
+        self._executor = None
+        self._pendientes = 0
+        self._lock = threading.Lock()
+
+    @property
+    def pendientes(self) -> int:
+        return self._pendientes
+
+    @property
+    def executor(self) -> ThreadPoolExecutor:
+        """Executor acotado a `max_concurrentes` hilos; se crea al primer uso."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(max_workers=self.max_concurrentes, thread_name_prefix="nlp")
+        return self._executor
+
+    async def esperar(self, lanzar: Callable[[], Union[Future, Awaitable]], timeout: Optional[float] = None) -> Any:
+        """Admite el pedido, lanza el trabajo con `lanzar()` y espera su resultado con tiempo máximo.
+
+        Sirve para trabajos que no corren en el executor de la política (por ejemplo, en
+        un pool de procesos). Si `lanzar` devuelve un `concurrent.futures.Future`, el
+        pedido sigue contando como pendiente hasta que ese trabajo termina: al vencer el
+        tiempo se cancela si todavía estaba en cola, pero uno que ya corre en un hilo o
+        en un worker no se puede interrumpir y sigue ocupando su lugar.
+        """
+        with self._lock:
+            if self._pendientes >= self.max_pendientes:
+                raise ServidorSaturado(f"Hay {self._pendientes} pedidos pendientes; intente más tarde.")
+            self._pendientes += 1
+        try:
+            trabajo = lanzar()
+        except BaseException:
+            self._liberar()
+            raise
+        if isinstance(trabajo, Future):
+            trabajo.add_done_callback(self._liberar)
+            trabajo = asyncio.wrap_future(trabajo)
+        else:
+            trabajo = asyncio.ensure_future(trabajo)
+            trabajo.add_done_callback(self._liberar)
+        return await asyncio.wait_for(trabajo, timeout or self.timeout)
+
+    def _liberar(self, _trabajo=None):
+        # puede llamarse desde el hilo que completa el trabajo
+        with self._lock:
+            self._pendientes -= 1
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None, executor: Optional[Executor] = None) -> Any:
+        """Ejecuta `func(*args)` en el executor acotado, o en `executor` si se indica, y espera su resultado."""
+        return await self.esperar(lambda: (executor or self.executor).submit(func, *args), timeout)
+
+    def close(self):
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
+
+
+def instalar(app: FastAPI, politica: PoliticaEjecucion):
+    """Cierra el executor con la app y traduce la saturación a 503 y los vencimientos a 504."""
+    app.add_event_handler("shutdown", politica.close)
+
+    async def _saturado(request: Request, exc: ServidorSaturado):
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+    async def _vencido(request: Request, exc: asyncio.TimeoutError):
+        return JSONResponse(status_code=504, content={"detail": "El análisis superó el tiempo máximo de espera."})
+
+    app.add_exception_handler(ServidorSaturado, _saturado)
+    app.add_exception_handler(asyncio.TimeoutError, _vencido)
@@ -0,0 +1,186 @@
+"""Métricas Prometheus compartidas por los servicios api_nlp_*.
+
+Cada servicio se registra con una línea después de crear la app:
+
+    metricas = instrumentar(app, "tenses", nlp)
+
+Esto expone GET /metrics y registra:
+  - nlp_requests_total / nlp_request_duration_seconds: pedidos y latencia por ruta.
+  - nlp_request_size_bytes: tamaño de la entrada (cuerpo o query string).
+  - nlp_component_duration_seconds: tiempo de cada componente del pipeline de spaCy
+    (tok2vec, morphologizer, parser, ner...), medido por documento. Con un modelo
+    compartido, la etiqueta `servicio` es la del primero que lo instrumentó.
+  - nlp_batch_size: textos por lote del agrupador de pedidos (`nlp_common.micro_batcher`).
+  - nlp_cache_events_total: aciertos y fallos de las cachés que lo informen con
+    `metricas.cache(nombre, acierto)`.
+
+Los componentes que se ejecutan en procesos hijos (servidor de inferencia o
+`nlp.pipe(n_process>1)`) registran sus tiempos en esos procesos y no aparecen aquí.
+"""
+from time import perf_counter
+from typing import TYPE_CHECKING, Optional
+
+from fastapi import FastAPI, Request, Response
+from prometheus_client import CONTENT_TYPE_LATEST, Counter, Histogram, generate_latest
+
+if TYPE_CHECKING:
+    # solo para anotaciones: los servicios sin spaCy (invertir_texto) no lo instalan
+    from spacy.language import Language
+
+REQUESTS = Counter("nlp_requests_total", "Pedidos HTTP atendidos", ["servicio", "metodo", "ruta", "estado"])
+LATENCIA = Histogram("nlp_request_duration_seconds", "Latencia de los pedidos HTTP", ["servicio", "metodo", "ruta"])
+TAMANO_ENTRADA = Histogram(
+    "nlp_request_size_bytes", "Tamaño de la entrada de cada pedido", ["servicio", "ruta"],
+    buckets=(64, 256, 1024, 4096, 16384, 65536, 262144, 1048576, 4194304),
+)
+COMPONENTE = Histogram(
+    "nlp_component_duration_seconds", "Tiempo por documento de cada componente del pipeline", ["servicio", "componente"],
+    buckets=(0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5),
+)
+TAMANO_LOTE = Histogram(
+    "nlp_batch_size", "Textos por lote del agrupador de pedidos", ["servicio"],
+    buckets=(1, 2, 4, 8, 16, 32, 64, 128, 256),
+)
+CACHE = Counter("nlp_cache_events_total", "Consultas a cachés por resultado", ["servicio", "cache", "resultado"])
+
+
+class _ComponenteMedido:
+    """Envuelve un componente del pipeline y mide su tiempo, tanto en `nlp(texto)` como en `nlp.pipe`."""
+
+    def __init__(self, proc, histograma):
+        self._proc = proc
+        self._histograma = histograma
+
+    def __getattr__(self, nombre):
+        return getattr(self._proc, nombre)
+
+    def __call__(self, doc, **kwargs):
+        inicio = perf_counter()
+        doc = self._proc(doc, **kwargs)
+        self._histograma.observe(perf_counter() - inicio)
+        return doc
+
+    def pipe(self, docs, **kwargs):
+        # se descuenta el tiempo que pasa en los componentes anteriores, que se
+        # ejecutan al pedir el siguiente documento del generador de entrada
+        anterior = [0.0]
+
+        def entrada():
+            it = iter(docs)
+            while True:
+                inicio = perf_counter()
+                try:
+                    doc = next(it)
+                except StopIteration:
+                    anterior[0] += perf_counter() - inicio
+                    return
+                anterior[0] += perf_counter() - inicio
+                yield doc
+
+        if hasattr(self._proc, "pipe"):
+            salida = iter(self._proc.pipe(entrada(), **kwargs))
+        else:
+            kwargs.pop("batch_size", None)
+            salida = (self._proc(doc, **kwargs) for doc in entrada())
+        while True:
+            inicio, previo = perf_counter(), anterior[0]
+            try:
+                doc = next(salida)
+            except StopIteration:
+                return
+            self._histograma.observe(perf_counter() - inicio - (anterior[0] - previo))
+            yield doc
+
+
+_FABRICA = "nlp_componente_medido"
+# componente original de cada (modelo, nombre) que la fábrica va a envolver
+_originales = {}
+
+
+def _registrar_fabrica():
+    from spacy.language import Language
+
+    if Language.has_factory(_FABRICA):
+        return
+
+    @Language.factory(_FABRICA, default_config={"servicio": ""})
+    def _crear_componente_medido(nlp: Language, name: str, servicio: str):
+        return _ComponenteMedido(_originales.pop((id(nlp), name)), COMPONENTE.labels(servicio, name))
+
+
+def _envolver_componentes(nlp: "Language", servicio: str):
+    _registrar_fabrica()
+    for nombre, proc in nlp.pipeline:
+        if not isinstance(proc, _ComponenteMedido):
+            _originales[(id(nlp), nombre)] = proc
+            nlp.replace_pipe(nombre, _FABRICA, config={"servicio": servicio})
+
+
+def medir_componentes(nlp: "Language", servicio: str):
+    """Reemplaza cada componente del pipeline por una versión que registra su tiempo.
+
+    Con un modelo diferido (`nlp_common.modelo`) se hace cuando termina de cargarse.
+    Un componente se mide una sola vez aunque varios servicios compartan el modelo
+    (api_nlp_host): sus tiempos llevan la etiqueta del primer servicio que lo
+    instrumentó y suman los documentos de todos.
+    """
+    al_cargar = getattr(nlp, "al_cargar", None)
+    if al_cargar is not None:
+        al_cargar(lambda cargado: _envolver_componentes(cargado, servicio))
+    else:
+        _envolver_componentes(nlp, servicio)
+
+
+class _MetricasMiddleware:
+    def __init__(self, app, servicio: str):
+        self.app = app
+        self.servicio = servicio
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            return await self.app(scope, receive, send)
+
+        estado = [500]
+
+        async def enviar(mensaje):
+            if mensaje["type"] == "http.response.start":
+                estado[0] = mensaje["status"]
+            await send(mensaje)
+
+        inicio = perf_counter()
+        try:
+            await self.app(scope, receive, enviar)
+        finally:
+            # se usa la plantilla de la ruta (no la URL) para acotar las etiquetas
+            ruta = getattr(scope.get("route"), "path", "sin_ruta")
+            metodo = scope["method"]
+            LATENCIA.labels(self.servicio, metodo, ruta).observe(perf_counter() - inicio)
+            REQUESTS.labels(self.servicio, metodo, ruta, str(estado[0])).inc()
+            headers = dict(scope.get("headers") or [])
+            tamano = int(headers.get(b"content-length", 0) or 0) or len(scope.get("query_string", b""))
+            TAMANO_ENTRADA.labels(self.servicio, ruta).observe(tamano)
+
+
+class Metricas:
+    def __init__(self, servicio: str):
+        self.servicio = servicio
+
+    def cache(self, nombre: str, acierto: bool):
+        CACHE.labels(self.servicio, nombre, "hit" if acierto else "miss").inc()
+
+    def lote(self, tamano: int):
+        TAMANO_LOTE.labels(self.servicio).observe(tamano)
+
+
+def _metrics(request: Request) -> Response:
+    return Response(generate_latest(), media_type=CONTENT_TYPE_LATEST)
+
+
+def instrumentar(app: FastAPI, servicio: str, nlp: Optional["Language"] = None) -> Metricas:
+    """Registra las métricas del servicio y expone GET /metrics. `servicio` es la etiqueta
+    que distingue las series de cada servicio (el nombre de su carpeta)."""
+    app.add_middleware(_MetricasMiddleware, servicio=servicio)
+    app.add_route("/metrics", _metrics, include_in_schema=False)
+    if nlp is not None:
+        medir_componentes(nlp, servicio)
+    return Metricas(servicio)
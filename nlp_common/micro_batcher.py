@@ -0,0 +1,86 @@
+"""Agrupador de pedidos (micro-batching) delante de `nlp()`.
+
+Junta los textos que llegan de pedidos concurrentes durante hasta `max_espera_ms`
+milisegundos o hasta reunir `max_lote` textos, los analiza con una sola llamada a
+`nlp.pipe` y resuelve el futuro de cada pedido con su Doc. Con `metricas`, el
+tamaño de cada lote se registra en el histograma nlp_batch_size (ver `nlp_common.metrics`).
+
+    batcher = MicroBatcher(servidor.pipe, metricas=metricas)  # lotes en el servidor de inferencia
+    batcher = MicroBatcher(pipe_en_hilo(nlp))                  # lotes en un hilo del proceso
+
+    doc = await batcher.parse(texto)
+
+Configuración por variables de entorno:
+  - NLP_BATCH_MAX_ESPERA_MS: espera máxima antes de despachar un lote incompleto.
+  - NLP_BATCH_MAX_LOTE: cantidad máxima de textos por lote.
+"""
+import asyncio
+import os
+from typing import Awaitable, Callable, List, Optional
+
+from spacy.language import Language
+from spacy.tokens import Doc
+
+from nlp_common.metrics import Metricas
+
+
+def pipe_en_hilo(nlp: Language) -> Callable[[List[str]], Awaitable[List[Doc]]]:
+    """Devuelve una función que analiza un lote con `nlp.pipe` en un hilo, sin bloquear el event loop."""
+    async def procesar(textos: List[str]) -> List[Doc]:
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(None, lambda: list(nlp.pipe(textos)))
+    return procesar
+
+
+class MicroBatcher:
+    def __init__(self, procesar: Callable[[List[str]], Awaitable[List[Doc]]],
+                 max_espera_ms: Optional[float] = None, max_lote: Optional[int] = None,
+                 metricas: Optional[Metricas] = None):
+        self.procesar = procesar
+        self.max_espera = (max_espera_ms if max_espera_ms is not None else float(os.environ.get("NLP_BATCH_MAX_ESPERA_MS", "5"))) / 1000
+        self.max_lote = max_lote if max_lote is not None else int(os.environ.get("NLP_BATCH_MAX_LOTE", "32"))
+        self.metricas = metricas
+        self._cola = []
+        self._temporizador = None
+        self._en_curso = set()
+
+    async def parse(self, texto: str) -> Doc:
+        """Encola el texto y espera el Doc del lote en el que se analice."""
+        loop = asyncio.get_running_loop()
+        fut = loop.create_future()
+        self._cola.append((texto, fut))
+        if len(self._cola) >= self.max_lote:
+            self._despachar()
+        elif self._temporizador is None:
+            self._temporizador = loop.call_later(self.max_espera, self._despachar)
+        return await fut
+
+    def _despachar(self):
+        if self._temporizador is not None:
+            self._temporizador.cancel()
+            self._temporizador = None
+        lote, self._cola = self._cola, []
+        if not lote:
+            return
+        if self.metricas is not None:
+            self.metricas.lote(len(lote))
+        tarea = asyncio.ensure_future(self._procesar_lote(lote))
+        # se guarda una referencia para que la tarea no se pierda antes de terminar
+        self._en_curso.add(tarea)
+        tarea.add_done_callback(self._en_curso.discard)
+
+    async def _procesar_lote(self, lote):
+        try:
+            docs = await self.procesar([texto for texto, _ in lote])
+            if len(docs) != len(lote):
+                # sin un Doc por texto no se sabe a qué pedido corresponde cada uno
+                raise RuntimeError(f"Se esperaban {len(lote)} Docs y se recibieron {len(docs)}")
+        except Exception as e:
+            for _, fut in lote:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+        for (_, fut), doc in zip(lote, docs):
+            # el pedido pudo cancelarse mientras se procesaba el lote
+            if not fut.done():
+                fut.set_result(doc)
@@ -0,0 +1,119 @@
+"""Servidor de inferencia compartido con procesos de spaCy pre-lanzados.
+
+El modelo se carga una sola vez en el proceso principal y, cuando el servicio
+termina de prepararse (ver `nlp_common.salud`), se crean N procesos por fork:
+cada worker arranca con el modelo ya cargado y comparte sus páginas de memoria
+(copy-on-write). Los endpoints envían los textos de forma asíncrona y esperan el
+resultado sin bloquear el event loop. La admisión de pedidos, el tiempo máximo y
+el executor sin workers son los de la política de ejecución compartida
+(`nlp_common.ejecucion`).
+
+    servidor = ModelServer(nlp)
+    instalar(app, servidor)
+
+    @app.get("/...")
+    async def endpoint(texto: str):
+        doc = await servidor.parse(texto)
+
+Configuración por variables de entorno:
+  - NLP_WORKERS: cantidad de procesos (0 = sin procesos, se analiza en un hilo).
+  - NLP_MAX_PENDIENTES, NLP_TIMEOUT, NLP_MAX_CONCURRENTES: ver `nlp_common.ejecucion`.
+"""
+import multiprocessing
+import os
+from concurrent.futures import Future
+from typing import Any, Callable, List, Optional
+
+from fastapi import FastAPI
+from spacy.language import Language
+from spacy.tokens import Doc, DocBin
+
+from nlp_common import ejecucion, salud
+from nlp_common.ejecucion import PoliticaEjecucion, ServidorSaturado  # noqa: F401 (reexportado)
+
+# Modelo del proceso actual: heredado por fork o cargado por el inicializador del worker
+_nlp = None
+
+
+def _inicializar_worker(nombre_modelo: str):
+    global _nlp
+    if _nlp is None:
+        import spacy
+        _nlp = spacy.load(nombre_modelo)
+
+
+def _parsear(textos: List[str]) -> bytes:
+    """Analiza los textos en el worker y los devuelve serializados como DocBin."""
+    return DocBin(docs=_nlp.pipe(textos), store_user_data=False).to_bytes()
+
+
+class ModelServer:
+    def __init__(self, nlp: Language, workers: Optional[int] = None,
+                 max_pendientes: Optional[int] = None, timeout: Optional[float] = None,
+                 politica: Optional[PoliticaEjecucion] = None):
+        self.nlp = nlp
+        self.workers = workers if workers is not None else int(os.environ.get("NLP_WORKERS", "0"))
+        self.politica = politica or PoliticaEjecucion(max_pendientes=max_pendientes, timeout=timeout)
+        self._pool = None
+
+    @property
+    def pendientes(self) -> int:
+        return self.politica.pendientes
+
+    def start(self):
+        """Crea los workers. Debe llamarse con el modelo ya cargado para compartirlo por fork
+        (`instalar` lo llama cuando el servicio termina de prepararse)."""
+        global _nlp
+        if self._pool is not None or self.workers <= 0:
+            return
+        _nlp = self.nlp
+        metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+        nombre_modelo = f"{self.nlp.meta['lang']}_{self.nlp.meta['name']}"
+        self._pool = multiprocessing.get_context(metodo).Pool(
+            self.workers, initializer=_inicializar_worker, initargs=(nombre_modelo,)
+        )
+
+    def close(self):
+        if self._pool is not None:
+            self._pool.terminate()
+            self._pool.join()
+            self._pool = None
+
+    async def run(self, func: Callable, *args, timeout: Optional[float] = None) -> Any:
+        """Ejecuta `func(*args)` en un worker y espera su resultado.
+
+        `func` debe ser una función de nivel de módulo (se envía por referencia) y su
+        resultado debe poder serializarse con pickle. Si no hay workers, se ejecuta en
+        el executor acotado de la política, en un hilo del proceso actual.
+        """
+        if self._pool is None:
+            return await self.politica.run(func, *args, timeout=timeout)
+
+        def lanzar() -> Future:
+            # el pedido ocupa su lugar en la política hasta que el worker responde,
+            # aunque venza antes: el worker no se puede interrumpir
+            trabajo = Future()
+            trabajo.set_running_or_notify_cancel()
+            self._pool.apply_async(func, args, callback=trabajo.set_result, error_callback=trabajo.set_exception)
+            return trabajo
+
+        return await self.politica.esperar(lanzar, timeout)
+
+    async def pipe(self, textos: List[str], timeout: Optional[float] = None) -> List[Doc]:
+        """Analiza una lista de textos en un worker y devuelve sus Doc, en el mismo orden."""
+        if self._pool is None:
+            return await self.run(lambda: list(self.nlp.pipe(textos)), timeout=timeout)
+        datos = await self.run(_parsear, textos, timeout=timeout)
+        return list(DocBin().from_bytes(datos).get_docs(self.nlp.vocab))
+
+    async def parse(self, texto: str, timeout: Optional[float] = None) -> Doc:
+        """Analiza un texto en un worker y devuelve su Doc."""
+        return (await self.pipe([texto], timeout=timeout))[0]
+
+
+def instalar(app: FastAPI, servidor: ModelServer):
+    """Inicia y detiene el servidor con la app y traduce sus errores a 503/504."""
+    # los workers se crean por fork desde el event loop, con el modelo ya cargado
+    salud.al_estar_listo(app, servidor.start)
+    app.add_event_handler("shutdown", servidor.close)
+    ejecucion.instalar(app, servidor.politica)
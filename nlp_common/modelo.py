@@ -0,0 +1,180 @@
+"""Modelo de spaCy compartido por todos los servicios de un mismo proceso.
+
+Los servicios piden el modelo en lugar de cargarlo con `spacy.load`:
+
+    nlp = modelo.cargar()
+    # con el segmentador de oraciones antes del parser
+    nlp = modelo.cargar(agregar={"segmentador_es": "parser"})
+    # sin el parser, con el segmentador al final
+    nlp = modelo.cargar(excluir=["parser"], agregar={"segmentador_es": None})
+
+Cada modelo se carga una sola vez por proceso. Si un servicio necesita otro
+pipeline, recibe una `Vista`: ejecuta los mismos componentes del modelo
+compartido (sin copiar sus pesos), sin los excluidos y con los agregados, y no
+modifica el pipeline que usan los demás servicios. Así, con todos los servicios
+montados en un solo proceso (api_nlp_host), hay un único modelo en memoria.
+
+La carga es diferida: `cargar` solo lee el meta.json del modelo, y `spacy.load`
+se ejecuta la primera vez que se usa (normalmente, en la preparación en segundo
+plano de `nlp_common.salud`). Importar un servicio no carga nada.
+"""
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+import spacy
+from spacy.language import Language
+from spacy.tokens import Doc
+
+MODELO = "es_core_news_sm"
+
+_modelos: Dict[Tuple, object] = {}
+_lock = threading.Lock()
+
+
+def _leer_meta(nombre: str) -> dict:
+    ruta = spacy.util.get_package_path(nombre) if spacy.util.is_package(nombre) else Path(nombre)
+    if not (ruta / "meta.json").exists():
+        raise OSError(f"No se encontró el modelo {nombre!r} (python -m spacy download {nombre})")
+    return spacy.util.get_model_meta(ruta)
+
+
+class ModeloDiferido:
+    """Modelo de spaCy que se carga la primera vez que se usa; después se comporta como el `Language`.
+
+    `meta` y `pipe_names` se responden desde el meta.json sin cargarlo.
+    """
+
+    def __init__(self, nombre: str):
+        self.nombre = nombre
+        self._meta = _leer_meta(nombre)
+        self._nlp: Optional[Language] = None
+        self._al_cargar: List[Callable[[Language], None]] = []
+        self._lock = threading.Lock()
+
+    @property
+    def cargado(self) -> bool:
+        return self._nlp is not None
+
+    def obtener(self) -> Language:
+        """El modelo, cargándolo si todavía no se cargó."""
+        nlp = self._nlp
+        if nlp is not None:
+            return nlp
+        with self._lock:
+            if self._nlp is not None:
+                return self._nlp
+            nlp = spacy.load(self.nombre)
+            # se publica después de los callbacks: ningún otro hilo usa el pipeline a medio modificar
+            pendientes, self._al_cargar = self._al_cargar, []
+            for func in pendientes:
+                func(nlp)
+            self._nlp = nlp
+        return nlp
+
+    def al_cargar(self, func: Callable[[Language], None]):
+        """Ejecuta `func(nlp)` cuando el modelo termine de cargarse, antes de que otros hilos
+        puedan usarlo, o enseguida si ya está cargado."""
+        with self._lock:
+            if self._nlp is None:
+                self._al_cargar.append(func)
+                return
+        func(self._nlp)
+
+    @property
+    def meta(self) -> dict:
+        return self._nlp.meta if self._nlp is not None else self._meta
+
+    @property
+    def pipe_names(self) -> List[str]:
+        return self._nlp.pipe_names if self._nlp is not None else list(self._meta["pipeline"])
+
+    def __getattr__(self, nombre):
+        return getattr(self.obtener(), nombre)
+
+    def __call__(self, texto: str, **kwargs) -> Doc:
+        return self.obtener()(texto, **kwargs)
+
+
+def _aplicar(proc, docs: Iterable[Doc], batch_size: int) -> Iterator[Doc]:
+    if hasattr(proc, "pipe"):
+        yield from proc.pipe(docs, batch_size=batch_size)
+    else:
+        for doc in docs:
+            yield proc(doc)
+
+
+class Vista:
+    """Pipeline derivado de un modelo cargado, que se usa como un `Language`.
+
+    Los componentes del modelo se leen en cada llamada, así que los cambios
+    posteriores (por ejemplo, los que mide `nlp_common.metrics`) se ven también
+    aquí. El resto de los atributos (vocab, meta, make_doc...) son los del modelo.
+    Los componentes agregados se crean al usarla por primera vez.
+    """
+
+    def __init__(self, nlp: Union[Language, ModeloDiferido], excluir: Sequence[str] = (),
+                 agregar: Optional[Dict[str, Optional[str]]] = None):
+        faltan = [nombre for nombre in excluir if nombre not in nlp.pipe_names]
+        if faltan:
+            raise ValueError(f"El modelo no tiene los componentes {faltan}")
+        self._nlp = nlp
+        self.excluir = frozenset(excluir)
+        # nombre -> antes de qué componente del modelo va (None = al final)
+        self._agregar = dict(agregar or {})
+        self._agregados: Optional[Dict[str, object]] = None
+
+    def __getattr__(self, nombre):
+        return getattr(self._nlp, nombre)
+
+    def _ordenar(self, componentes: List[Tuple[str, object]], agregados: Dict[str, object]) -> List[Tuple[str, object]]:
+        componentes = [(nombre, proc) for nombre, proc in componentes if nombre not in self.excluir]
+        for nombre, antes in self._agregar.items():
+            nombres = [n for n, _ in componentes]
+            posicion = nombres.index(antes) if antes in nombres else len(componentes)
+            componentes.insert(posicion, (nombre, agregados.get(nombre)))
+        return componentes
+
+    @property
+    def pipeline(self) -> List[Tuple[str, object]]:
+        if self._agregados is None:
+            self._agregados = {nombre: self._nlp.create_pipe(nombre) for nombre in self._agregar}
+        return self._ordenar(self._nlp.pipeline, self._agregados)
+
+    @property
+    def pipe_names(self) -> List[str]:
+        return [nombre for nombre, _ in self._ordenar([(n, None) for n in self._nlp.pipe_names], {})]
+
+    def __call__(self, texto: str) -> Doc:
+        doc = self._nlp.make_doc(texto)
+        for _, proc in self.pipeline:
+            doc = proc(doc)
+        return doc
+
+    def pipe(self, textos: Iterable[str], batch_size: Optional[int] = None, n_process: int = 1) -> Iterator[Doc]:
+        if n_process != 1:
+            raise ValueError("Una vista del modelo solo se procesa en el proceso actual (n_process=1)")
+        batch_size = batch_size or self._nlp.batch_size
+        docs = (self._nlp.make_doc(texto) for texto in textos)
+        for _, proc in self.pipeline:
+            docs = _aplicar(proc, docs, batch_size)
+        return docs
+
+
+def cargar(nombre: str = MODELO, excluir: Sequence[str] = (),
+           agregar: Optional[Dict[str, Optional[str]]] = None) -> Union[ModeloDiferido, Vista]:
+    """Devuelve el modelo compartido `nombre`, que se carga la primera vez que se usa.
+
+    `excluir` son componentes del modelo que no se ejecutan; `agregar` asocia cada
+    componente registrado (por ejemplo "segmentador_es") con el componente del
+    modelo antes del cual va, o None para ponerlo al final.
+    """
+    clave = (nombre, tuple(excluir), tuple((agregar or {}).items()))
+    with _lock:
+        if nombre not in _modelos:
+            _modelos[nombre] = ModeloDiferido(nombre)
+        if not excluir and not agregar:
+            return _modelos[nombre]
+        if clave not in _modelos:
+            _modelos[clave] = Vista(_modelos[nombre], excluir, agregar)
+        return _modelos[clave]
@@ -0,0 +1,178 @@
+"""Preparación del modelo y sondas de salud (liveness/readiness) de los servicios.
+
+Los servicios ya no cargan spaCy al importarse (ver `nlp_common.modelo`): al
+iniciar la app, la preparación carga el modelo, construye lo que depende de él
+(matchers, listas lematizadas...) y analiza unas oraciones de calentamiento,
+para que el primer pedido real no pague esos costos.
+
+    salud.instalar(app, nlp, preparar=[crear_matcher])
+
+Esto expone:
+  - GET /health/live: 200 mientras el proceso responde.
+  - GET /health/ready: 200 cuando la preparación terminó; 503 mientras tanto o si
+    falló, con el estado y el error en el cuerpo.
+
+Los pedidos que llegan antes de terminar no se rechazan: esperan a que el modelo
+se cargue. El orquestador (por ejemplo, la readinessProbe de Kubernetes) debería
+enviar tráfico recién cuando /health/ready responda 200.
+
+Lo que tiene que crearse con el modelo ya cargado y desde el event loop (los
+pools de procesos, que se crean por fork) se registra con `al_estar_listo`.
+
+Configuración por variables de entorno:
+  - NLP_PRECARGA: "fondo" (por defecto) prepara en un hilo sin demorar el inicio;
+    "inicio" prepara antes de aceptar pedidos; "no" no prepara nada y el modelo
+    se carga con el primer pedido.
+  - NLP_CALENTAR: 0 para cargar el modelo sin analizar las oraciones de calentamiento.
+"""
+import asyncio
+import logging
+import os
+import threading
+from time import perf_counter
+from typing import Callable, Optional, Sequence
+
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse
+
+logger = logging.getLogger(__name__)
+
+# Oraciones representativas: ejercitan todos los componentes del pipeline y los
+# patrones de los servicios (tiempos compuestos, pasiva, negación, conectores...)
+CALENTAMIENTO = [
+    "El informe fue revisado por el equipo antes de la reunión.",
+    "No he recibido ninguna respuesta; sin embargo, seguiré esperando.",
+    "Se cree que los usuarios van a estar trabajando con el sistema mañana.",
+    "Creo que la aplicación debería cargar rápido, ¿verdad?",
+]
+
+PENDIENTE, PREPARANDO, LISTO, ERROR = "pendiente", "preparando", "listo", "error"
+
+
+class Preparacion:
+    """Carga el modelo, ejecuta los pasos de `preparar` y calienta el pipeline con `textos`."""
+
+    def __init__(self, nlp=None, preparar: Sequence[Callable[[], object]] = (),
+                 textos: Sequence[str] = CALENTAMIENTO):
+        self.nlp = nlp
+        self.preparar = list(preparar)
+        self.textos = list(textos)
+        self.modo = os.environ.get("NLP_PRECARGA", "fondo")
+        self.calentar = os.environ.get("NLP_CALENTAR", "1") != "0"
+        self.estado = PENDIENTE if self.nlp is not None or self.preparar else LISTO
+        self.error: Optional[str] = None
+        self.duracion: Optional[float] = None
+        self._hilo: Optional[threading.Thread] = None
+        self._terminada = threading.Event()
+        if self.estado == LISTO:
+            self._terminada.set()
+
+    @property
+    def lista(self) -> bool:
+        return self.estado == LISTO
+
+    def ejecutar(self):
+        """Hace la preparación completa en el hilo actual."""
+        self.estado = PREPARANDO
+        inicio = perf_counter()
+        try:
+            if self.nlp is not None and hasattr(self.nlp, "obtener"):
+                self.nlp.obtener()
+            for paso in self.preparar:
+                paso()
+            if self.nlp is not None and self.calentar and self.textos:
+                for texto in self.textos:
+                    self.nlp(texto)
+                list(self.nlp.pipe(self.textos))
+        except Exception as exc:
+            logger.exception("Falló la preparación del servicio")
+            self.error = f"{type(exc).__name__}: {exc}"
+            self.estado = ERROR
+        else:
+            self.estado = LISTO
+        finally:
+            self.duracion = perf_counter() - inicio
+            self._terminada.set()
+
+    def iniciar(self):
+        if self.estado != PENDIENTE or self._hilo is not None:
+            return
+        if self.modo == "no":
+            # no hay nada que esperar: el modelo se carga con el primer pedido
+            self.estado = LISTO
+            self._terminada.set()
+        elif self.modo == "inicio":
+            self.ejecutar()
+        else:
+            self._hilo = threading.Thread(target=self.ejecutar, name="preparacion", daemon=True)
+            self._hilo.start()
+
+    def esperar(self, timeout: Optional[float] = None) -> bool:
+        """Espera a que termine la preparación en segundo plano; devuelve si quedó lista."""
+        if self._hilo is not None:
+            self._hilo.join(timeout)
+        return self.lista
+
+    async def esperar_lista(self) -> bool:
+        """Como `esperar`, sin bloquear el event loop."""
+        if not self._terminada.is_set():
+            await asyncio.to_thread(self._terminada.wait)
+        return self.lista
+
+    def informe(self) -> dict:
+        informe = {"estado": self.estado}
+        if self.error is not None:
+            informe["error"] = self.error
+        if self.duracion is not None:
+            informe["duracion_s"] = round(self.duracion, 3)
+        return informe
+
+
+def instalar(app: FastAPI, nlp=None, preparar: Sequence[Callable[[], object]] = (),
+             textos: Sequence[str] = CALENTAMIENTO) -> Preparacion:
+    """Prepara el servicio al iniciar la app y expone GET /health/live y GET /health/ready."""
+    preparacion = Preparacion(nlp, preparar, textos)
+    app.state.preparacion = preparacion
+    app.add_event_handler("startup", preparacion.iniciar)
+    # el proceso no termina con la preparación a mitad de un análisis
+    app.add_event_handler("shutdown", preparacion.esperar)
+
+    @app.get("/health/live", include_in_schema=False)
+    def vivo():
+        return {"estado": "vivo"}
+
+    @app.get("/health/ready", include_in_schema=False)
+    def listo():
+        return JSONResponse(status_code=200 if preparacion.lista else 503, content=preparacion.informe())
+
+    return preparacion
+
+
+def al_estar_listo(app: FastAPI, func: Callable[[], object]):
+    """Llama a `func` desde el event loop cuando el servicio termina de prepararse.
+
+    Si la app no instala `salud`, se llama al iniciar. No se llama si la preparación
+    falla. Los pools de procesos se crean así, por fork y con el modelo ya cargado,
+    en el hilo del event loop y no en el hilo de la preparación ni en el de un pedido.
+    """
+    tareas = []
+
+    async def esperar_y_llamar(preparacion: Preparacion):
+        if await preparacion.esperar_lista():
+            func()
+
+    def iniciar():
+        # se busca al iniciar: `salud.instalar` puede llamarse después que esta función
+        preparacion = getattr(app.state, "preparacion", None)
+        if preparacion is None:
+            func()
+        else:
+            tareas.append(asyncio.get_running_loop().create_task(esperar_y_llamar(preparacion)))
+
+    def detener():
+        for tarea in tareas:
+            tarea.cancel()
+        tareas.clear()
+
+    app.add_event_handler("startup", iniciar)
+    app.add_event_handler("shutdown", detener)
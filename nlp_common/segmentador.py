@@ -0,0 +1,127 @@
+"""Segmentación de oraciones en español basada en reglas, sin el parser de dependencias.
+
+Se ofrece como función (`segmentar`) y como componente de spaCy ("segmentador_es"),
+para que todos los servicios usen los mismos límites de oración:
+
+    from nlp_common.segmentador import segmentar
+    segmentar("Hola. ¿Qué tal?")      # [(0, 5), (6, 15)]
+
+    import nlp_common.segmentador  # registra el componente
+    nlp = spacy.load("es_core_news_sm", exclude=["parser"])
+    nlp.add_pipe("segmentador_es", first=True)
+
+Si se agrega antes del parser, el parser respeta los límites que marca el componente.
+
+Reglas:
+  - una oración termina en ".", "!", "?", "..." o "…" (con las comillas o paréntesis
+    de cierre que los sigan) seguidos de espacio, o en un salto de línea;
+  - después de "?", "!" y de los puntos suspensivos la oración solo termina si lo que
+    sigue no empieza en minúscula ("¿Vienes?, preguntó", "Bueno... no sé");
+  - después de un punto la oración termina aunque siga una minúscula, salvo en
+    abreviaturas ("Sr.", "p. ej.", "EE.UU.", también con espacios: "EE. UU."),
+    iniciales ("J. R. Tolkien"), números de lista ("1. Introducción") o dentro de
+    un ¿…? o ¡…! abierto; "etc.", "a. m." y "p. m." cortan si sigue una mayúscula;
+  - "1.000" o "3.5" no cortan porque el punto no va seguido de espacio.
+"""
+import re
+from typing import List, Tuple
+
+from spacy.language import Language
+from spacy.tokens import Doc
+
+# Abreviaturas frecuentes, en minúsculas y sin el punto final; las de varias partes
+# sin espacios ("ee.uu" también reconoce "EE. UU.")
+ABREVIATURAS = frozenset({
+    "sr", "sra", "srta", "sres", "sras", "dr", "dra", "dres", "lic", "ing", "arq", "prof", "profa", "dña", "ud", "uds",
+    "vd", "vds", "av", "avda", "cía", "s.a", "s.l", "ee.uu", "a.c", "d.c", "art", "arts", "cap", "caps", "pág", "págs",
+    "p", "pp", "núm", "nro", "vol", "vols", "ed", "eds", "fig", "figs", "tel", "tfno", "aprox", "ej", "p.ej", "vs", "gral",
+    "sto", "sta", "dpto", "depto", "máx", "mín", "admón", "atte", "cf", "op", "cit", "ibid", "jr", "mr", "mrs",
+})
+# Abreviaturas que también pueden cerrar una oración: cortan si sigue una mayúscula
+ABREVIATURAS_FINALES = frozenset({"etc", "a.m", "p.m"})
+
+# Signo de fin, cierres pegados y el espacio que lo separa de la oración siguiente;
+# o un salto de línea sin signo de fin
+_FIN = re.compile(r"(?P<signo>\.\.\.|…|[.!?]+)(?P<cierre>[\"'»”’)\]]*)(?P<espacio>\s+)|(?P<salto>[ \t]*\n\s*)")
+_PALABRA_PREVIA = re.compile(r"[(\[¿¡«\"'“‘]*(\S+)$")
+_PARTE_SIGUIENTE = re.compile(r"([^\W\d_]+)\.")
+_APERTURAS = "([¿¡«\"'“‘"
+
+
+def _abierto(texto: str) -> bool:
+    """Indica si queda un ¿ o ¡ sin cerrar en el texto."""
+    return texto.count("¿") + texto.count("¡") > texto.count("?") + texto.count("!")
+
+
+def _compuestas(texto: str, inicio: int, fin_signo: int) -> List[str]:
+    """Abreviaturas de varias partes separadas por espacios que terminan en este punto
+    ("EE. UU" -> "ee.uu"), de la más larga a la más corta."""
+    partes = texto[inicio:fin_signo - 1].split()[-3:]
+    candidatas = []
+    for k in range(2, len(partes) + 1):
+        if not partes[-k].endswith("."):
+            break
+        candidatas.append(".".join(p.rstrip(".").lstrip(_APERTURAS) for p in partes[-k:]).lower())
+    return candidatas[::-1]
+
+
+def _corta_en_punto(texto: str, inicio: int, fin_signo: int, siguiente_inicio: int) -> bool:
+    siguiente = texto[siguiente_inicio]
+    previa = _PALABRA_PREVIA.search(texto, inicio, fin_signo - 1)
+    palabra = previa.group(1).lower() if previa else ""
+    for abreviatura in _compuestas(texto, inicio, fin_signo) + [palabra]:
+        if abreviatura in ABREVIATURAS:
+            return False
+        if abreviatura in ABREVIATURAS_FINALES:
+            return not siguiente.islower()
+    # primera parte de una abreviatura con espacios: "EE." en "EE. UU."
+    parte = _PARTE_SIGUIENTE.match(texto, siguiente_inicio)
+    if parte and f"{palabra}.{parte.group(1).lower()}" in ABREVIATURAS | ABREVIATURAS_FINALES:
+        return False
+    # iniciales: "J. R. Tolkien"
+    if len(palabra) == 1 and palabra.isalpha() and previa.group(1).isupper():
+        return False
+    # número de lista al comienzo de la oración: "1. Introducción"
+    if palabra.isdigit() and previa.start() == inicio:
+        return False
+    return not _abierto(texto[inicio:fin_signo])
+
+
+def segmentar(texto: str) -> List[Tuple[int, int]]:
+    """Devuelve las posiciones (inicio, fin) de cada oración, sin los espacios de los bordes."""
+    oraciones = []
+    inicio = len(texto) - len(texto.lstrip())
+    for m in _FIN.finditer(texto):
+        siguiente_inicio = m.end()
+        if m.start() < inicio or siguiente_inicio >= len(texto):
+            continue
+        siguiente = texto[siguiente_inicio]
+        if m.group("salto") is not None or "\n" in m.group("espacio"):
+            corta = True
+        elif m.group("signo") == ".":
+            corta = _corta_en_punto(texto, inicio, m.start("cierre"), siguiente_inicio)
+        else:
+            corta = not siguiente.islower()
+        if corta:
+            fin = m.start("espacio") if m.group("salto") is None else m.start()
+            oraciones.append((inicio, fin))
+            inicio = siguiente_inicio
+    fin = len(texto.rstrip())
+    if inicio < fin:
+        oraciones.append((inicio, fin))
+    return oraciones
+
+
+@Language.component("segmentador_es")
+def segmentador_es(doc: Doc) -> Doc:
+    """Marca `is_sent_start` en cada token según `segmentar`; el resto de los tokens queda en False."""
+    # la primera oración siempre empieza en el primer token
+    inicios = [inicio for inicio, _ in segmentar(doc.text)][1:]
+    j = 0
+    for token in doc[1:]:
+        es_inicio = False
+        while j < len(inicios) and inicios[j] <= token.idx:
+            es_inicio = True
+            j += 1
+        token.is_sent_start = es_inicio
+    return doc
@@ -0,0 +1,88 @@
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+from nlp_common.cache_resultados import CacheResultados, huella
+
+
+class Contador:
+    """Análisis de prueba que registra los textos que realmente se calculan."""
+
+    def __init__(self):
+        self.calculados = []
+
+    async def uno(self, texto):
+        self.calculados.append(texto)
+        return {"largo": len(texto), "palabras": texto.split()}
+
+    async def lote(self, textos):
+        return [await self.uno(texto) for texto in textos]
+
+
+def _resolver(cache, texto, contador, **opciones):
+    return asyncio.run(cache.resolver(texto, lambda: contador.uno(texto), **opciones))
+
+
+def test_segundo_pedido_sin_recalcular(tmp_path):
+    contador = Contador()
+    cache = CacheResultados("prueba", ["regla"], ruta=str(tmp_path / "c.sqlite3"))
+    primero = _resolver(cache, "hola mundo", contador)
+    assert _resolver(cache, "hola mundo", contador) == primero
+    assert contador.calculados == ["hola mundo"]
+    # las opciones del pedido son parte de la clave
+    _resolver(cache, "hola mundo", contador, motor="otro")
+    assert len(contador.calculados) == 2
+
+
+def test_persiste_en_disco_y_se_invalida_al_cambiar_las_reglas(tmp_path):
+    ruta = str(tmp_path / "c.sqlite3")
+    contador = Contador()
+    _resolver(CacheResultados("prueba", {"b", "a"}, ruta=ruta), "texto", contador)
+    # otro proceso con las mismas reglas (el orden de un conjunto no importa) lo encuentra en el disco
+    _resolver(CacheResultados("prueba", {"a", "b"}, ruta=ruta, max_memoria=0), "texto", contador)
+    assert contador.calculados == ["texto"]
+
+    CacheResultados("prueba", {"a", "b", "c"}, ruta=ruta)
+    assert sqlite3.connect(ruta).execute("SELECT COUNT(*) FROM resultados").fetchone()[0] == 0
+
+
+def test_vencimiento_y_tamano_maximo(tmp_path):
+    contador = Contador()
+    cache = CacheResultados("prueba", ruta=str(tmp_path / "c.sqlite3"), ttl=0.05, max_memoria=0, max_disco=2)
+    _resolver(cache, "uno", contador)
+    time.sleep(0.1)
+    _resolver(cache, "uno", contador)
+    assert contador.calculados == ["uno", "uno"]
+
+    for texto in ["dos", "tres", "cuatro"]:
+        _resolver(cache, texto, contador)
+    cache._disco.podar()
+    assert cache._disco._conexion.execute("SELECT COUNT(*) FROM resultados").fetchone()[0] == 2
+
+
+def test_lote_calcula_solo_los_faltantes():
+    contador = Contador()
+    cache = CacheResultados("prueba", ruta="")
+    _resolver(cache, "a", contador)
+    resultados = asyncio.run(cache.resolver_lote(["a", "b", "c", "b"], contador.lote))
+    assert [r["palabras"] for r in resultados] == [["a"], ["b"], ["c"], ["b"]]
+    assert contador.calculados == ["a", "b", "c"]
+
+
+def test_huella_solo_admite_datos():
+    assert huella([1, "a"], {"x": (1, 2)}) == huella([1, "a"], {"x": [1, 2]})
+    with pytest.raises(TypeError):
+        huella(object())
+
+
+def test_sin_disco_salvo_que_se_indique(tmp_path, monkeypatch):
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.delenv("NLP_CACHE_DB", raising=False)
+    assert CacheResultados("prueba")._disco is None
+    monkeypatch.setenv("NLP_CACHE_DB", "")
+    assert CacheResultados("prueba")._disco is None
+    monkeypatch.setenv("NLP_CACHE_DB", str(tmp_path / "c.sqlite3"))
+    assert CacheResultados("prueba")._disco is not None
+    assert {p.name.split("-")[0] for p in tmp_path.iterdir()} == {"c.sqlite3"}
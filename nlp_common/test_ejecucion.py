@@ -0,0 +1,94 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from nlp_common.ejecucion import PoliticaEjecucion, ServidorSaturado, instalar
+
+
+def test_run_fuera_del_event_loop():
+    politica = PoliticaEjecucion(max_concurrentes=1)
+    try:
+        nombre = asyncio.run(politica.run(lambda: threading.current_thread().name))
+        assert nombre.startswith("nlp")
+        assert politica.pendientes == 0
+    finally:
+        politica.close()
+
+
+def test_descarta_trabajo_en_cola_al_vencer():
+    politica = PoliticaEjecucion(max_concurrentes=1, timeout=0.05)
+    ejecutados = []
+
+    async def escenario():
+        ocupado = asyncio.ensure_future(politica.run(time.sleep, 0.2, timeout=1))
+        await asyncio.sleep(0.01)
+        with pytest.raises(asyncio.TimeoutError):
+            await politica.run(ejecutados.append, "en cola")
+        await ocupado
+
+    try:
+        asyncio.run(escenario())
+        assert ejecutados == []
+        assert politica.pendientes == 0
+    finally:
+        politica.close()
+
+
+def test_trabajo_vencido_ocupa_su_lugar_hasta_terminar():
+    politica = PoliticaEjecucion(max_concurrentes=1, max_pendientes=1, timeout=0.05)
+    terminado = threading.Event()
+
+    def lento():
+        time.sleep(0.3)
+        terminado.set()
+
+    async def escenario():
+        with pytest.raises(asyncio.TimeoutError):
+            await politica.run(lento)
+        # el hilo sigue corriendo: no se admite otro pedido hasta que termine
+        assert politica.pendientes == 1
+        with pytest.raises(ServidorSaturado):
+            await politica.run(time.sleep, 0)
+        await asyncio.get_running_loop().run_in_executor(None, terminado.wait, 1)
+        await asyncio.sleep(0.01)
+        assert politica.pendientes == 0
+        await politica.run(time.sleep, 0)
+
+    try:
+        asyncio.run(escenario())
+    finally:
+        politica.close()
+
+
+def test_rechaza_si_esta_saturado():
+    politica = PoliticaEjecucion(max_pendientes=0)
+    with pytest.raises(ServidorSaturado):
+        asyncio.run(politica.run(time.sleep, 0))
+
+
+def test_app_responde_503_y_504_sin_bloquear_el_root():
+    politica = PoliticaEjecucion(max_concurrentes=1, max_pendientes=1, timeout=0.3)
+    app = FastAPI()
+    instalar(app, politica)
+
+    @app.get("/lento")
+    async def lento():
+        return await politica.run(time.sleep, 1)
+
+    @app.get("/")
+    def root():
+        return {"ok": True}
+
+    with TestClient(app) as client:
+        inicio = time.perf_counter()
+        assert client.get("/lento").status_code == 504
+        assert time.perf_counter() - inicio < 0.9
+        assert client.get("/").json() == {"ok": True}
+        politica.max_pendientes = 0
+        respuesta = client.get("/lento")
+        assert respuesta.status_code == 503
+        assert respuesta.headers["Retry-After"] == "1"
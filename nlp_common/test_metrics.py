@@ -0,0 +1,32 @@
+import spacy
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from nlp_common.metrics import instrumentar
+
+nlp = spacy.blank("es")
+nlp.add_pipe("sentencizer")
+
+app = FastAPI()
+metricas = instrumentar(app, "prueba", nlp)
+
+
+@app.get("/oraciones/{n}")
+def oraciones(n: int, texto: str):
+    metricas.cache("prueba", acierto=n > 0)
+    return len(list(nlp(texto).sents)) + len(list(nlp.pipe([texto] * n)))
+
+
+client = TestClient(app)
+
+
+def _valor(texto, linea):
+    return next(float(l.split()[-1]) for l in texto.splitlines() if l.startswith(linea))
+
+
+def test_registra_pedidos_componentes_y_cache():
+    assert client.get("/oraciones/2", params={"texto": "Hola. Chau."}).json() == 2 + 2
+    texto = client.get("/metrics").text
+    assert _valor(texto, 'nlp_requests_total{estado="200",metodo="GET",ruta="/oraciones/{n}",servicio="prueba"}') == 1
+    assert _valor(texto, 'nlp_component_duration_seconds_count{componente="sentencizer",servicio="prueba"}') == 3
+    assert _valor(texto, 'nlp_cache_events_total{cache="prueba",resultado="hit",servicio="prueba"}') == 1
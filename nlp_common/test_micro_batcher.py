@@ -0,0 +1,58 @@
+import asyncio
+
+import spacy
+
+from prometheus_client import REGISTRY
+
+from nlp_common.metrics import Metricas
+from nlp_common.micro_batcher import MicroBatcher, pipe_en_hilo
+
+nlp = spacy.blank("es")
+
+
+def test_agrupa_pedidos_concurrentes():
+    batcher = MicroBatcher(pipe_en_hilo(nlp), max_espera_ms=50, max_lote=4, metricas=Metricas("prueba_lotes"))
+
+    async def enviar():
+        return await asyncio.gather(*(batcher.parse(f"texto {i}") for i in range(10)))
+
+    docs = asyncio.run(enviar())
+    assert [doc.text for doc in docs] == [f"texto {i}" for i in range(10)]
+    etiquetas = {"servicio": "prueba_lotes"}
+    assert REGISTRY.get_sample_value("nlp_batch_size_count", etiquetas) == 3
+    assert REGISTRY.get_sample_value("nlp_batch_size_sum", etiquetas) == 10
+    assert REGISTRY.get_sample_value("nlp_batch_size_bucket", {**etiquetas, "le": "2.0"}) == 1
+
+
+def test_despacha_lote_incompleto_al_vencer_la_espera():
+    batcher = MicroBatcher(pipe_en_hilo(nlp), max_espera_ms=1, max_lote=100, metricas=Metricas("prueba_espera"))
+    doc = asyncio.run(batcher.parse("Hola"))
+    assert doc.text == "Hola"
+    assert REGISTRY.get_sample_value("nlp_batch_size_sum", {"servicio": "prueba_espera"}) == 1
+
+
+def test_propaga_errores_a_cada_pedido():
+    async def fallar(textos):
+        raise ValueError("falla")
+
+    batcher = MicroBatcher(fallar, max_espera_ms=1, max_lote=2)
+
+    async def enviar():
+        return await asyncio.gather(batcher.parse("a"), batcher.parse("b"), return_exceptions=True)
+
+    resultados = asyncio.run(enviar())
+    assert all(isinstance(r, ValueError) for r in resultados)
+
+
+def test_falla_cada_pedido_si_faltan_docs():
+    async def incompleto(textos):
+        return [nlp(textos[0])]
+
+    batcher = MicroBatcher(incompleto, max_espera_ms=1, max_lote=3)
+
+    async def enviar():
+        pedidos = [batcher.parse(t) for t in ("a", "b", "c")]
+        return await asyncio.wait_for(asyncio.gather(*pedidos, return_exceptions=True), timeout=1)
+
+    resultados = asyncio.run(enviar())
+    assert all(isinstance(r, RuntimeError) for r in resultados)
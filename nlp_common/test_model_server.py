@@ -0,0 +1,50 @@
+import asyncio
+import time
+
+import pytest
+import spacy
+
+from nlp_common.model_server import ModelServer, ServidorSaturado
+
+nlp = spacy.blank("es")
+
+
+def test_parse_sin_workers():
+    servidor = ModelServer(nlp, workers=0)
+    doc = asyncio.run(servidor.parse("Hola mundo."))
+    assert [t.text for t in doc] == ["Hola", "mundo", "."]
+
+
+def test_pipe_con_workers_conserva_orden():
+    servidor = ModelServer(nlp, workers=2)
+    servidor.start()
+    try:
+        textos = [f"texto número {i}" for i in range(20)]
+        docs = asyncio.run(servidor.pipe(textos))
+        assert [doc.text for doc in docs] == textos
+        assert docs[0].vocab is nlp.vocab
+    finally:
+        servidor.close()
+
+
+def test_rechaza_si_esta_saturado():
+    servidor = ModelServer(nlp, workers=0, max_pendientes=0)
+    with pytest.raises(ServidorSaturado):
+        asyncio.run(servidor.parse("Hola"))
+
+
+def test_vence_por_timeout():
+    servidor = ModelServer(nlp, workers=1, timeout=0.05)
+    servidor.start()
+    try:
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(servidor.run(time.sleep, 0.5))
+        # el worker sigue ocupado: el pedido cuenta hasta que responde
+        assert servidor.pendientes == 1
+        for _ in range(100):
+            if servidor.pendientes == 0:
+                break
+            time.sleep(0.02)
+        assert servidor.pendientes == 0
+    finally:
+        servidor.close()
@@ -0,0 +1,59 @@
+import pytest
+import spacy
+
+import nlp_common.segmentador  # noqa: F401  registra el componente
+from nlp_common import modelo
+
+TEXTO = "El Sr. García llegó tarde. No dijo nada; luego se fue.\n\nMañana volverá."
+
+
+def _resumen(doc):
+    return [(t.text, t.pos_, t.dep_, t.head.i, t.is_sent_start) for t in doc]
+
+
+def test_se_carga_una_vez_por_proceso():
+    assert modelo.cargar() is modelo.cargar()
+    vista = modelo.cargar(agregar={"segmentador_es": "parser"})
+    assert vista is modelo.cargar(agregar={"segmentador_es": "parser"})
+    assert vista._nlp is modelo.cargar()
+
+
+def test_vista_igual_a_modificar_una_copia():
+    propio = spacy.load(modelo.MODELO)
+    propio.add_pipe("segmentador_es", before="parser")
+    vista = modelo.cargar(agregar={"segmentador_es": "parser"})
+    assert vista.pipe_names == propio.pipe_names
+    assert _resumen(vista(TEXTO)) == _resumen(propio(TEXTO))
+    assert [_resumen(d) for d in vista.pipe([TEXTO, "Hola."], batch_size=1)] == [_resumen(propio(TEXTO)), _resumen(propio("Hola."))]
+    # el modelo compartido no cambia
+    assert "segmentador_es" not in modelo.cargar().pipe_names
+
+
+def test_vista_sin_componentes():
+    vista = modelo.cargar(excluir=["parser"], agregar={"segmentador_es": None})
+    doc = vista(TEXTO)
+    assert vista.pipe_names[-1] == "segmentador_es" and "parser" not in vista.pipe_names
+    assert not doc.has_annotation("DEP")
+    assert [s.text.strip() for s in doc.sents] == ["El Sr. García llegó tarde.", "No dijo nada; luego se fue.", "Mañana volverá."]
+    with pytest.raises(ValueError):
+        modelo.Vista(modelo.cargar(), excluir=["no_existe"])
+
+
+def test_carga_diferida():
+    diferido = modelo.ModeloDiferido(modelo.MODELO)
+    vista = modelo.Vista(diferido, excluir=["ner"], agregar={"segmentador_es": "parser"})
+    cargados = []
+    # el callback recibe el modelo antes de que se publique
+    diferido.al_cargar(lambda nlp: cargados.append((diferido.cargado, nlp.pipe_names)))
+    # meta y pipe_names salen del meta.json, sin cargar el modelo
+    nombres = diferido.pipe_names
+    assert vista.pipe_names[nombres.index("parser")] == "segmentador_es" and "ner" not in vista.pipe_names
+    assert not diferido.cargado and cargados == []
+
+    assert diferido("Hola.").text == "Hola."
+    assert diferido.cargado and cargados == [(False, nombres)]
+    assert diferido.pipe_names == nombres
+    diferido.al_cargar(lambda nlp: cargados.append(nlp is diferido.obtener()))
+    assert cargados == [(False, nombres), True]
+    with pytest.raises(OSError):
+        modelo.ModeloDiferido("modelo_que_no_existe")
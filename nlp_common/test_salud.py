@@ -0,0 +1,106 @@
+import threading
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from nlp_common import salud
+
+
+class ModeloLento:
+    """Modelo de prueba que no termina de cargarse hasta que se lo indica la prueba."""
+
+    def __init__(self):
+        self.puede_cargar = threading.Event()
+        self.analizados = []
+
+    def obtener(self):
+        assert self.puede_cargar.wait(10)
+        return self
+
+    def __call__(self, texto):
+        self.analizados.append(texto)
+        return texto
+
+    def pipe(self, textos):
+        return [self(texto) for texto in textos]
+
+
+def _app(nlp, preparar=()):
+    app = FastAPI()
+    salud.instalar(app, nlp, preparar=preparar, textos=["uno", "dos"])
+    return app
+
+
+def test_listo_al_terminar_la_preparacion():
+    nlp = ModeloLento()
+    pasos = []
+    app = _app(nlp, preparar=[lambda: pasos.append("matcher")])
+    with TestClient(app) as client:
+        assert client.get("/health/live").status_code == 200
+        respuesta = client.get("/health/ready")
+        assert respuesta.status_code == 503 and respuesta.json()["estado"] == "preparando"
+
+        nlp.puede_cargar.set()
+        assert app.state.preparacion.esperar(timeout=10)
+        respuesta = client.get("/health/ready")
+        assert respuesta.status_code == 200 and respuesta.json()["estado"] == "listo"
+    assert pasos == ["matcher"]
+    # calentamiento: cada texto por separado y en lote
+    assert nlp.analizados == ["uno", "dos", "uno", "dos"]
+
+
+def test_error_en_la_preparacion():
+    def falla():
+        raise RuntimeError("sin vocabulario")
+
+    app = _app(None, preparar=[falla])
+    with TestClient(app) as client:
+        app.state.preparacion.esperar(timeout=10)
+        respuesta = client.get("/health/ready")
+    assert respuesta.status_code == 503
+    assert respuesta.json()["estado"] == "error" and "sin vocabulario" in respuesta.json()["error"]
+
+
+def test_sin_modelo_o_sin_precarga(monkeypatch):
+    with TestClient(_app(None)) as client:
+        assert client.get("/health/ready").status_code == 200
+
+    monkeypatch.setenv("NLP_PRECARGA", "no")
+    nlp = ModeloLento()
+    with TestClient(_app(nlp)) as client:
+        assert client.get("/health/ready").status_code == 200
+    assert nlp.analizados == []
+
+
+def test_al_estar_listo_despues_de_la_preparacion():
+    nlp = ModeloLento()
+    llamadas = []
+    app = FastAPI()
+    # se registra antes que `salud.instalar`, como hacen los servicios con model_server
+    salud.al_estar_listo(app, lambda: llamadas.append((nlp.puede_cargar.is_set(), threading.current_thread().name)))
+    salud.instalar(app, nlp, textos=["uno"])
+    with TestClient(app) as client:
+        assert llamadas == []
+        nlp.puede_cargar.set()
+        assert app.state.preparacion.esperar(timeout=10)
+        client.get("/health/live")
+        for _ in range(100):
+            if llamadas:
+                break
+            threading.Event().wait(0.01)
+    assert len(llamadas) == 1
+    cargado, hilo = llamadas[0]
+    assert cargado and hilo != "preparacion"
+
+
+def test_al_estar_listo_no_llama_si_la_preparacion_falla():
+    def falla():
+        raise RuntimeError("sin vocabulario")
+
+    llamadas = []
+    app = FastAPI()
+    salud.al_estar_listo(app, lambda: llamadas.append(1))
+    salud.instalar(app, None, preparar=[falla])
+    with TestClient(app):
+        app.state.preparacion.esperar(timeout=10)
+    assert llamadas == []
@@ -0,0 +1,43 @@
+import spacy
+
+import nlp_common.segmentador  # noqa: F401  registra el componente
+from nlp_common.segmentador import segmentar
+
+
+def oraciones(texto):
+    return [texto[inicio:fin] for inicio, fin in segmentar(texto)]
+
+
+def test_abreviaturas_numeros_e_iniciales():
+    assert oraciones("El Sr. García compró 1.000 libros a 3.5 euros. Luego se fue.") == [
+        "El Sr. García compró 1.000 libros a 3.5 euros.", "Luego se fue."]
+    assert oraciones("Leí a J. R. R. Tolkien, p. ej. ayer. Vive en EE.UU. desde 2010.") == [
+        "Leí a J. R. R. Tolkien, p. ej. ayer.", "Vive en EE.UU. desde 2010."]
+    assert oraciones("1. Introducción. 2. Desarrollo.") == ["1. Introducción.", "2. Desarrollo."]
+
+
+def test_interrogacion_exclamacion_y_suspensivos():
+    assert oraciones("¿Vienes?, preguntó. ¡Claro! Vamos.") == ["¿Vienes?, preguntó.", "¡Claro!", "Vamos."]
+    assert oraciones("Bueno... no sé. Quizás… Mañana.") == ["Bueno... no sé.", "Quizás…", "Mañana."]
+    assert oraciones("¿Llegó a las 3. Y luego? No sé.") == ["¿Llegó a las 3. Y luego?", "No sé."]
+
+
+def test_minuscula_tras_punto_corta_y_saltos_de_linea():
+    assert oraciones("Dijo: «Adiós.» luego se fue.") == ["Dijo: «Adiós.»", "luego se fue."]
+    assert oraciones("  Título\nTexto.\n\nOtro párrafo.  ") == ["Título", "Texto.", "Otro párrafo."]
+    assert segmentar("   ") == []
+
+
+def test_componente_marca_las_oraciones_del_doc():
+    nlp = spacy.blank("es")
+    nlp.add_pipe("segmentador_es")
+    doc = nlp("El Sr. García llegó. ¿Vienes?, preguntó. ¡Claro!")
+    assert [sent.text for sent in doc.sents] == ["El Sr. García llegó.", "¿Vienes?, preguntó.", "¡Claro!"]
+
+
+def test_abreviaturas_con_espacios():
+    assert oraciones("Vive en EE. UU. desde 2010. Trabaja allí.") == ["Vive en EE. UU. desde 2010.", "Trabaja allí."]
+    assert oraciones("Abre a las 9 a. m. y cierra a las 8 p. m. todos los días.") == [
+        "Abre a las 9 a. m. y cierra a las 8 p. m. todos los días."]
+    assert oraciones("Llegó a las 5 p. m. Después cenamos.") == ["Llegó a las 5 p. m.", "Después cenamos."]
+    assert oraciones("Salió a las 10 a.m. Nadie lo vio.") == ["Salió a las 10 a.m.", "Nadie lo vio."]
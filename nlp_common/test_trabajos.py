@@ -0,0 +1,138 @@
+import os
+import time
+
+from fastapi import FastAPI
+from fastapi.testclient import TestClient
+
+from nlp_common.trabajos import AlmacenTrabajos, GestorTrabajos, dividir, instalar
+
+
+def palabras(texto, parametros):
+    # primera palabra del fragmento con su posición, y cantidad de palabras
+    primera = texto.split()[0]
+    return {"primera": (primera, texto.index(primera)), "cantidad": len(texto.split())}
+
+
+def palabras_o_morir(texto, parametros):
+    if "morir" in texto:
+        os._exit(1)
+    return palabras(texto, parametros)
+
+
+def combinar(partes, parametros):
+    return {
+        "primeras": [(r["primera"][0], r["primera"][1] + f.inicio) for f, r in partes],
+        "palabras": sum(r["cantidad"] for _, r in partes),
+    }
+
+
+def _app(ruta):
+    app = FastAPI()
+    instalar(app, GestorTrabajos("prueba", palabras, combinar, ruta=str(ruta), workers=0, max_caracteres=20))
+    return app
+
+
+def _esperar(client, id_trabajo):
+    for _ in range(200):
+        estado = client.get(f"/trabajos/{id_trabajo}").json()
+        if estado["estado"] in ("terminado", "error"):
+            return estado
+        time.sleep(0.01)
+    raise AssertionError("el trabajo no terminó")
+
+
+def test_dividir_en_parrafos():
+    texto = "Uno dos.\n\nTres cuatro.\nCinco.\n\n\nSeis siete ocho."
+    fragmentos = dividir(texto, 20)
+    assert [texto[f.inicio:f.fin] for f in fragmentos] == ["Uno dos.", "Tres cuatro.\nCinco.", "Seis siete ocho."]
+    assert not any(f.continua for f in fragmentos)
+
+
+def test_dividir_parrafo_largo_en_oraciones():
+    texto = "Primera oración. Segunda oración. " + "palabra " * 10
+    fragmentos = dividir(texto, 20)
+    assert all(f.fin - f.inicio <= 20 for f in fragmentos)
+    assert [texto[f.inicio:f.fin] for f in fragmentos][:2] == ["Primera oración.", "Segunda oración."]
+    assert [f.continua for f in fragmentos] == [False] + [True] * (len(fragmentos) - 1)
+    assert " ".join(texto[f.inicio:f.fin] for f in fragmentos).split() == texto.split()
+
+
+def test_trabajo_completo_con_posiciones_absolutas(tmp_path):
+    texto = "Hola mundo.\n\nAdiós mundo cruel."
+    with TestClient(_app(tmp_path / "t.sqlite3")) as client:
+        respuesta = client.post("/trabajos", json={"texto": texto})
+        assert respuesta.status_code == 202
+        id_trabajo = respuesta.json()["id"]
+        estado = _esperar(client, id_trabajo)
+        assert estado["estado"] == "terminado"
+        assert estado["progreso"] == {"hechos": 2, "total": 2}
+        resultado = client.get(f"/trabajos/{id_trabajo}/resultado").json()["resultado"]
+        assert resultado == {"primeras": [["Hola", 0], ["Adiós", 13]], "palabras": 5}
+        assert client.get("/trabajos/no-existe").status_code == 404
+
+
+def test_archivo(tmp_path):
+    with TestClient(_app(tmp_path / "t.sqlite3")) as client:
+        respuesta = client.post("/trabajos/archivo", files={"archivo": ("libro.txt", "uno dos tres".encode("utf-8"))})
+        assert respuesta.status_code == 202
+        assert _esperar(client, respuesta.json()["id"])["estado"] == "terminado"
+        assert client.post("/trabajos/archivo", files={"archivo": ("x.bin", b"\xff\xfe")}).status_code == 400
+
+
+def test_retoma_trabajos_al_reiniciar(tmp_path):
+    ruta = tmp_path / "t.sqlite3"
+    texto = "Hola mundo.\n\nAdiós mundo cruel."
+    almacen = AlmacenTrabajos(str(ruta), "prueba")
+    id_trabajo = almacen.crear(texto, {}, dividir(texto, 20))
+    # el primer fragmento se había procesado antes de reiniciar
+    almacen.guardar_fragmento(id_trabajo, 0, {"primera": ["Hola", 0], "cantidad": 2})
+    almacen.marcar(id_trabajo, "en_curso")
+    almacen.close()
+
+    with TestClient(_app(ruta)) as client:
+        assert _esperar(client, id_trabajo)["estado"] == "terminado"
+        resultado = client.get(f"/trabajos/{id_trabajo}/resultado").json()["resultado"]
+        assert resultado == {"primeras": [["Hola", 0], ["Adiós", 13]], "palabras": 5}
+
+
+def test_servicios_con_el_mismo_archivo(tmp_path):
+    ruta = str(tmp_path / "t.sqlite3")
+    propio = AlmacenTrabajos(ruta, "prueba")
+    ajeno = AlmacenTrabajos(ruta, "otro")
+    id_trabajo = ajeno.crear("uno dos", {}, dividir("uno dos", 20))
+    assert propio.sin_terminar() == [] and propio.estado(id_trabajo) is None
+    assert ajeno.sin_terminar() == [id_trabajo]
+
+
+def test_worker_muerto_no_rompe_los_trabajos_siguientes(tmp_path):
+    app = FastAPI()
+    gestor = GestorTrabajos("prueba", palabras_o_morir, combinar, ruta=str(tmp_path / "t.sqlite3"), workers=1)
+    instalar(app, gestor)
+    with TestClient(app) as client:
+        fallido = client.post("/trabajos", json={"texto": "morir ahora"}).json()["id"]
+        estado = _esperar(client, fallido)
+        assert estado["estado"] == "error" and "BrokenProcessPool" in estado["error"]
+        siguiente = client.post("/trabajos", json={"texto": "uno dos"}).json()["id"]
+        assert _esperar(client, siguiente)["estado"] == "terminado"
+
+
+def test_purgar_trabajos_vencidos(tmp_path):
+    almacen = AlmacenTrabajos(str(tmp_path / "t.sqlite3"), "prueba")
+    terminado = almacen.crear("uno dos", {}, dividir("uno dos", 20))
+    almacen.finalizar(terminado, {})
+    fallido = almacen.crear("tres", {}, dividir("tres", 20))
+    almacen.fallar(fallido, "Error")
+    pendiente = almacen.crear("cuatro", {}, dividir("cuatro", 20))
+    assert almacen.purgar(3600) == 0
+    time.sleep(0.02)
+    assert almacen.purgar(0.01) == 2
+    assert almacen.estado(terminado) is None and almacen.estado(fallido) is None
+    assert almacen.sin_terminar() == [pendiente]
+    assert almacen._ejecutar("SELECT DISTINCT trabajo FROM fragmentos") == [(pendiente,)]
+
+
+def test_503_antes_de_iniciar(tmp_path):
+    client = TestClient(_app(tmp_path / "t.sqlite3"))  # sin `with`: no corre el startup
+    respuesta = client.post("/trabajos", json={"texto": "uno dos"})
+    assert respuesta.status_code == 503 and respuesta.headers["Retry-After"] == "1"
+    assert client.get("/trabajos/algo").status_code == 503
@@ -0,0 +1,443 @@
+"""Trabajos asíncronos para documentos muy grandes.
+
+Un documento entero (un libro) no entra en `nlp.max_length` ni en el tiempo máximo
+de un pedido. Con esta API el cliente envía el texto o un archivo, recibe el id del
+trabajo y consulta su estado hasta que el resultado esté listo:
+
+    POST /trabajos                 {"texto": "...", "parametros": {...}}  -> 202 {"id": ...}
+    POST /trabajos/archivo         archivo de texto (UTF-8) y parametros en JSON
+    GET  /trabajos/{id}            estado y progreso (fragmentos hechos / total)
+    GET  /trabajos/{id}/resultado  resultado combinado (409 si todavía no terminó)
+
+El documento se divide en fragmentos en los límites de párrafo, cada fragmento se
+analiza en un pool de procesos y los resultados se combinan con las posiciones
+corregidas al documento completo. Cada servicio aporta las dos funciones:
+
+    def procesar_fragmento(texto: str, parametros: dict):    # en un worker, por fork
+        ...                                                 # posiciones relativas al fragmento
+    def combinar_fragmentos(partes: List[Tuple[Fragmento, Any]], parametros: dict):
+        ...                                                 # suma fragmento.inicio a cada posición
+
+    gestor = GestorTrabajos("tenses", procesar_fragmento, combinar_fragmentos)
+    instalar(app, gestor)
+
+El estado, el texto y los resultados parciales se guardan en SQLite: al reiniciar,
+los trabajos sin terminar se retoman desde el último fragmento guardado.
+
+Configuración por variables de entorno:
+  - NLP_TRABAJOS_DB: archivo SQLite (por defecto, trabajos_<servicio>.sqlite3); varios
+    servicios pueden compartirlo, cada uno ve solo sus trabajos.
+  - NLP_TRABAJOS_WORKERS: procesos para los fragmentos (0 = sin procesos, en un hilo).
+  - NLP_TRABAJOS_FRAGMENTO: caracteres máximos por fragmento.
+  - NLP_TRABAJOS_RETENCION: segundos que se conservan los trabajos terminados o con
+    error desde su última actualización (por defecto, 7 días; 0 = sin límite).
+"""
+import asyncio
+import json
+import logging
+import multiprocessing
+import os
+import re
+import sqlite3
+import threading
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from typing import Any, Callable, Dict, List, NamedTuple, Optional, Tuple, Type
+
+from fastapi import APIRouter, FastAPI, File, Form, HTTPException, Request, Response, UploadFile
+from fastapi.responses import JSONResponse
+from pydantic import BaseModel, ValidationError, create_model
+
+from nlp_common.segmentador import segmentar
+
+logger = logging.getLogger(__name__)
+
+PENDIENTE, EN_CURSO, TERMINADO, ERROR = "pendiente", "en_curso", "terminado", "error"
+
+# Un párrafo termina en uno o más saltos de línea
+_SALTO_PARRAFO = re.compile(r"\s*\n\s*")
+
+
+class TrabajosNoDisponibles(RuntimeError):
+    """El gestor todavía no abrió su almacén (la app no terminó de iniciar) o ya lo cerró."""
+
+
+class Fragmento(NamedTuple):
+    indice: int
+    inicio: int
+    fin: int
+    continua: bool  # el fragmento sigue un párrafo que se partió en el fragmento anterior
+
+
+def _parrafos(texto: str) -> List[Tuple[int, int]]:
+    spans = []
+    inicio = 0
+    for m in _SALTO_PARRAFO.finditer(texto):
+        if texto[inicio:m.start()].strip():
+            spans.append((inicio, m.start()))
+        inicio = m.end()
+    if texto[inicio:].strip():
+        spans.append((inicio, len(texto)))
+    return spans
+
+
+def _partir_parrafo(texto: str, inicio: int, fin: int, max_caracteres: int) -> List[Tuple[int, int]]:
+    """Parte un párrafo demasiado largo en los límites de oración (o, si una oración
+    tampoco entra, en el último espacio antes del máximo)."""
+    partes = []
+    actual = None
+    for a, b in segmentar(texto[inicio:fin]):
+        a, b = a + inicio, b + inicio
+        while b - a > max_caracteres:
+            corte = texto.rfind(" ", a + 1, a + max_caracteres)
+            corte = corte if corte > a else a + max_caracteres
+            if actual is not None:
+                partes.append(actual)
+                actual = None
+            partes.append((a, corte))
+            a = corte + 1 if texto[corte] == " " else corte
+        if actual is not None and b - actual[0] <= max_caracteres:
+            actual = (actual[0], b)
+        else:
+            if actual is not None:
+                partes.append(actual)
+            actual = (a, b)
+    if actual is not None:
+        partes.append(actual)
+    return partes
+
+
+def dividir(texto: str, max_caracteres: int) -> List[Fragmento]:
+    """Agrupa párrafos consecutivos en fragmentos de hasta `max_caracteres` caracteres.
+
+    Los espacios y saltos de línea entre fragmentos quedan fuera de todos ellos.
+    """
+    fragmentos = []
+
+    def agregar(inicio, fin, continua=False):
+        fragmentos.append(Fragmento(len(fragmentos), inicio, fin, continua))
+
+    actual = None
+    for inicio, fin in _parrafos(texto):
+        if fin - inicio > max_caracteres:
+            if actual is not None:
+                agregar(*actual)
+                actual = None
+            for k, (a, b) in enumerate(_partir_parrafo(texto, inicio, fin, max_caracteres)):
+                agregar(a, b, continua=k > 0)
+        elif actual is not None and fin - actual[0] <= max_caracteres:
+            actual = (actual[0], fin)
+        else:
+            if actual is not None:
+                agregar(*actual)
+            actual = (inicio, fin)
+    if actual is not None:
+        agregar(*actual)
+    return fragmentos
+
+
+class AlmacenTrabajos:
+    """Trabajos, fragmentos y resultados de un servicio en SQLite; se puede usar desde varios hilos."""
+
+    def __init__(self, ruta: str, servicio: str):
+        self.ruta = ruta
+        self.servicio = servicio
+        self._conexion = sqlite3.connect(ruta, check_same_thread=False, isolation_level=None)
+        self._lock = threading.Lock()
+        with self._lock:
+            self._conexion.execute("PRAGMA journal_mode=WAL")
+            self._conexion.executescript("""
+                CREATE TABLE IF NOT EXISTS trabajos (
+                    id TEXT PRIMARY KEY, servicio TEXT NOT NULL, estado TEXT NOT NULL, parametros TEXT NOT NULL, texto TEXT,
+                    total INTEGER NOT NULL, resultado TEXT, error TEXT, creado REAL NOT NULL, actualizado REAL NOT NULL
+                );
+                CREATE TABLE IF NOT EXISTS fragmentos (
+                    trabajo TEXT NOT NULL, indice INTEGER NOT NULL, inicio INTEGER NOT NULL, fin INTEGER NOT NULL,
+                    continua INTEGER NOT NULL, resultado TEXT, PRIMARY KEY (trabajo, indice)
+                );
+            """)
+
+    def _ejecutar(self, sql: str, *args):
+        with self._lock:
+            return self._conexion.execute(sql, args).fetchall()
+
+    def crear(self, texto: str, parametros: dict, fragmentos: List[Fragmento]) -> str:
+        id_trabajo = uuid.uuid4().hex
+        ahora = time.time()
+        with self._lock, self._conexion:
+            self._conexion.execute("BEGIN")
+            self._conexion.execute(
+                "INSERT INTO trabajos (id, servicio, estado, parametros, texto, total, creado, actualizado) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                (id_trabajo, self.servicio, PENDIENTE, json.dumps(parametros), texto, len(fragmentos), ahora, ahora),
+            )
+            self._conexion.executemany(
+                "INSERT INTO fragmentos (trabajo, indice, inicio, fin, continua) VALUES (?, ?, ?, ?, ?)",
+                [(id_trabajo, f.indice, f.inicio, f.fin, f.continua) for f in fragmentos],
+            )
+        return id_trabajo
+
+    def estado(self, id_trabajo: str) -> Optional[Dict[str, Any]]:
+        filas = self._ejecutar(
+            "SELECT estado, total, error, creado, actualizado, "
+            "(SELECT COUNT(*) FROM fragmentos WHERE trabajo = t.id AND resultado IS NOT NULL) "
+            "FROM trabajos t WHERE id = ? AND servicio = ?", id_trabajo, self.servicio,
+        )
+        if not filas:
+            return None
+        estado, total, error, creado, actualizado, hechos = filas[0]
+        if estado == TERMINADO:
+            hechos = total  # los fragmentos se borran al terminar
+        return {
+            "id": id_trabajo, "estado": estado, "progreso": {"hechos": hechos, "total": total},
+            "error": error, "creado": creado, "actualizado": actualizado,
+        }
+
+    def entrada(self, id_trabajo: str) -> Tuple[str, dict]:
+        texto, parametros = self._ejecutar("SELECT texto, parametros FROM trabajos WHERE id = ?", id_trabajo)[0]
+        return texto, json.loads(parametros)
+
+    def sin_terminar(self) -> List[str]:
+        filas = self._ejecutar(
+            "SELECT id FROM trabajos WHERE servicio = ? AND estado IN (?, ?) ORDER BY creado", self.servicio, PENDIENTE, EN_CURSO,
+        )
+        return [id_trabajo for id_trabajo, in filas]
+
+    def fragmentos_pendientes(self, id_trabajo: str) -> List[Fragmento]:
+        filas = self._ejecutar(
+            "SELECT indice, inicio, fin, continua FROM fragmentos WHERE trabajo = ? AND resultado IS NULL ORDER BY indice",
+            id_trabajo,
+        )
+        return [Fragmento(i, a, b, bool(c)) for i, a, b, c in filas]
+
+    def resultados(self, id_trabajo: str) -> List[Tuple[Fragmento, Any]]:
+        filas = self._ejecutar(
+            "SELECT indice, inicio, fin, continua, resultado FROM fragmentos WHERE trabajo = ? ORDER BY indice", id_trabajo,
+        )
+        return [(Fragmento(i, a, b, bool(c)), json.loads(r)) for i, a, b, c, r in filas]
+
+    def marcar(self, id_trabajo: str, estado: str):
+        self._ejecutar("UPDATE trabajos SET estado = ?, actualizado = ? WHERE id = ?", estado, time.time(), id_trabajo)
+
+    def guardar_fragmento(self, id_trabajo: str, indice: int, resultado: Any):
+        self._ejecutar(
+            "UPDATE fragmentos SET resultado = ? WHERE trabajo = ? AND indice = ?",
+            json.dumps(resultado, ensure_ascii=False), id_trabajo, indice,
+        )
+        self._ejecutar("UPDATE trabajos SET actualizado = ? WHERE id = ?", time.time(), id_trabajo)
+
+    def finalizar(self, id_trabajo: str, resultado: Any):
+        """Guarda el resultado combinado y descarta el texto y los resultados parciales."""
+        with self._lock, self._conexion:
+            self._conexion.execute("BEGIN")
+            self._conexion.execute(
+                "UPDATE trabajos SET estado = ?, resultado = ?, texto = NULL, actualizado = ? WHERE id = ?",
+                (TERMINADO, json.dumps(resultado, ensure_ascii=False), time.time(), id_trabajo),
+            )
+            self._conexion.execute("DELETE FROM fragmentos WHERE trabajo = ?", (id_trabajo,))
+
+    def fallar(self, id_trabajo: str, error: str):
+        self._ejecutar("UPDATE trabajos SET estado = ?, error = ?, actualizado = ? WHERE id = ?", ERROR, error, time.time(), id_trabajo)
+
+    def purgar(self, antiguedad: float) -> int:
+        """Borra los trabajos terminados o con error sin cambios en los últimos `antiguedad` segundos."""
+        limite = time.time() - antiguedad
+        condicion = "servicio = ? AND estado IN (?, ?) AND actualizado < ?"
+        with self._lock, self._conexion:
+            self._conexion.execute("BEGIN")
+            self._conexion.execute(
+                f"DELETE FROM fragmentos WHERE trabajo IN (SELECT id FROM trabajos WHERE {condicion})",
+                (self.servicio, TERMINADO, ERROR, limite),
+            )
+            return self._conexion.execute(
+                f"DELETE FROM trabajos WHERE {condicion}", (self.servicio, TERMINADO, ERROR, limite),
+            ).rowcount
+
+    def resultado_json(self, id_trabajo: str) -> Optional[str]:
+        """Resultado combinado tal como está guardado, sin volver a serializarlo."""
+        filas = self._ejecutar("SELECT resultado FROM trabajos WHERE id = ? AND servicio = ?", id_trabajo, self.servicio)
+        return filas[0][0] if filas else None
+
+    def close(self):
+        with self._lock:
+            self._conexion.close()
+
+
+class SinParametros(BaseModel):
+    pass
+
+
+class GestorTrabajos:
+    def __init__(self, servicio: str, procesar: Callable[[str, dict], Any],
+                 combinar: Callable[[List[Tuple[Fragmento, Any]], dict], Any],
+                 parametros: Type[BaseModel] = SinParametros, ruta: Optional[str] = None,
+                 workers: Optional[int] = None, max_caracteres: Optional[int] = None,
+                 retencion: Optional[float] = None):
+        """`procesar` debe ser una función de nivel de módulo (se envía por referencia a los workers)
+        y tanto su resultado como el de `combinar` deben poder serializarse como JSON."""
+        self.servicio = servicio
+        self.procesar = procesar
+        self.combinar = combinar
+        self.parametros = parametros
+        self.ruta = ruta or os.environ.get("NLP_TRABAJOS_DB", f"trabajos_{servicio}.sqlite3")
+        self.workers = workers if workers is not None else int(os.environ.get("NLP_TRABAJOS_WORKERS", str(os.cpu_count() or 1)))
+        self.max_caracteres = max_caracteres if max_caracteres is not None else int(os.environ.get("NLP_TRABAJOS_FRAGMENTO", "100000"))
+        self.retencion = retencion if retencion is not None else float(os.environ.get("NLP_TRABAJOS_RETENCION", str(7 * 24 * 3600)))
+        self.almacen = None
+        self._pool = None
+        self._cola = None
+        self._tarea = None
+
+    def _executor(self) -> Optional[ProcessPoolExecutor]:
+        if self.workers <= 0:
+            return None
+        if self._pool is None:
+            metodo = "fork" if "fork" in multiprocessing.get_all_start_methods() else None
+            self._pool = ProcessPoolExecutor(self.workers, mp_context=multiprocessing.get_context(metodo))
+        return self._pool
+
+    def _descartar_pool(self):
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def _almacen(self) -> AlmacenTrabajos:
+        if self.almacen is None:
+            raise TrabajosNoDisponibles("El servicio de trabajos todavía no está listo; intente más tarde.")
+        return self.almacen
+
+    def _purgar(self):
+        if self.retencion > 0:
+            borrados = self._almacen().purgar(self.retencion)
+            if borrados:
+                logger.info("Se borraron %d trabajos vencidos de %s", borrados, self.servicio)
+
+    async def start(self):
+        """Abre el almacén, borra los trabajos vencidos y retoma los que quedaron sin terminar."""
+        self.almacen = AlmacenTrabajos(self.ruta, self.servicio)
+        self._purgar()
+        self._cola = asyncio.Queue()
+        for id_trabajo in self.almacen.sin_terminar():
+            self._cola.put_nowait(id_trabajo)
+        self._tarea = asyncio.create_task(self._consumir())
+
+    async def close(self):
+        if self._tarea is not None:
+            self._tarea.cancel()
+            try:
+                await self._tarea
+            except asyncio.CancelledError:
+                pass
+            self._tarea = None
+        self._descartar_pool()
+        if self.almacen is not None:
+            self.almacen.close()
+            self.almacen = None
+
+    async def enviar(self, texto: str, parametros: BaseModel) -> str:
+        """Registra un trabajo nuevo y lo encola; devuelve su id."""
+        almacen = self._almacen()
+        id_trabajo = await asyncio.to_thread(
+            lambda: almacen.crear(texto, parametros.dict(), dividir(texto, self.max_caracteres))
+        )
+        self._cola.put_nowait(id_trabajo)
+        return id_trabajo
+
+    async def _consumir(self):
+        # un trabajo a la vez: sus fragmentos ya ocupan todos los workers
+        while True:
+            id_trabajo = await self._cola.get()
+            try:
+                await self._ejecutar(id_trabajo)
+            except asyncio.CancelledError:
+                raise
+            except BrokenProcessPool as e:
+                # murió un worker: ese pool ya no acepta tareas, los trabajos siguientes usan uno nuevo
+                logger.exception("Se perdió un worker durante el trabajo %s", id_trabajo)
+                self._descartar_pool()
+                self.almacen.fallar(id_trabajo, f"{type(e).__name__}: {e}")
+            except Exception as e:
+                logger.exception("Falló el trabajo %s", id_trabajo)
+                self.almacen.fallar(id_trabajo, f"{type(e).__name__}: {e}")
+            # los trabajos vencidos se borran a medida que llegan nuevos
+            await asyncio.to_thread(self._purgar)
+
+    async def _ejecutar(self, id_trabajo: str):
+        loop = asyncio.get_running_loop()
+        almacen = self._almacen()
+        texto, parametros = await asyncio.to_thread(almacen.entrada, id_trabajo)
+        almacen.marcar(id_trabajo, EN_CURSO)
+        executor = self._executor()
+        pendientes = {
+            loop.run_in_executor(executor, self.procesar, texto[f.inicio:f.fin], parametros): f
+            for f in almacen.fragmentos_pendientes(id_trabajo)
+        }
+        try:
+            while pendientes:
+                hechos, _ = await asyncio.wait(pendientes, return_when=asyncio.FIRST_COMPLETED)
+                for fut in hechos:
+                    fragmento = pendientes.pop(fut)
+                    await asyncio.to_thread(almacen.guardar_fragmento, id_trabajo, fragmento.indice, fut.result())
+        finally:
+            for fut in pendientes:
+                fut.cancel()
+        partes = await asyncio.to_thread(almacen.resultados, id_trabajo)
+        resultado = await asyncio.to_thread(self.combinar, partes, parametros)
+        await asyncio.to_thread(almacen.finalizar, id_trabajo, resultado)
+
+
+def instalar(app: FastAPI, gestor: GestorTrabajos, prefijo: str = "/trabajos"):
+    """Agrega los endpoints de trabajos y abre/cierra el gestor con la app.
+
+    Mientras el almacén no está abierto los endpoints responden 503.
+    """
+    app.add_event_handler("startup", gestor.start)
+    app.add_event_handler("shutdown", gestor.close)
+
+    async def _no_disponible(request: Request, exc: TrabajosNoDisponibles):
+        return JSONResponse(status_code=503, content={"detail": str(exc)}, headers={"Retry-After": "1"})
+
+    app.add_exception_handler(TrabajosNoDisponibles, _no_disponible)
+    router = APIRouter(prefix=prefijo, tags=["trabajos"])
+    TrabajoEntrada = create_model(
+        f"TrabajoEntrada_{gestor.servicio}", texto=(str, ...), parametros=(gestor.parametros, gestor.parametros()),
+    )
+
+    @router.post("", status_code=202)
+    async def crear_trabajo(entrada: TrabajoEntrada):
+        return {"id": await gestor.enviar(entrada.texto, entrada.parametros), "estado": PENDIENTE}
+
+    @router.post("/archivo", status_code=202)
+    async def crear_trabajo_archivo(archivo: UploadFile = File(...), parametros: str = Form("{}")):
+        try:
+            texto = (await archivo.read()).decode("utf-8")
+        except UnicodeDecodeError:
+            raise HTTPException(status_code=400, detail="El archivo debe ser texto en UTF-8.")
+        try:
+            valores = gestor.parametros.parse_raw(parametros)
+        except ValidationError as e:
+            raise HTTPException(status_code=422, detail=e.errors())
+        return {"id": await gestor.enviar(texto, valores), "estado": PENDIENTE}
+
+    @router.get("/{id_trabajo}")
+    async def estado_trabajo(id_trabajo: str):
+        estado = await asyncio.to_thread(gestor._almacen().estado, id_trabajo)
+        if estado is None:
+            raise HTTPException(status_code=404, detail=f"No existe el trabajo {id_trabajo}")
+        return estado
+
+    @router.get("/{id_trabajo}/resultado")
+    async def resultado_trabajo(id_trabajo: str):
+        estado = await asyncio.to_thread(gestor._almacen().estado, id_trabajo)
+        if estado is None:
+            raise HTTPException(status_code=404, detail=f"No existe el trabajo {id_trabajo}")
+        if estado["estado"] == ERROR:
+            raise HTTPException(status_code=409, detail=f"El trabajo terminó con error: {estado['error']}")
+        if estado["estado"] != TERMINADO:
+            raise HTTPException(status_code=409, detail=f"El trabajo todavía no terminó (estado: {estado['estado']})")
+        resultado = await asyncio.to_thread(gestor._almacen().resultado_json, id_trabajo)
+        return Response(content=f'{{"id": {json.dumps(id_trabajo)}, "resultado": {resultado}}}', media_type="application/json")
+
+    app.include_router(router)